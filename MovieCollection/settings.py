@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 
 from pathlib import Path
 import os
+import sys
 from datetime import timedelta
 
 # this is implemented in manage.py so we don't need to repeat in every module
@@ -57,6 +58,8 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'middlewares.middleware.RequestCounterMiddleware', # middleware for counting requests
+    'middlewares.middleware.ProfilingMiddleware', # sampled and staff-requested cProfile profiles
+    'middlewares.middleware.QueryBudgetMiddleware', # query budgets and N+1 detection
 ]
 
 ROOT_URLCONF = 'MovieCollection.urls'
@@ -87,9 +90,28 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Each worker thread keeps its connection open for DB_CONN_MAX_AGE seconds instead of
+        # reconnecting (and reapplying the PRAGMAs below) for every request. The connection is
+        # checked before it is reused after a request that failed.
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 600)),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# PRAGMAs run on every new SQLite connection (see collection.utils.database).
+# WAL lets readers go on while a write is in progress, and synchronous=NORMAL is safe
+# with WAL (a power loss may lose the last transactions but never corrupts the file).
+# Writers wait up to busy_timeout ms for the write lock instead of failing with
+# "database is locked". mmap_size is in bytes, and a negative cache_size is in KiB.
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT', 5000)),
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -111,7 +133,7 @@ AUTH_PASSWORD_VALIDATORS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'collection.authentication.CachedJWTAuthentication',
     ],
 }
 
@@ -120,6 +142,51 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),     # Lifetime of refresh token
 }
 
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'movies': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'movies',
+        'OPTIONS': {
+            'MAX_ENTRIES': 1000,  # least recently used pages are evicted past this
+        },
+    },
+    'collections': {
+        # Per process; point it to a shared backend (e.g. Redis) when running several workers.
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'collections',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+    'auth': {
+        # Per process; point it to a shared backend (e.g. Redis) when running several workers,
+        # or a deactivated user is only refused by the other workers after AUTH_ACTIVE_USER_TTL.
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'auth',
+    },
+}
+
+# Password hashing
+# https://docs.djangoproject.com/en/5.0/topics/auth/passwords/
+
+PASSWORD_HASHERS = [
+    'collection.hashers.ConfigurablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+# Number of PBKDF2 iterations of new password hashes; defaults to Django's. Lowering it makes
+# logins cheaper but passwords easier to brute force if the database leaks.
+PASSWORD_HASH_ITERATIONS = int(os.getenv('PASSWORD_HASH_ITERATIONS', 720000))
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.0/topics/i18n/
 
@@ -141,3 +208,163 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Request counter
+# Requests are counted in process memory and flushed to the RequestCounter table
+# in bulk every REQUEST_COUNTER_FLUSH_INTERVAL seconds or every
+# REQUEST_COUNTER_FLUSH_THRESHOLD requests, whichever comes first.
+
+REQUEST_COUNTER_FLUSH_INTERVAL = 5
+
+REQUEST_COUNTER_FLUSH_THRESHOLD = 100
+
+# The count is spread over REQUEST_COUNTER_SHARDS rows. Each worker flushes into the
+# shard picked by REQUEST_COUNTER_SHARD_STRATEGY: 'worker' (process id) or 'random'.
+
+REQUEST_COUNTER_SHARDS = 8
+
+REQUEST_COUNTER_SHARD_STRATEGY = 'worker'
+
+# Per-route request metrics
+# Counts, status classes and latency histograms are kept in process memory and
+# flushed to the RouteMetric table every REQUEST_METRICS_FLUSH_INTERVAL seconds.
+
+REQUEST_METRICS_FLUSH_INTERVAL = 10
+
+# Query budgets
+# QueryBudgetMiddleware counts the queries of every view against its budget below, keyed by
+# view and method. Over budget, QUERY_BUDGET_MODE 'raise' fails the request (and the tests)
+# unless the view wrote to the database, 'log' logs a warning with the most repeated
+# statements, and 'off' records nothing. 'raise' is the default in the test runner only. A
+# statement repeated QUERY_REPEAT_THRESHOLD times in a request is logged as a possible N+1.
+# The budgets leave out the active user check of authentication, which only queries when
+# the user is not cached, and include the password hash upgrade of a login.
+
+QUERY_BUDGET_MODE = os.getenv('QUERY_BUDGET_MODE', 'raise' if sys.argv[1:2] == ['test'] else 'log')
+
+QUERY_REPEAT_THRESHOLD = 10
+
+QUERY_BUDGETS = {
+    'login.post': 2,
+    'register.post': 2,
+    'get_movies.get': 2,
+    'search_movies.get': 1,
+    'CollectionListView.get': 3,
+    'CollectionDetailView.get': 3,
+    'CollectionMoviesView.get': 3,
+    'RequestCountView.get': 1,
+    'ResetRequestCountView.post': 1,
+    'RequestMetricsView.get': 1,
+    'CacheStatsView.get': 0,
+    'ProfilesView.get': 2,
+}
+
+# Profiling
+# ProfilingMiddleware profiles a share PROFILING_SAMPLE_RATE of the requests, and the requests
+# of staff users sending the PROFILING_HEADER header, with cProfile. The PROFILING_MAX_FILES
+# latest profiles are kept in PROFILING_DIR, and /profiles/ lists the slowest ones with their
+# PROFILING_TOP_FUNCTIONS most expensive functions.
+
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', 0))
+
+PROFILING_HEADER = 'X-Profile'
+
+PROFILING_DIR = BASE_DIR / 'profiles'
+
+PROFILING_MAX_FILES = 100
+
+PROFILING_TOP_FUNCTIONS = 10
+
+# Third-party movie API
+# Pages are cached in the MOVIES_CACHE_ALIAS cache. A page is fresh for MOVIES_CACHE_TTL
+# seconds, then served stale for up to MOVIES_CACHE_STALE_TTL more seconds while it is
+# refreshed (in the background if MOVIES_CACHE_REVALIDATE_IN_BACKGROUND) or when the API fails.
+
+MOVIES_API_URL = 'https://demo.credy.in/api/v1/maya/movies/'
+
+# Requests to the API go through one pooled session per process, keeping up to
+# MOVIES_API_POOL_SIZE connections open. MOVIES_API_TIMEOUT is (connect, read) in seconds.
+
+MOVIES_API_POOL_SIZE = 10
+
+MOVIES_API_TIMEOUT = (3.05, 10)
+
+MOVIES_API_KEEPALIVE = True
+
+MOVIES_CACHE_ALIAS = 'movies'
+
+MOVIES_CACHE_TTL = 300
+
+MOVIES_CACHE_STALE_TTL = 86400
+
+MOVIES_CACHE_REVALIDATE_IN_BACKGROUND = True
+
+# Once `python manage.py sync_catalog` has mirrored the whole catalog, /movies/ pages
+# are served from the local CatalogMovie table instead of the API.
+
+MOVIES_SERVE_FROM_CATALOG = True
+
+# Number of results per page of /movies/search/.
+
+MOVIES_SEARCH_PAGE_SIZE = 10
+
+# Collections and movies are cursor paginated. Clients can ask for up to MAX_PAGE_SIZE
+# items per page with the `page_size` query parameter.
+
+COLLECTION_PAGE_SIZE = 100
+
+MOVIE_PAGE_SIZE = 100
+
+MAX_PAGE_SIZE = 1000
+
+# Number of movies inserted or updated per query when a collection is created or updated.
+
+MOVIE_BATCH_SIZE = 500
+
+# Maximum number of row errors returned by POST /collection/import/. Further failed rows are only counted.
+
+MOVIE_IMPORT_MAX_ERRORS = 100
+
+# Number of rows read from the database and written out at a time by GET /collection/export/.
+
+COLLECTION_EXPORT_CHUNK_SIZE = 2000
+
+# Serialized collection list and detail payloads are cached in COLLECTION_CACHE_ALIAS for
+# up to COLLECTION_CACHE_TTL seconds, keyed by the collection version of their user.
+
+COLLECTION_CACHE_ALIAS = 'collections'
+
+COLLECTION_CACHE_TTL = 300
+
+# CachedJWTAuthentication remembers up to AUTH_TOKEN_CACHE_SIZE validated tokens, and that a
+# user is active for AUTH_ACTIVE_USER_TTL seconds in AUTH_ACTIVE_USER_CACHE_ALIAS. Saving or
+# deleting a user forgets it in that cache, so the cache must be shared by all the workers for
+# them to refuse the user right away; with a per-process cache the other workers wait for the TTL.
+
+AUTH_TOKEN_CACHE_SIZE = 1024
+
+AUTH_ACTIVE_USER_CACHE_ALIAS = 'auth'
+
+AUTH_ACTIVE_USER_TTL = 60
+
+# Password hashes run in PASSWORD_HASH_WORKERS threads; up to PASSWORD_HASH_QUEUE_SIZE more wait
+# at most PASSWORD_HASH_TIMEOUT seconds, further logins and registrations get a 503.
+
+PASSWORD_HASH_WORKERS = 2
+
+PASSWORD_HASH_QUEUE_SIZE = 16
+
+PASSWORD_HASH_TIMEOUT = 5
+
+# Login and registration attempts per minute, after an initial burst, per username and per
+# client IP address. Further attempts get a 429 before any password is hashed.
+
+LOGIN_RATE_PER_USERNAME = 10
+
+LOGIN_BURST_PER_USERNAME = 5
+
+LOGIN_RATE_PER_IP = 60
+
+LOGIN_BURST_PER_IP = 20
+
+LOGIN_RATE_MAX_KEYS = 10000
@@ -0,0 +1,61 @@
+"""
+Benchmarks for the Movie Collection App.
+
+Every benchmark module can be run from the project root with
+`python -m benchmarks.<module> --help`. Benchmarks always run against a throwaway
+SQLite database created with `setup_django()`, never against db.sqlite3.
+"""
+import os
+import tempfile
+
+from dotenv import load_dotenv
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def setup_django(db_path=None, migrate=True):
+    """
+    Configure Django to use a throwaway SQLite database.
+
+    Parameters:
+        db_path (str): Path of the SQLite file to use. A new temporary file is created
+            when not given.
+        migrate (bool): Whether to apply the migrations to the database (default is True).
+
+    Returns:
+        str: The path of the SQLite database in use.
+    """
+    load_dotenv(os.path.join(BASE_DIR, '.env'))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'MovieCollection.settings')
+
+    import django
+    from django.conf import settings
+
+    if db_path is None:
+        fd, db_path = tempfile.mkstemp(prefix='bench-', suffix='.sqlite3')
+        os.close(fd)
+    settings.DATABASES['default']['NAME'] = db_path
+    django.setup()
+
+    from django.db import connections
+    connections.close_all()
+    connections['default'].settings_dict['NAME'] = db_path
+
+    if migrate:
+        from django.core.management import call_command
+        call_command('migrate', verbosity=0)
+    return db_path
+
+
+def remove_database(db_path):
+    """
+    Close the connections to a throwaway SQLite database and delete it, with its WAL files.
+
+    Parameters:
+        db_path (str): Path of the SQLite database.
+    """
+    from django.db import connections
+    connections.close_all()
+    for path in (db_path, f'{db_path}-wal', f'{db_path}-shm'):
+        if os.path.exists(path):
+            os.remove(path)
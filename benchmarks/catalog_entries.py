@@ -0,0 +1,140 @@
+"""
+Size on disk of the movies of many collections holding the same movies, stored
+with one row per movie and collection (the former Movie table) and with shared
+catalog entries.
+
+`--users` users each save a collection of the same `--movies` popular movies, plus
+`--own` movies of their own. The former Movie table and its genre links are
+recreated next to the current tables with raw SQL and filled with the same rows.
+The sizes of the tables and of their indexes are read from SQLite's dbstat, and
+the time to read a page of 100 movies of a collection is measured on both:
+
+    python -m benchmarks.catalog_entries --users 500 --movies 100 --own 10
+"""
+import argparse
+import random
+import time
+import uuid
+
+from benchmarks import remove_database, setup_django
+from benchmarks.datagen import random_genres
+
+FORMER_TABLES = """
+CREATE TABLE former_movie (
+    id integer NOT NULL PRIMARY KEY AUTOINCREMENT,
+    title varchar(100) NOT NULL,
+    description text NOT NULL,
+    genres varchar(255) NULL,
+    uuid char(32) NOT NULL,
+    collection_id bigint NOT NULL,
+    updated_at datetime NOT NULL
+);
+CREATE UNIQUE INDEX former_unique_collection_movie ON former_movie (collection_id, uuid);
+CREATE INDEX former_movie_collection_id ON former_movie (collection_id, id);
+CREATE TABLE former_movie_genre_tags (
+    id integer NOT NULL PRIMARY KEY AUTOINCREMENT,
+    movie_id bigint NOT NULL,
+    genre_id bigint NOT NULL
+);
+CREATE UNIQUE INDEX former_movie_genre_tags_unique ON former_movie_genre_tags (movie_id, genre_id);
+CREATE INDEX former_movie_genre_tags_genre ON former_movie_genre_tags (genre_id);
+"""
+
+FILL_FORMER_TABLES = """
+INSERT INTO former_movie (title, description, genres, uuid, collection_id, updated_at)
+SELECT e.title, e.description, e.genres, m.uuid, m.collection_id, m.updated_at
+FROM collection_movie m JOIN collection_catalogentry e ON e.id = m.entry_id ORDER BY m.id;
+INSERT INTO former_movie_genre_tags (movie_id, genre_id)
+SELECT f.id, g.genre_id
+FROM former_movie f
+JOIN collection_movie m ON m.collection_id = f.collection_id AND m.uuid = f.uuid
+JOIN collection_catalogentry_genre_tags g ON g.catalogentry_id = m.entry_id;
+"""
+
+SCHEMAS = {
+    'per collection': ('former_movie', 'former_movie_genre_tags'),
+    'catalog entries': ('collection_movie', 'collection_catalogentry', 'collection_catalogentry_genre_tags'),
+}
+
+PAGE_QUERIES = {
+    'per collection': 'SELECT title, description, genres, uuid FROM former_movie '
+                      'WHERE collection_id = %s ORDER BY id LIMIT 100',
+    'catalog entries': 'SELECT e.title, e.description, e.genres, m.uuid FROM collection_movie m '
+                       'JOIN collection_catalogentry e ON e.id = m.entry_id '
+                       'WHERE m.collection_id = %s ORDER BY m.id LIMIT 100',
+}
+
+
+def movie(title):
+    words = random.choices(['a', 'story', 'of', 'love', 'war', 'friends', 'city', 'the', 'night', 'family'], k=60)
+    return {'title': title, 'description': ' '.join(words).capitalize() + '.', 'genres': random_genres(),
+            'uuid': uuid.uuid4()}
+
+
+def populate(users, movies, own):
+    """
+    Create `users` users with one collection each of the same `movies` movies and `own` of their own.
+
+    Returns:
+        list: The ids of the collections.
+    """
+    from django.contrib.auth.models import User
+    from collection.models import Collection
+    from collection.utils.entries import add_movies
+
+    popular = [movie(f'Popular {i}') for i in range(movies)]
+    collection_ids = []
+    for n in range(users):
+        user = User.objects.create(username=f'bench{n}')
+        collection = Collection.objects.create(user=user, title='Favourites', description='')
+        add_movies(collection, popular + [movie(f'Own {n}.{i}') for i in range(own)])
+        collection_ids.append(collection.id)
+    return collection_ids
+
+
+def table_sizes(cursor, tables):
+    """
+    Return the bytes taken by the given tables and their indexes.
+    """
+    placeholders = ', '.join(['%s'] * len(tables))
+    cursor.execute(
+        f'SELECT SUM(d.pgsize) FROM dbstat d JOIN sqlite_master s ON s.name = d.name '
+        f'WHERE s.tbl_name IN ({placeholders})', tables,
+    )
+    return cursor.fetchone()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--movies', type=int, default=100)
+    parser.add_argument('--own', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    db_path = setup_django()
+    from django.db import connection
+
+    random.seed(0)
+    collection_ids = populate(args.users, args.movies, args.own)
+    with connection.cursor() as cursor:
+        cursor.connection.executescript(FORMER_TABLES + FILL_FORMER_TABLES)
+        cursor.execute('VACUUM')
+
+        print(f"{'schema':<16} {'rows':>8} {'KiB':>9} {'page read ms':>13}")
+        for schema, tables in SCHEMAS.items():
+            rows = 0
+            for table in tables:
+                cursor.execute(f'SELECT COUNT(*) FROM {table}')
+                rows += cursor.fetchone()[0]
+            start = time.perf_counter()
+            for i in range(args.repeat):
+                cursor.execute(PAGE_QUERIES[schema], [collection_ids[i % len(collection_ids)]])
+                cursor.fetchall()
+            elapsed_ms = (time.perf_counter() - start) * 1000 / args.repeat
+            print(f'{schema:<16} {rows:>8} {table_sizes(cursor, tables) / 1024:>9.0f} {elapsed_ms:>13.2f}')
+    remove_database(db_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Time taken to create a collection of many movies through CollectionSerializer.
+
+Compares the former create(), which validated every movie a second time with its
+own MovieSerializer and inserted the movies outside of the collection's
+transaction, with the current single-validation, batched create():
+
+    python -m benchmarks.collection_create --movies 10000
+"""
+import argparse
+import time
+import uuid
+
+from benchmarks import remove_database, setup_django
+
+
+def revalidating_create(self, validated_data):
+    """
+    The former CollectionSerializer.create, re-validating every movie.
+    """
+    from django.db import transaction
+    from collection.models import Collection
+    from collection.serializers import MovieSerializer
+    from collection.utils.entries import add_movies
+
+    movies_data = validated_data.pop('movies')
+    collection = Collection.objects.create(**validated_data)
+    revalidated = []
+    for movie_data in movies_data:
+        movie_serializer = MovieSerializer(data=movie_data)
+        movie_serializer.is_valid(raise_exception=True)
+        revalidated.append(movie_serializer.validated_data)
+    with transaction.atomic():
+        add_movies(collection, revalidated)
+    return collection
+
+
+def payload(movies):
+    return {
+        'title': 'Benchmark',
+        'description': 'A large collection',
+        'movies': [
+            {'title': f'Movie {i}', 'description': 'A movie. ' * 20, 'genres': 'Drama,Comedy', 'uuid': str(uuid.uuid4())}
+            for i in range(movies)
+        ],
+    }
+
+
+def create(user, data, create_method=None):
+    """
+    Validate and save one collection, returning the seconds spent validating and saving.
+    """
+    from collection.serializers import CollectionSerializer
+
+    serializer = CollectionSerializer(data=data)
+    if create_method is not None:
+        serializer.create = create_method.__get__(serializer)
+    start = time.perf_counter()
+    serializer.is_valid(raise_exception=True)
+    validated = time.perf_counter()
+    serializer.save(user=user)
+    return validated - start, time.perf_counter() - validated
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--movies', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    db_path = setup_django()
+    from django.contrib.auth.models import User
+    user = User.objects.create_user(username='bench', password='bench')
+
+    print(f"{'create':<14} {'validate ms':>12} {'save ms':>10} {'total ms':>10}")
+    for name, create_method in (('revalidating', revalidating_create), ('single-pass', None)):
+        timings = [create(user, payload(args.movies), create_method) for _ in range(args.repeat)]
+        validate_s, save_s = min(timings, key=sum)
+        print(f'{name:<14} {validate_s * 1000:>12.0f} {save_s * 1000:>10.0f} {(validate_s + save_s) * 1000:>10.0f}')
+    remove_database(db_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Request counter increment throughput as shards and worker processes go up.
+
+Each worker process counts requests through its own BufferedRequestCounter for a fixed
+amount of time, flushing to its shard every `--flush-threshold` increments. With a
+threshold of 1 every request hits the database, which shows the write contention
+the shards are meant to spread.
+
+    python -m benchmarks.counter_shards --shards 1 2 4 8 --processes 1 2 4
+"""
+import argparse
+import multiprocessing
+import time
+
+from benchmarks import remove_database, setup_django
+
+
+def worker(db_path, shards, flush_threshold, seconds, results):
+    """
+    Count requests for `seconds` seconds and report the number of increments done.
+    """
+    setup_django(db_path, migrate=False)
+    from django.db import OperationalError
+    from collection.utils.counter import BufferedRequestCounter
+
+    counter = BufferedRequestCounter(flush_interval=float('inf'), flush_threshold=flush_threshold,
+                                     shards=shards, strategy='worker')
+    increments = errors = 0
+    deadline = time.perf_counter() + seconds
+    try:
+        while time.perf_counter() < deadline:
+            try:
+                if counter.increment(flush=False):
+                    counter.flush()
+                increments += 1
+            except OperationalError:
+                errors += 1
+        counter.flush()
+    finally:
+        results.put((increments, errors))
+
+
+def run(shards, processes, flush_threshold, seconds):
+    """
+    Run one benchmark configuration and return its results.
+    """
+    db_path = setup_django()
+    ctx = multiprocessing.get_context('spawn')
+    results = ctx.Queue()
+    workers = [
+        ctx.Process(target=worker, args=(db_path, shards, flush_threshold, seconds, results))
+        for _ in range(processes)
+    ]
+    for process in workers:
+        process.start()
+    counts = [results.get() for _ in workers]
+    for process in workers:
+        process.join()
+
+    from collection.utils.counter import BufferedRequestCounter
+    stored = BufferedRequestCounter().total()
+    remove_database(db_path)
+
+    increments = sum(count for count, _ in counts)
+    return {
+        'shards': shards,
+        'processes': processes,
+        'increments_per_second': increments / seconds,
+        'stored': stored,
+        'lost': increments - stored,
+        'lock_errors': sum(errors for _, errors in counts),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--shards', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--processes', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--flush-threshold', type=int, default=1)
+    parser.add_argument('--seconds', type=float, default=2)
+    args = parser.parse_args()
+
+    print(f"{'shards':>6} {'procs':>5} {'incr/s':>12} {'stored':>10} {'lost':>6} {'lock errors':>11}")
+    for shards in args.shards:
+        for processes in args.processes:
+            result = run(shards, processes, args.flush_threshold, args.seconds)
+            print(f"{result['shards']:>6} {result['processes']:>5} {result['increments_per_second']:>12.0f} "
+                  f"{result['stored']:>10} {result['lost']:>6} {result['lock_errors']:>11}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,197 @@
+"""
+Synthetic data and traffic for the benchmarks.
+
+Creates `--users` users owning `--collections` collections between them, holding
+movies drawn from a catalog of `--movies` movies. Both the owners of the
+collections and the movies in them follow Zipf-like distributions: a few users own
+many collections, and popular movies are in many collections. Genres are drawn
+from a skewed distribution too, Drama being the most common.
+
+With `--traffic`, also writes `--requests` requests against the data to a JSON
+lines file that `python -m benchmarks.replay` can replay. Each line is one request,
+in the style of requests.jsonl:
+
+    {"request_id": "req-000001", "name": "CollectionDetailView", "method": "GET",
+     "path": "/collection/<uuid>/", "user": "user3", "body": null}
+
+`user` is the user the request is authenticated as, if any. The data is written to
+`--db`, which is created and migrated when it does not exist:
+
+    python -m benchmarks.datagen --db bench.sqlite3 --users 200 --collections 1000 \\
+        --movies 5000 --requests 5000 --traffic traffic.jsonl
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import uuid
+
+from benchmarks import setup_django
+
+GENRES = ['Drama', 'Comedy', 'Action', 'Thriller', 'Romance', 'Horror', 'Crime', 'Adventure',
+          'Science Fiction', 'Fantasy', 'Animation', 'Documentary', 'Mystery', 'Family', 'War',
+          'History', 'Music', 'Western', 'TV Movie']
+WEIGHTS = [1 / (rank + 1) for rank in range(len(GENRES))]  # Zipf-like: Drama is the most common
+
+WORDS = ['a', 'story', 'of', 'love', 'war', 'friends', 'city', 'the', 'night', 'family', 'lost', 'home']
+
+PASSWORD = 'bench-password'
+
+# Share of each endpoint in the generated traffic.
+MIX = {
+    'CollectionListView': 35,
+    'CollectionDetailView': 35,
+    'get_movies': 15,
+    'login': 10,
+    'register': 5,
+}
+
+MOVIE_PAGES = 50  # pages of /movies/ requested, the first ones most often
+
+
+def random_genres():
+    return ','.join(dict.fromkeys(random.choices(GENRES, WEIGHTS, k=random.randint(0, 3))))
+
+
+def zipf_weights(n):
+    return [1 / (rank + 1) for rank in range(n)]
+
+
+def random_uuid():
+    return uuid.UUID(int=random.getrandbits(128), version=4)  # reproducible with random.seed()
+
+
+def random_movie(n):
+    return {
+        'uuid': random_uuid(),
+        'title': f'Movie {n}',
+        'description': ' '.join(random.choices(WORDS, k=random.randint(10, 40))).capitalize() + '.',
+        'genres': random_genres(),
+    }
+
+
+def generate(users, collections, movies, per_collection=20, password=PASSWORD):
+    """
+    Create users, collections and movies with skewed distributions.
+
+    Every user gets the same password, hashed once: hashing it for each user would
+    take most of the time of the generation.
+
+    Parameters:
+        users (int): Number of users.
+        collections (int): Number of collections, spread over the users.
+        movies (int): Number of distinct movies in the catalog.
+        per_collection (int): Average number of movies in a collection (default is 20).
+        password (str): Password of the users.
+
+    Returns:
+        dict: The usernames (`users`) and the uuids of the collections of every user
+            (`collections`), as strings.
+    """
+    from django.contrib.auth.hashers import make_password
+    from django.contrib.auth.models import User
+    from collection.models import Collection
+    from collection.utils.entries import add_movies
+
+    encoded = make_password(password)
+    usernames = [f'user{n}' for n in range(users)]
+    User.objects.bulk_create([User(username=username, password=encoded) for username in usernames])
+    owners = list(User.objects.filter(username__in=usernames).order_by('id'))
+
+    catalog = [random_movie(n) for n in range(movies)]
+    movie_weights = zipf_weights(movies)
+    owned = {username: [] for username in usernames}
+    for user in random.choices(owners, zipf_weights(users), k=collections):
+        collection = Collection.objects.create(
+            user=user, title=f'{random.choice(GENRES)} night', description=' '.join(random.choices(WORDS, k=12)),
+        )
+        size = min(movies, max(1, int(random.expovariate(1 / per_collection))))
+        picked = {}
+        while len(picked) < size:
+            movie = random.choices(catalog, movie_weights)[0]
+            picked[movie['uuid']] = movie
+        add_movies(collection, list(picked.values()))
+        owned[user.username].append(str(collection.uuid))
+    return {'users': usernames, 'collections': owned}
+
+
+def generate_traffic(data, requests, mix=None, password=PASSWORD):
+    """
+    Return synthetic requests against generated data.
+
+    Authenticated requests come from users picked with a Zipf-like distribution, so
+    a few users send most of them; detail requests pick one of the user's collections.
+
+    Parameters:
+        data (dict): Users and collections, as returned by generate().
+        requests (int): Number of requests.
+        mix (dict): Share of each endpoint in the requests (default is MIX).
+        password (str): Password of the users, sent by logins.
+
+    Returns:
+        list: The requests, as dicts with request_id, name, method, path, user and body.
+    """
+    mix = mix or MIX
+    users = data['users']
+    owners = [username for username in users if data['collections'][username]]
+    user_weights = zipf_weights(len(users))
+    owner_weights = zipf_weights(len(owners))
+    page_weights = zipf_weights(MOVIE_PAGES)
+    new_users = itertools.count()
+    prefix = random_uuid().hex[:8]
+
+    traffic = []
+    for n, name in enumerate(random.choices(list(mix), list(mix.values()), k=requests), start=1):
+        request = {'request_id': f'req-{n:06d}', 'name': name, 'method': 'GET', 'path': None,
+                   'user': None, 'body': None}
+        if name == 'register':
+            request.update(method='POST', path='/register/',
+                           body={'username': f'new-{prefix}-{next(new_users)}', 'password': password})
+        elif name == 'login':
+            request.update(method='POST', path='/login/',
+                           body={'username': random.choices(users, user_weights)[0], 'password': password})
+        elif name == 'get_movies':
+            page = random.choices(range(1, MOVIE_PAGES + 1), page_weights)[0]
+            request.update(path=f'/movies/?page={page}', user=random.choices(users, user_weights)[0])
+        elif name == 'CollectionListView':
+            request.update(path='/collection/', user=random.choices(users, user_weights)[0])
+        elif owners:
+            user = random.choices(owners, owner_weights)[0]
+            request.update(path=f"/collection/{random.choice(data['collections'][user])}/", user=user)
+        else:
+            continue
+        traffic.append(request)
+    return traffic
+
+
+def write_traffic(path, traffic):
+    with open(path, 'w') as file:
+        for request in traffic:
+            file.write(json.dumps(request) + '\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', required=True)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--collections', type=int, default=1000)
+    parser.add_argument('--movies', type=int, default=5000)
+    parser.add_argument('--per-collection', type=int, default=20)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--traffic')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    setup_django(args.db, migrate=True)
+    random.seed(args.seed)
+    data = generate(args.users, args.collections, args.movies, args.per_collection)
+    print(f'{args.users} users, {args.collections} collections and {args.movies} movies written to {os.path.abspath(args.db)}')
+    if args.traffic:
+        traffic = generate_traffic(data, args.requests)
+        write_traffic(args.traffic, traffic)
+        print(f'{len(traffic)} requests written to {args.traffic}')
+
+
+if __name__ == '__main__':
+    main()
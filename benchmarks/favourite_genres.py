@@ -0,0 +1,95 @@
+"""
+Latency and peak memory of the ways to compute a user's top 3 genres.
+
+Creates one user owning `--movies` movies spread over collections, with genres
+drawn from a skewed distribution, then times:
+
+- python_loop: the former CollectionListView loop over Movie instances
+- values_list: only the genres column, streamed in chunks
+- sql_aggregation: csv_genre_counts(), split and counted by the database
+- genre_stats: top_genres(), one indexed query on UserGenreStat
+
+    python -m benchmarks.favourite_genres --movies 100000
+"""
+import argparse
+import random
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+
+from benchmarks import remove_database, setup_django
+from benchmarks.datagen import random_genres
+
+
+def python_loop(user):
+    from collection.models import Movie
+    genre_count = {}
+    for movie in Movie.objects.filter(collection__user=user):
+        for genre in (movie.genres or '').split(','):
+            if genre != '' and genre != ' ' and genre is not None:
+                genre_count[genre] = genre_count.get(genre, 0) + 1
+    return [genre for genre, _ in sorted(genre_count.items(), key=lambda x: x[1], reverse=True)[:3]]
+
+
+def values_list(user):
+    from collection.models import Movie
+    from collection.utils.genres import parse_genres
+    counts = Counter()
+    for genres in Movie.objects.filter(collection__user=user).values_list('entry__genres', flat=True).iterator(chunk_size=2000):
+        counts.update(parse_genres(genres))
+    return [genre for genre, _ in counts.most_common(3)]
+
+
+def sql_aggregation(user):
+    from collection.utils.genres import csv_genre_counts
+    return [genre for _, genre, _ in csv_genre_counts(user.id, limit=3)]
+
+
+def genre_stats(user):
+    from collection.utils.genres import top_genres
+    return top_genres(user)
+
+
+def populate(movies, per_collection):
+    from django.contrib.auth.models import User
+    from collection.models import Collection
+    from collection.utils.entries import add_movies
+
+    user = User.objects.create_user(username='bench', password='bench')
+    for start in range(0, movies, per_collection):
+        collection = Collection.objects.create(user=user, title=f'Collection {start}', description='')
+        add_movies(collection, [
+            {'title': f'Movie {i}', 'description': 'A movie. ' * 20, 'genres': random_genres(), 'uuid': uuid.uuid4()}
+            for i in range(start, min(start + per_collection, movies))
+        ])
+    return user
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--movies', type=int, default=100000)
+    parser.add_argument('--per-collection', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    db_path = setup_django()
+    random.seed(0)
+    user = populate(args.movies, args.per_collection)
+
+    print(f"{'method':<16} {'ms':>10} {'peak KiB':>10}  top 3")
+    for method in (python_loop, values_list, sql_aggregation, genre_stats):
+        timings = []
+        for _ in range(args.repeat):
+            tracemalloc.start()
+            start = time.perf_counter()
+            top = method(user)
+            timings.append((time.perf_counter() - start) * 1000)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        print(f'{method.__name__:<16} {min(timings):>10.1f} {peak / 1024:>10.0f}  {", ".join(top)}')
+    remove_database(db_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Per-request latency of a new retry session per request versus one pooled session.
+
+Runs a local stub of the movie API speaking HTTP/1.1 with keep-alive and sends the
+same requests to it, first building a new session for every request (what get_movies
+used to do), then through one session shared by all the threads.
+
+    python -m benchmarks.http_session --requests 2000 --threads 8
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from collection.utils.util import create_retry_session
+
+PAGE = json.dumps({
+    'count': 10, 'next': None, 'previous': None,
+    'results': [{'title': f'Movie {i}', 'description': '', 'genres': '', 'uuid': ''} for i in range(10)],
+}).encode()
+
+
+class StubMoviesHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(PAGE)))
+        self.end_headers()
+        self.wfile.write(PAGE)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server():
+    """
+    Start the stub movie API in a background thread and return it.
+    """
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubMoviesHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def measure(get, url, requests, threads):
+    """
+    Send `requests` GET requests with `threads` threads and return their latencies in ms.
+    """
+    def timed(_):
+        start = time.perf_counter()
+        get(url).raise_for_status()
+        return (time.perf_counter() - start) * 1000
+
+    with ThreadPoolExecutor(threads) as executor:
+        return list(executor.map(timed, range(requests)))
+
+
+def report(name, latencies):
+    latencies = sorted(latencies)
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(f'{name:<22} mean {statistics.mean(latencies):7.3f}ms  '
+          f'p50 {statistics.median(latencies):7.3f}ms  p99 {p99:7.3f}ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=8)
+    args = parser.parse_args()
+
+    server = start_stub_server()
+    url = f'http://127.0.0.1:{server.server_port}/api/v1/maya/movies/?page=1'
+
+    def new_session_get(url):
+        with create_retry_session() as session:
+            return session.get(url, timeout=(3.05, 10))
+
+    shared = create_retry_session(pool_maxsize=args.threads, timeout=(3.05, 10))
+    report('session per request', measure(new_session_get, url, args.requests, args.threads))
+    report('shared pooled session', measure(shared.get, url, args.requests, args.threads))
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
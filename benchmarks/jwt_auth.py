@@ -0,0 +1,55 @@
+"""
+Authentication overhead per request of simplejwt's JWTAuthentication and of
+CachedJWTAuthentication.
+
+Authenticates the same access token `--requests` times with each class and
+reports the time and the number of queries per request:
+
+    python -m benchmarks.jwt_auth --requests 5000
+"""
+import argparse
+import time
+
+from benchmarks import remove_database, setup_django
+
+
+def measure(authentication, request, requests):
+    """
+    Authenticate `request` `requests` times, returning microseconds and queries per request.
+    """
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    with CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        for _ in range(requests):
+            authentication.authenticate(request)
+        elapsed = time.perf_counter() - start
+    return elapsed / requests * 1e6, len(queries) / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=5000)
+    args = parser.parse_args()
+
+    db_path = setup_django()
+    from django.contrib.auth.models import User
+    from django.test import RequestFactory
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+    from rest_framework_simplejwt.tokens import RefreshToken
+    from collection.authentication import CachedJWTAuthentication
+
+    user = User.objects.create_user(username='bench', password='bench')
+    token = RefreshToken.for_user(user).access_token
+    request = RequestFactory().get('/collection/', HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    print(f"{'authentication':<26} {'us/request':>11} {'queries/request':>16}")
+    for authentication in (JWTAuthentication(), CachedJWTAuthentication()):
+        micros, queries = measure(authentication, request, args.requests)
+        print(f'{type(authentication).__name__:<26} {micros:>11.1f} {queries:>16.3f}')
+    remove_database(db_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+Login throughput and p99 latency of concurrent GET /collection/ reads during a login storm.
+
+Serves the app from a threaded WSGI server in this process. `--logins` threads log
+in as fast as they can while `--readers` threads read their collections, for
+`--seconds` seconds per run. The password hash pool is sized to the number of
+login threads (unbounded, as when every request hashed in its own thread) and then
+to `--workers` threads. Rate limits are lifted so every login is hashed:
+
+    python -m benchmarks.login_storm --logins 16 --readers 4 --workers 2
+"""
+import argparse
+import socketserver
+import threading
+import time
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+import requests
+
+from benchmarks import remove_database, setup_django
+
+
+class ThreadingWSGIServer(socketserver.ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def percentile(values, percent):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100))] if values else None
+
+
+def storm(url, token, logins, readers, seconds):
+    """
+    Run the login and reader threads, returning the logins per second and the read latencies in ms.
+    """
+    stop = time.monotonic() + seconds
+    login_counts, latencies = [], []
+
+    def login():
+        session, count = requests.Session(), 0
+        while time.monotonic() < stop:
+            response = session.post(f'{url}/login/', data={'username': 'bench', 'password': 'bench'})
+            count += response.status_code == 200
+        login_counts.append(count)
+
+    def read():
+        session = requests.Session()
+        session.headers['Authorization'] = f'Bearer {token}'
+        while time.monotonic() < stop:
+            start = time.perf_counter()
+            session.get(f'{url}/collection/').raise_for_status()
+            latencies.append((time.perf_counter() - start) * 1000)
+            time.sleep(0.01)
+
+    threads = [threading.Thread(target=login) for _ in range(logins)]
+    threads += [threading.Thread(target=read) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(login_counts) / seconds, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--logins', type=int, default=16)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=10)
+    args = parser.parse_args()
+
+    db_path = setup_django()
+    from django.conf import settings
+    from django.contrib.auth.models import User
+    from django.core.wsgi import get_wsgi_application
+    from rest_framework_simplejwt.tokens import RefreshToken
+    from collection.models import Collection
+    from collection.utils import passwords
+    from collection.utils.ratelimit import ip_limiter, username_limiter
+
+    settings.ALLOWED_HOSTS = ['*']
+    for limiter in (ip_limiter, username_limiter):
+        limiter.burst = limiter.rate = 10 ** 9
+    user = User.objects.create_user(username='bench', password='bench')
+    for i in range(20):
+        Collection.objects.create(user=user, title=f'Collection {i}', description='A collection')
+    token = str(RefreshToken.for_user(user).access_token)
+
+    server = make_server('127.0.0.1', 0, get_wsgi_application(),
+                         server_class=ThreadingWSGIServer, handler_class=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_port}'
+
+    print(f"{'hash workers':<14} {'logins/s':>9} {'reads':>7} {'read p50 ms':>12} {'read p99 ms':>12}")
+    for workers in (args.logins, args.workers):
+        passwords.hash_pool = passwords.PasswordHashPool(workers=workers, queue_size=args.logins, timeout=60)
+        logins_per_second, latencies = storm(url, token, args.logins, args.readers, args.seconds)
+        print(f'{workers:<14} {logins_per_second:>9.1f} {len(latencies):>7} '
+              f'{percentile(latencies, 50):>12.1f} {percentile(latencies, 99):>12.1f}')
+
+    server.shutdown()
+    remove_database(db_path)
+
+
+if __name__ == '__main__':
+    main()
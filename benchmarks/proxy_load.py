@@ -0,0 +1,260 @@
+"""
+Throughput and latency of GET /movies/ under WSGI and under ASGI, against a slow
+stub of the movie API.
+
+The stub answers every request after `--delay` seconds. `--requests` requests, for
+a different page each so that none is served from the page cache, are sent with
+`--concurrency` in flight at a time to:
+
+- a WSGI server with `--threads` worker threads, serving the sync view /movies/
+  used to be (each request holds a thread for the whole upstream round trip),
+- the same WSGI server serving the async view,
+- uvicorn, serving the async view from one event loop.
+
+The stub and the servers run in processes of their own, so that they do not
+compete with the load generator for the GIL:
+
+    python -m benchmarks.proxy_load --requests 2000 --concurrency 500 --threads 32 --delay 1
+"""
+import argparse
+import asyncio
+import json
+import socketserver
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+
+from benchmarks import remove_database, setup_django
+
+PAGE = json.dumps({
+    'count': 10, 'next': None, 'previous': None,
+    'results': [{'title': f'Movie {i}', 'description': '', 'genres': '', 'uuid': ''} for i in range(10)],
+}).encode()
+RESPONSE = (
+    b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: '
+    + str(len(PAGE)).encode() + b'\r\n\r\n' + PAGE
+)
+
+
+def serve_stub(delay):
+    """
+    Serve a stub movie API answering after `delay` seconds, printing its port.
+    """
+    async def handle(reader, writer):
+        try:
+            while True:
+                await reader.readuntil(b'\r\n\r\n')
+                await asyncio.sleep(delay)
+                writer.write(RESPONSE)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve():
+        server = await asyncio.start_server(handle, '127.0.0.1', 0, backlog=4096)
+        print(server.sockets[0].getsockname()[1], flush=True)
+        await server.serve_forever()
+
+    asyncio.run(serve())
+
+
+class PooledWSGIServer(WSGIServer):
+    """
+    WSGI server handling requests in a fixed number of threads, like gunicorn's gthread workers.
+    """
+    request_queue_size = 4096
+
+    def __init__(self, address, handler_class, threads):
+        super().__init__(address, handler_class)
+        self.executor = ThreadPoolExecutor(threads)
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self.process_request_thread, request, client_address)
+
+    process_request_thread = socketserver.ThreadingMixIn.process_request_thread
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_wsgi(threads):
+    """
+    Serve the project with `threads` WSGI worker threads, printing the port.
+    """
+    from django.core.wsgi import get_wsgi_application
+
+    server = PooledWSGIServer(('127.0.0.1', 0), QuietHandler, threads)
+    server.set_app(get_wsgi_application())
+    print(server.server_port, flush=True)
+    server.serve_forever()
+
+
+def serve_asgi():
+    """
+    Serve the project with uvicorn, printing the port.
+    """
+    import uvicorn
+    from django.core.asgi import get_asgi_application
+
+    config = uvicorn.Config(get_asgi_application(), host='127.0.0.1', port=0, lifespan='off',
+                            log_level='warning', backlog=4096)
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    print(server.servers[0].sockets[0].getsockname()[1], flush=True)
+    thread.join()
+
+
+def spawn(*args, module='benchmarks.proxy_load'):
+    """
+    Run a benchmark module (this one by default) with `args` in a subprocess,
+    returning the process and the port it serves on.
+    """
+    process = subprocess.Popen([sys.executable, '-m', module, *map(str, args)],
+                               stdout=subprocess.PIPE, text=True)
+    return process, int(process.stdout.readline())
+
+
+def sync_movies_urlconf():
+    """
+    Return a URLconf adding the sync version of get_movies at /movies-sync/ to the project's.
+    """
+    from django.urls import include, path
+    from rest_framework.decorators import api_view, permission_classes
+    from rest_framework.permissions import IsAuthenticated
+    from rest_framework.response import Response
+    from collection.utils.movies import movie_page_cache
+
+    @api_view(['GET'])
+    @permission_classes([IsAuthenticated])
+    def get_movies_sync(request):
+        data = dict(movie_page_cache.get(int(request.query_params.get('page', 1))))
+        data['data'] = data.pop('results', [])
+        return Response(data)
+
+    class URLConf:
+        urlpatterns = [
+            path('movies-sync/', get_movies_sync),
+            path('', include('MovieCollection.urls')),
+        ]
+    return URLConf
+
+
+async def load(port, path, token, requests, concurrency, first_page):
+    """
+    Send `requests` requests for distinct pages over `concurrency` keep-alive connections.
+
+    The requests are written by hand over asyncio streams, which costs the load
+    generator far less CPU than an HTTP client library would.
+
+    Returns:
+        tuple: The number of requests per second, the latencies in ms of the successful
+            requests and the number of failed requests.
+    """
+    pages = iter(range(first_page, first_page + requests))
+    latencies, failures = [], 0
+
+    async def worker():
+        nonlocal failures
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        for page in pages:
+            start = time.perf_counter()
+            writer.write(
+                f'GET {path}?page={page} HTTP/1.1\r\nHost: 127.0.0.1\r\n'
+                f'Authorization: Bearer {token}\r\n\r\n'.encode()
+            )
+            head = await reader.readuntil(b'\r\n\r\n')
+            length = int(next(
+                line.split(b':')[1] for line in head.split(b'\r\n') if line.lower().startswith(b'content-length')
+            ))
+            await reader.readexactly(length)
+            if head[9:12] == b'200':
+                latencies.append((time.perf_counter() - start) * 1000)
+            else:
+                failures += 1
+            if head.startswith(b'HTTP/1.0') or b'connection: close' in head.lower():
+                writer.close()
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return requests / elapsed, latencies, failures
+
+
+def percentile(values, percent):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100))] if values else float('nan')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=500)
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--delay', type=float, default=1)
+    parser.add_argument('--serve', choices=['stub', 'wsgi', 'asgi'], help=argparse.SUPPRESS)
+    parser.add_argument('--db', help=argparse.SUPPRESS)
+    parser.add_argument('--upstream', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve == 'stub':
+        return serve_stub(args.delay)
+
+    db_path = setup_django(args.db, migrate=not args.db)
+    from django.conf import settings
+
+    if args.serve:
+        settings.ALLOWED_HOSTS = ['*']
+        settings.MOVIES_API_URL = args.upstream
+        settings.MOVIES_API_POOL_SIZE = args.concurrency
+        settings.ROOT_URLCONF = sync_movies_urlconf()
+        return serve_wsgi(args.threads) if args.serve == 'wsgi' else serve_asgi()
+
+    from django.contrib.auth.models import User
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    user = User.objects.create_user(username='bench', password='bench')
+    token = str(RefreshToken.for_user(user).access_token)
+    runs = [
+        (f'WSGI ({args.threads} threads), sync view', 'wsgi', '/movies-sync/'),
+        (f'WSGI ({args.threads} threads), async view', 'wsgi', '/movies/'),
+        ('ASGI (uvicorn), async view', 'asgi', '/movies/'),
+    ]
+    processes = []
+    try:
+        stub, stub_port = spawn('--serve', 'stub', '--delay', args.delay)
+        processes.append(stub)
+        upstream = f'http://127.0.0.1:{stub_port}/'
+
+        print(f"{'server':<34} {'requests/s':>11} {'p50 ms':>9} {'p99 ms':>9} {'failed':>7}")
+        for run, (name, serve, path) in enumerate(runs):
+            server, port = spawn('--serve', serve, '--db', db_path, '--upstream', upstream,
+                                 '--threads', args.threads, '--concurrency', args.concurrency)
+            processes.append(server)
+            rate, latencies, failures = asyncio.run(
+                load(port, path, token, args.requests, args.concurrency, first_page=run * args.requests + 1)
+            )
+            print(f'{name:<34} {rate:>11.1f} {percentile(latencies, 50):>9.1f} '
+                  f'{percentile(latencies, 99):>9.1f} {failures:>7}')
+            server.terminate()
+            server.wait()
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+        remove_database(db_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,323 @@
+"""
+Replay recorded traffic against the app and report, for every endpoint, the
+throughput, latency percentiles and queries per request.
+
+The traffic is a JSON lines file in the format written by benchmarks.datagen, one
+request per line. Authenticated requests are sent with an access token minted for
+their `user`. `--concurrency` threads send the requests in the order of the file:
+
+- `--target client` (default): through Django's test client, in this process. The
+  queries of every request are counted.
+- `--target live`: over HTTP to a WSGI server with `--threads` worker threads,
+  started in a process of its own. Queries are not counted.
+- `--url`: over HTTP to a server already running, e.g. `python manage.py runserver`,
+  serving the database given with `--db`. Queries are not counted, and rate limits
+  and the movie API are the server's own.
+
+Without `--traffic`, data and traffic are generated with benchmarks.datagen in a
+throwaway database. /movies/ is served from a stub of the movie API answering after
+`--stub-delay` seconds, and login and registration rate limits are lifted.
+
+Results are saved as JSON with `--output`. With `--baseline`, they are compared
+with earlier results, and the run fails when an endpoint got more than
+`--tolerance` slower or makes more queries:
+
+    python -m benchmarks.replay --requests 2000 --concurrency 4 --output results.json
+    python -m benchmarks.replay --requests 2000 --concurrency 4 --baseline results.json
+"""
+import argparse
+import datetime
+import json
+import random
+import subprocess
+import sys
+import threading
+import time
+
+from benchmarks import BASE_DIR, remove_database, setup_django
+from benchmarks.proxy_load import percentile, serve_wsgi, spawn
+
+ENDPOINTS = ['register', 'login', 'get_movies', 'CollectionListView', 'CollectionDetailView']
+
+
+def read_traffic(path):
+    with open(path) as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def prepare(upstream):
+    """
+    Point the movie API at the stub, and lift the rate limits so every request is served.
+    """
+    from django.conf import settings
+    from collection.utils.ratelimit import ip_limiter, username_limiter
+
+    settings.ALLOWED_HOSTS = ['*']
+    if upstream:
+        settings.MOVIES_API_URL = upstream
+    for limiter in (ip_limiter, username_limiter):
+        limiter.burst = limiter.rate = 10 ** 9
+
+
+def mint_tokens(traffic):
+    """
+    Return an access token for every user of the traffic, by username.
+    """
+    from django.contrib.auth.models import User
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    usernames = {request['user'] for request in traffic if request.get('user')}
+    return {user.username: str(AccessToken.for_user(user)) for user in User.objects.filter(username__in=usernames)}
+
+
+class ClientTarget:
+    """
+    Sends requests through Django's test client, counting their queries.
+    """
+
+    def __init__(self):
+        self.local = threading.local()
+
+    def send(self, request, token):
+        from django.db import connection
+        from django.test import Client
+        from django.test.utils import CaptureQueriesContext
+
+        if not hasattr(self.local, 'client'):
+            self.local.client = Client(raise_request_exception=False)
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {token}'} if token else {}
+        body = json.dumps(request['body']) if request.get('body') is not None else ''
+        with CaptureQueriesContext(connection) as queries:
+            response = self.local.client.generic(request['method'], request['path'], body,
+                                                 content_type='application/json', **headers)
+        return response.status_code, len(queries)
+
+    def close(self):
+        from django.db import connections
+        connections.close_all()
+
+
+class LiveTarget:
+    """
+    Sends requests over HTTP to a running server.
+    """
+
+    def __init__(self, url):
+        self.url = url.rstrip('/')
+        self.local = threading.local()
+
+    def send(self, request, token):
+        import requests
+
+        if not hasattr(self.local, 'session'):
+            self.local.session = requests.Session()
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        response = self.local.session.request(request['method'], self.url + request['path'],
+                                              json=request.get('body'), headers=headers)
+        return response.status_code, None
+
+    def close(self):
+        if hasattr(self.local, 'session'):
+            self.local.session.close()
+
+
+def replay(traffic, target, tokens, concurrency):
+    """
+    Send the requests of the traffic from `concurrency` threads.
+
+    Returns:
+        tuple: The (name, status code, latency in ms, number of queries) of every request,
+            and the number of seconds the replay took.
+    """
+    requests = iter(traffic)
+    lock = threading.Lock()
+    records = []
+
+    def worker():
+        try:
+            while True:
+                with lock:
+                    request = next(requests, None)
+                if request is None:
+                    return
+                start = time.perf_counter()
+                status_code, queries = target.send(request, tokens.get(request.get('user')))
+                records.append((request['name'], status_code, (time.perf_counter() - start) * 1000, queries))
+        finally:
+            target.close()
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return records, time.perf_counter() - start
+
+
+def summarize(records, elapsed):
+    """
+    Return the throughput, latency percentiles and queries per request of every endpoint.
+
+    The throughput of an endpoint is its number of requests over the duration of the
+    whole replay, so the throughputs of the endpoints add up to the overall one.
+    """
+    endpoints = {}
+    names = [name for name in ENDPOINTS if any(record[0] == name for record in records)]
+    names += sorted({record[0] for record in records} - set(names))
+    for name in names + ['overall']:
+        selected = [record for record in records if name in (record[0], 'overall')]
+        latencies = [record[2] for record in selected]
+        queries = [record[3] for record in selected if record[3] is not None]
+        endpoints[name] = {
+            'requests': len(selected),
+            'errors': sum(record[1] >= 400 for record in selected),
+            'throughput': round(len(selected) / elapsed, 2),
+            'latency_ms': {
+                'mean': round(sum(latencies) / len(latencies), 2),
+                **{f'p{percent}': round(percentile(latencies, percent), 2) for percent in (50, 90, 99)},
+                'max': round(max(latencies), 2),
+            },
+            'queries_per_request': round(sum(queries) / len(queries), 2) if queries else None,
+        }
+    return endpoints
+
+
+def compare(endpoints, baseline, tolerance):
+    """
+    Return the regressions of the endpoints against baseline results.
+
+    An endpoint regressed when a latency percentile or its queries per request grew
+    by more than `tolerance`, or its throughput shrank by more than `tolerance`.
+    """
+    regressions = []
+    for name, result in endpoints.items():
+        before = baseline['endpoints'].get(name)
+        if not before:
+            continue
+        checks = [(f'latency {percent}', result['latency_ms'][percent], before['latency_ms'][percent], 1)
+                  for percent in ('p50', 'p90', 'p99')]
+        checks.append(('queries per request', result['queries_per_request'], before['queries_per_request'], 1))
+        checks.append(('throughput', result['throughput'], before['throughput'], -1))
+        for metric, value, previous, sign in checks:
+            if value is None or not previous:
+                continue
+            change = (value - previous) / previous
+            if sign * change > tolerance:
+                regressions.append(f'{name}: {metric} {previous} -> {value} ({change:+.0%})')
+    return regressions
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--traffic')
+    parser.add_argument('--db')
+    parser.add_argument('--target', choices=['client', 'live'], default='client')
+    parser.add_argument('--url')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--stub-delay', type=float, default=0.05)
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--collections', type=int, default=500)
+    parser.add_argument('--movies', type=int, default=2000)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output')
+    parser.add_argument('--baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--upstream', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        setup_django(args.db, migrate=False)
+        prepare(args.upstream)
+        return serve_wsgi(args.threads)
+    if (args.traffic or args.url) and not args.db:
+        parser.error('--traffic and --url need the --db the traffic was generated against')
+    if args.url and not args.traffic:
+        parser.error('--url needs --traffic')
+
+    db_path = setup_django(args.db, migrate=not args.db)
+    if args.traffic:
+        traffic = read_traffic(args.traffic)
+    else:
+        from benchmarks.datagen import generate, generate_traffic
+
+        random.seed(args.seed)
+        traffic = generate_traffic(generate(args.users, args.collections, args.movies), args.requests)
+    tokens = mint_tokens(traffic)
+
+    processes = []
+    try:
+        upstream = None
+        if not args.url:
+            stub, stub_port = spawn('--serve', 'stub', '--delay', args.stub_delay)
+            processes.append(stub)
+            upstream = f'http://127.0.0.1:{stub_port}/'
+        if args.url:
+            target = LiveTarget(args.url)
+        elif args.target == 'live':
+            server, port = spawn('--serve', '--db', db_path, '--upstream', upstream, '--threads', args.threads,
+                                 module='benchmarks.replay')
+            processes.append(server)
+            target = LiveTarget(f'http://127.0.0.1:{port}')
+        else:
+            prepare(upstream)
+            target = ClientTarget()
+        records, elapsed = replay(traffic, target, tokens, args.concurrency)
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+        if not args.db:
+            remove_database(db_path)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+    endpoints = summarize(records, elapsed)
+    print(f"{'endpoint':<22} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50 ms':>8} {'p90 ms':>8} "
+          f"{'p99 ms':>8} {'queries':>8}")
+    for name, result in endpoints.items():
+        latency, queries = result['latency_ms'], result['queries_per_request']
+        print(f"{name:<22} {result['requests']:>9} {result['errors']:>7} {result['throughput']:>8.1f} "
+              f"{latency['p50']:>8.1f} {latency['p90']:>8.1f} {latency['p99']:>8.1f} "
+              f"{'-' if queries is None else f'{queries:.1f}':>8}")
+
+    if args.output:
+        results = {
+            'revision': git_revision(),
+            'date': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+            'target': args.url or args.target,
+            'concurrency': args.concurrency,
+            'requests': len(records),
+            'seconds': round(elapsed, 2),
+            'endpoints': endpoints,
+        }
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+        print(f'Results saved to {args.output}')
+
+    if baseline:
+        if baseline.get('target') != (args.url or args.target):
+            print(f"Warning: the baseline ran against {baseline.get('target')}, not {args.url or args.target}")
+        regressions = compare(endpoints, baseline, args.tolerance)
+        for regression in regressions:
+            print(f'Regression: {regression}')
+        if regressions:
+            sys.exit(1)
+        print(f'No regression against {args.baseline}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+"""
+Read and write throughput of worker processes sharing the SQLite database, with
+SQLite's and Django's defaults and with the tuned settings.
+
+`--processes` worker processes serve simulated requests for `--seconds` seconds
+each. A share `--write-ratio` of the requests writes a request counter increment to
+the database (as the counter does when it flushes every request), and the others
+read a collection and a page of its movies. Connections are closed or kept after
+every request as Django does at the end of a request:
+
+- defaults: rollback journal, synchronous=FULL, Django's 5s busy timeout, and a new
+  connection for every request (CONN_MAX_AGE = 0)
+- tuned: settings.SQLITE_PRAGMAS (WAL, synchronous=NORMAL...) and persistent
+  connections
+
+    python -m benchmarks.sqlite_concurrency --processes 1 2 4 8 --write-ratio 0.2
+"""
+import argparse
+import multiprocessing
+import random
+import time
+
+from benchmarks import remove_database, setup_django
+from benchmarks.proxy_load import percentile
+
+CONFIGS = {
+    'defaults': ({'journal_mode': 'DELETE', 'synchronous': 'FULL'}, 0),
+    'tuned': (None, 600),  # SQLITE_PRAGMAS of the settings
+}
+
+
+def configure(pragmas, conn_max_age):
+    """
+    Set the PRAGMAs and CONN_MAX_AGE of the connections opened from now on.
+    """
+    from django.conf import settings
+    from django.db import connections
+
+    if pragmas is not None:
+        settings.SQLITE_PRAGMAS = pragmas
+    connections['default'].settings_dict['CONN_MAX_AGE'] = conn_max_age
+
+
+def worker(db_path, config, write_ratio, seconds, collection_ids, results):
+    """
+    Serve requests for `seconds` seconds and report the reads, the writes, the lock
+    errors and the read latencies in ms.
+    """
+    setup_django(db_path, migrate=False)
+    configure(*CONFIGS[config])
+    from django.db import OperationalError, close_old_connections
+    from collection.models import Collection, Movie
+    from collection.utils.counter import BufferedRequestCounter
+
+    counter = BufferedRequestCounter(flush_interval=float('inf'), flush_threshold=1)
+    reads = writes = errors = 0
+    latencies = []
+    deadline = time.perf_counter() + seconds
+    try:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                if random.random() < write_ratio:
+                    if counter.increment(flush=False):
+                        counter.flush()
+                    writes += 1
+                else:
+                    collection = Collection.objects.get(id=random.choice(collection_ids))
+                    list(Movie.objects.filter(collection=collection).order_by('id')[:50])
+                    reads += 1
+                    latencies.append((time.perf_counter() - start) * 1000)
+            except OperationalError:
+                errors += 1
+            close_old_connections()  # as at the end of every request
+    finally:
+        results.put((reads, writes, errors, latencies))
+
+
+def run(config, processes, write_ratio, seconds):
+    """
+    Run one benchmark configuration on a new database and return its results.
+    """
+    db_path = setup_django()
+    from django.conf import settings
+    from django.db import connection, connections
+    from collection.models import Collection
+    from benchmarks.datagen import generate
+
+    random.seed(0)
+    generate(users=20, collections=100, movies=500)
+    collection_ids = list(Collection.objects.values_list('id', flat=True))
+    pragmas = CONFIGS[config][0] or settings.SQLITE_PRAGMAS
+    with connection.cursor() as cursor:
+        cursor.execute(f"PRAGMA journal_mode = {pragmas['journal_mode']}")  # kept in the file
+    connections.close_all()
+
+    ctx = multiprocessing.get_context('spawn')
+    results = ctx.Queue()
+    workers = [
+        ctx.Process(target=worker, args=(db_path, config, write_ratio, seconds, collection_ids, results))
+        for _ in range(processes)
+    ]
+    for process in workers:
+        process.start()
+    counts = [results.get() for _ in workers]
+    for process in workers:
+        process.join()
+    remove_database(db_path)
+
+    latencies = [latency for *_, worker_latencies in counts for latency in worker_latencies]
+    return {
+        'reads_per_second': sum(count[0] for count in counts) / seconds,
+        'writes_per_second': sum(count[1] for count in counts) / seconds,
+        'lock_errors': sum(count[2] for count in counts),
+        'read_p50_ms': percentile(latencies, 50),
+        'read_p99_ms': percentile(latencies, 99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--processes', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--write-ratio', type=float, default=0.2)
+    parser.add_argument('--seconds', type=float, default=3)
+    args = parser.parse_args()
+
+    print(f"{'config':<9} {'procs':>5} {'reads/s':>9} {'writes/s':>9} {'read p50 ms':>12} "
+          f"{'read p99 ms':>12} {'lock errors':>11}")
+    for config in CONFIGS:
+        for processes in args.processes:
+            result = run(config, processes, args.write_ratio, args.seconds)
+            print(f"{config:<9} {processes:>5} {result['reads_per_second']:>9.0f} {result['writes_per_second']:>9.0f} "
+                  f"{result['read_p50_ms']:>12.2f} {result['read_p99_ms']:>12.2f} {result['lock_errors']:>11}")
+
+
+if __name__ == '__main__':
+    main()
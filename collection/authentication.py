@@ -0,0 +1,182 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework.permissions import BasePermission
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from collection.utils.queries import unrecorded
+
+
+def active_user_key(user_id):
+    """
+    Return the cache key recording that a user is active.
+    """
+    return f'auth:active-user:{user_id}'
+
+
+def active_user_cache():
+    """
+    Return the cache of the active users, settings.AUTH_ACTIVE_USER_CACHE_ALIAS.
+    """
+    return caches[getattr(settings, 'AUTH_ACTIVE_USER_CACHE_ALIAS', 'default')]
+
+
+def is_active_user(user_id):
+    """
+    Tell whether a user exists and is active, from the cache when possible.
+
+    Active users are cached for AUTH_ACTIVE_USER_TTL seconds. The entry is removed
+    when the user is saved or deleted (see collection.signals), so a deactivated
+    user is refused right away by every worker sharing the cache. With a per-process
+    cache, only the process that saved the user forgets it; the other workers, and
+    changes made without signals, e.g. with QuerySet.update(), wait for the TTL.
+
+    Parameters:
+        user_id (int): Id of the user.
+
+    Returns:
+        bool: Whether the user is active.
+    """
+    cache = active_user_cache()
+    key = active_user_key(user_id)
+    if cache.get(key):
+        return True
+    with unrecorded():  # only queried on a cache miss, not counted against query budgets
+        active = User.objects.filter(pk=user_id, is_active=True).exists()
+    if active:
+        cache.set(key, True, timeout=getattr(settings, 'AUTH_ACTIVE_USER_TTL', 60))
+    return active
+
+
+def forget_active_user(user_id):
+    """
+    Remove a user from the active users cache.
+
+    Parameters:
+        user_id (int): Id of the user.
+    """
+    active_user_cache().delete(active_user_key(user_id))
+
+
+class TokenMemo:
+    """
+    Bounded LRU memo of validated tokens, keyed by the raw token.
+
+    Verifying a token's signature and claims is repeated for every request of a
+    client; the memo returns the validated token of a raw token seen before until
+    it expires.
+
+    Attributes:
+        maxsize (int): Maximum number of tokens kept.
+    """
+    def __init__(self, maxsize=1024):
+        """
+        Initialize the memo.
+
+        Parameters:
+            maxsize (int): Maximum number of tokens kept (default is 1024).
+        """
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._tokens = OrderedDict()
+
+    def get(self, raw_token):
+        """
+        Return the validated token of a raw token, or None if unknown or expired.
+        """
+        with self._lock:
+            token = self._tokens.get(raw_token)
+            if token is None:
+                return None
+            if token.get('exp', 0) <= time.time():
+                del self._tokens[raw_token]
+                return None
+            self._tokens.move_to_end(raw_token)
+            return token
+
+    def set(self, raw_token, token):
+        """
+        Remember the validated token of a raw token, evicting the least recently used.
+        """
+        with self._lock:
+            self._tokens[raw_token] = token
+            self._tokens.move_to_end(raw_token)
+            while len(self._tokens) > self.maxsize:
+                self._tokens.popitem(last=False)
+
+    def clear(self):
+        """
+        Forget all the tokens.
+        """
+        with self._lock:
+            self._tokens.clear()
+
+
+token_memo = TokenMemo(maxsize=getattr(settings, 'AUTH_TOKEN_CACHE_SIZE', 1024))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication without a User query per request.
+
+    Validated tokens are memoized in `token_memo`, and the user is built from the
+    token's user id claim instead of being loaded, once the id is known to belong
+    to an active user (see is_active_user). The user is an unsaved User instance
+    holding only its primary key, which is all the views need to filter and create
+    collections.
+
+    When SIMPLE_JWT's CHECK_REVOKE_TOKEN is on, the user is loaded as usual,
+    since the check needs the password hash.
+    """
+    def get_validated_token(self, raw_token):
+        token = token_memo.get(raw_token)
+        if token is None:
+            token = super().get_validated_token(raw_token)
+            token_memo.set(raw_token, token)
+        return token
+
+    def get_user(self, validated_token):
+        if api_settings.CHECK_REVOKE_TOKEN:
+            return super().get_user(validated_token)
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        if not is_active_user(user_id):
+            raise AuthenticationFailed(_("User not found or inactive"), code="user_inactive")
+        return User(**{api_settings.USER_ID_FIELD: user_id, 'is_active': True})
+
+
+def is_staff_user(user_id):
+    """
+    Tell whether a user is an active staff member.
+
+    Unlike is_active_user, the answer is not cached: it is only needed by the few
+    staff-only requests.
+
+    Parameters:
+        user_id (int): Id of the user.
+
+    Returns:
+        bool: Whether the user is active and staff.
+    """
+    return User.objects.filter(pk=user_id, is_active=True, is_staff=True).exists()
+
+
+class IsStaffUser(BasePermission):
+    """
+    Allows access only to active staff users.
+
+    IsAdminUser cannot be used with CachedJWTAuthentication, whose users only hold
+    their primary key, so the staff flag is read from the database.
+    """
+    def has_permission(self, request, view):
+        return bool(request.user and request.user.is_authenticated and is_staff_user(request.user.pk))
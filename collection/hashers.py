@@ -0,0 +1,12 @@
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class ConfigurablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2 hasher whose number of iterations comes from the PASSWORD_HASH_ITERATIONS setting.
+
+    It keeps Django's `pbkdf2_sha256` algorithm name, so existing hashes stay valid
+    and are upgraded to the configured iterations on the next successful login.
+    """
+    iterations = getattr(settings, 'PASSWORD_HASH_ITERATIONS', PBKDF2PasswordHasher.iterations)
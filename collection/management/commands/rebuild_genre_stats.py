@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from collection.utils.genres import rebuild_genre_stats
+
+
+class Command(BaseCommand):
+    """
+    Recompute the per-user genre stats from the comma separated CatalogEntry.genres.
+
+    python manage.py rebuild_genre_stats [--user USER_ID]
+    """
+    help = 'Recompute the per-user genre stats from the comma separated CatalogEntry.genres.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, help='Only rebuild the stats of this user id.')
+
+    def handle(self, *args, **options):
+        count = rebuild_genre_stats(options['user'])
+        self.stdout.write(self.style.SUCCESS(f'Wrote {count} genre stats.'))
@@ -0,0 +1,34 @@
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+from collection.utils.catalog import sync_catalog
+
+
+class Command(BaseCommand):
+    """
+    Mirror the third-party movie catalog into the local CatalogMovie table.
+
+    python manage.py sync_catalog [--incremental] [--start-page N] [--max-pages N] [--url URL]
+    """
+    help = 'Mirror the third-party movie catalog into the local CatalogMovie table.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--incremental', action='store_true',
+                            help='Resume from the last synced page instead of starting over.')
+        parser.add_argument('--start-page', type=int, help='Page to start from.')
+        parser.add_argument('--max-pages', type=int, help='Maximum number of pages to fetch.')
+        parser.add_argument('--url', help='URL of the movie API (default is settings.MOVIES_API_URL).')
+
+    def handle(self, *args, **options):
+        try:
+            stats = sync_catalog(
+                url=options['url'],
+                start_page=options['start_page'],
+                incremental=options['incremental'],
+                max_pages=options['max_pages'],
+            )
+        except requests.exceptions.RequestException as e:
+            raise CommandError(f'Catalog sync failed: {e}')
+        self.stdout.write(self.style.SUCCESS(
+            f"Synced {stats['movies']} movies from {stats['pages']} pages, removed {stats['removed']}."
+        ))
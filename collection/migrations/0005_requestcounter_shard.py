@@ -0,0 +1,32 @@
+from django.db import migrations, models
+
+
+def number_existing_shards(apps, schema_editor):
+    """
+    Give every existing counter row its own shard number before the unique constraint is added.
+    """
+    RequestCounter = apps.get_model('collection', 'RequestCounter')
+    for shard, counter in enumerate(RequestCounter.objects.order_by('pk')):
+        counter.shard = shard
+        counter.save(update_fields=['shard'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collection', '0004_alter_movie_genres'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='requestcounter',
+            name='shard',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.RunPython(number_existing_shards, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='requestcounter',
+            name='shard',
+            field=models.PositiveSmallIntegerField(default=0, unique=True),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.0.2 on 2026-10-17 03:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collection', '0005_requestcounter_shard'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RouteMetric',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('route', models.CharField(max_length=100)),
+                ('status_class', models.CharField(max_length=3)),
+                ('bucket', models.PositiveSmallIntegerField()),
+                ('count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='routemetric',
+            constraint=models.UniqueConstraint(fields=('route', 'status_class', 'bucket'), name='unique_route_metric'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.0.2 on 2026-10-17 03:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collection', '0006_routemetric'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogSync',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_page', models.PositiveIntegerField(default=0)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CatalogMovie',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('uuid', models.UUIDField(unique=True)),
+                ('title', models.CharField(max_length=255)),
+                ('description', models.TextField(blank=True)),
+                ('genres', models.CharField(blank=True, max_length=255, null=True)),
+                ('page', models.PositiveIntegerField()),
+                ('rank', models.PositiveIntegerField()),
+                ('synced_at', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['page', 'rank'], name='catalog_movie_page_rank')],
+            },
+        ),
+    ]
@@ -0,0 +1,82 @@
+from django.db import migrations
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE collection_catalogmovie_fts USING fts5(
+        title, description, genres,
+        content='collection_catalogmovie', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER collection_catalogmovie_fts_insert AFTER INSERT ON collection_catalogmovie BEGIN
+        INSERT INTO collection_catalogmovie_fts(rowid, title, description, genres)
+        VALUES (new.id, new.title, new.description, new.genres);
+    END
+    """,
+    """
+    CREATE TRIGGER collection_catalogmovie_fts_delete AFTER DELETE ON collection_catalogmovie BEGIN
+        INSERT INTO collection_catalogmovie_fts(collection_catalogmovie_fts, rowid, title, description, genres)
+        VALUES ('delete', old.id, old.title, old.description, old.genres);
+    END
+    """,
+    """
+    CREATE TRIGGER collection_catalogmovie_fts_update AFTER UPDATE ON collection_catalogmovie BEGIN
+        INSERT INTO collection_catalogmovie_fts(collection_catalogmovie_fts, rowid, title, description, genres)
+        VALUES ('delete', old.id, old.title, old.description, old.genres);
+        INSERT INTO collection_catalogmovie_fts(rowid, title, description, genres)
+        VALUES (new.id, new.title, new.description, new.genres);
+    END
+    """,
+    "INSERT INTO collection_catalogmovie_fts(collection_catalogmovie_fts) VALUES ('rebuild')",
+]
+
+SQLITE_BACKWARD = [
+    'DROP TRIGGER IF EXISTS collection_catalogmovie_fts_insert',
+    'DROP TRIGGER IF EXISTS collection_catalogmovie_fts_delete',
+    'DROP TRIGGER IF EXISTS collection_catalogmovie_fts_update',
+    'DROP TABLE IF EXISTS collection_catalogmovie_fts',
+]
+
+# Must match POSTGRES_SEARCH_VECTOR in collection/utils/search.py for the index to be used.
+POSTGRES_FORWARD = [
+    """
+    CREATE INDEX collection_catalogmovie_search ON collection_catalogmovie USING GIN ((
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(genres, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'C')
+    ))
+    """,
+]
+
+POSTGRES_BACKWARD = [
+    'DROP INDEX IF EXISTS collection_catalogmovie_search',
+]
+
+
+def run_statements(forward):
+    """
+    Return a RunPython function running the statements matching the database vendor.
+    """
+    def run(apps, schema_editor):
+        vendor = schema_editor.connection.vendor
+        if vendor == 'sqlite':
+            statements = SQLITE_FORWARD if forward else SQLITE_BACKWARD
+        elif vendor == 'postgresql':
+            statements = POSTGRES_FORWARD if forward else POSTGRES_BACKWARD
+        else:
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collection', '0007_catalog'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_statements(forward=True), run_statements(forward=False)),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.0.2 on 2026-10-17 03:41
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collection', '0008_catalogmovie_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Genre',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='genre_tags',
+            field=models.ManyToManyField(blank=True, related_name='movies', to='collection.genre'),
+        ),
+        migrations.CreateModel(
+            name='UserGenreStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.IntegerField(default=0)),
+                ('genre', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='collection.genre')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='genre_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-count'], name='user_genre_stat_count')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='usergenrestat',
+            constraint=models.UniqueConstraint(fields=('user', 'genre'), name='unique_user_genre_stat'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+from collections import Counter
+
+from django.db import migrations
+
+
+def populate_genres(apps, schema_editor):
+    """
+    Normalize the comma separated Movie.genres into Genre rows and per-user UserGenreStat counts.
+    """
+    Genre = apps.get_model('collection', 'Genre')
+    Movie = apps.get_model('collection', 'Movie')
+    UserGenreStat = apps.get_model('collection', 'UserGenreStat')
+    MovieGenre = Movie.genre_tags.through
+
+    genre_ids = {}
+    links = []
+    stats = Counter()
+    for movie_id, user_id, genres in Movie.objects.values_list('id', 'collection__user_id', 'genres').iterator():
+        names = dict.fromkeys(name.strip() for name in (genres or '').split(',') if name.strip())
+        for name in names:
+            if name not in genre_ids:
+                genre_ids[name] = Genre.objects.get_or_create(name=name)[0].pk
+            links.append(MovieGenre(movie_id=movie_id, genre_id=genre_ids[name]))
+            stats[user_id, genre_ids[name]] += 1
+        if len(links) >= 1000:
+            MovieGenre.objects.bulk_create(links)
+            links = []
+    MovieGenre.objects.bulk_create(links)
+    UserGenreStat.objects.bulk_create(
+        [UserGenreStat(user_id=user_id, genre_id=genre_id, count=count) for (user_id, genre_id), count in stats.items()],
+        batch_size=1000,
+    )
+
+
+def clear_genres(apps, schema_editor):
+    apps.get_model('collection', 'UserGenreStat').objects.all().delete()
+    apps.get_model('collection', 'Genre').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collection', '0009_genre'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_genres, clear_genres),
+    ]
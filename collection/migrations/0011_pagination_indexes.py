@@ -0,0 +1,23 @@
+# Generated by Django 5.0.2 on 2026-10-17 03:45
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collection', '0010_populate_genres'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='collection',
+            index=models.Index(fields=['user', 'id'], name='collection_user_id'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['collection', 'id'], name='movie_collection_id'),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.0.2 on 2026-10-17 03:47
+
+import uuid
+from django.db import migrations, models
+from django.db.models import Count, F, Max, Min
+
+
+def dedupe_collection_uuids(apps, schema_editor):
+    """
+    Give a new uuid to every collection sharing its uuid with an older collection.
+    """
+    Collection = apps.get_model('collection', 'Collection')
+    duplicates = Collection.objects.values('uuid').annotate(keep=Min('id'), total=Count('id')).filter(total__gt=1)
+    for row in duplicates:
+        for collection in Collection.objects.filter(uuid=row['uuid']).exclude(id=row['keep']):
+            collection.uuid = uuid.uuid4()
+            collection.save(update_fields=['uuid'])
+
+
+def dedupe_collection_movies(apps, schema_editor):
+    """
+    Keep only the latest row of every movie added more than once to the same collection.
+
+    The genres of the deleted rows are discounted from the genre stats of their owners.
+    """
+    Movie = apps.get_model('collection', 'Movie')
+    UserGenreStat = apps.get_model('collection', 'UserGenreStat')
+    MovieGenre = Movie.genre_tags.through
+    duplicates = (
+        Movie.objects.values('collection_id', 'uuid')
+        .annotate(keep=Max('id'), total=Count('id'))
+        .filter(total__gt=1)
+    )
+    for row in duplicates:
+        stale = Movie.objects.filter(collection_id=row['collection_id'], uuid=row['uuid']).exclude(id=row['keep'])
+        removed = (
+            MovieGenre.objects.filter(movie__in=stale)
+            .values('genre_id', 'movie__collection__user_id')
+            .annotate(count=Count('id'))
+        )
+        for link in removed:
+            UserGenreStat.objects.filter(
+                user_id=link['movie__collection__user_id'], genre_id=link['genre_id'],
+            ).update(count=F('count') - link['count'])
+        stale.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collection', '0011_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_collection_uuids, migrations.RunPython.noop),
+        migrations.RunPython(dedupe_collection_movies, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='collection',
+            name='uuid',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, unique=True),
+        ),
+        migrations.AddConstraint(
+            model_name='movie',
+            constraint=models.UniqueConstraint(fields=('collection', 'uuid'), name='unique_collection_movie'),
+        ),
+    ]
@@ -0,0 +1,118 @@
+# Generated by Django 5.0.2 on 2026-10-17 04:31
+
+import hashlib
+import json
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def entry_digest(uuid, title, description, genres):
+    """
+    Digest of a movie's uuid and content, as computed by collection.utils.entries.entry_digest.
+    """
+    return hashlib.sha256(json.dumps([str(uuid), title, description, genres]).encode()).hexdigest()
+
+
+def parse_genres(genres):
+    names = (name.strip() for name in (genres or '').split(','))
+    return list(dict.fromkeys(name for name in names if name))
+
+
+def collapse_movies(apps, schema_editor):
+    """
+    Move the content of every movie to a CatalogEntry shared by the movies with the same uuid and content.
+
+    The genre links move from the movies to the entries. The per-user genre stats
+    count movies in collections, so they do not change.
+    """
+    Genre = apps.get_model('collection', 'Genre')
+    Movie = apps.get_model('collection', 'Movie')
+    CatalogEntry = apps.get_model('collection', 'CatalogEntry')
+    EntryGenre = CatalogEntry.genre_tags.through
+
+    genre_ids = {}
+    last_id = 0
+    while True:
+        movies = list(
+            Movie.objects.filter(id__gt=last_id).order_by('id')
+            .only('id', 'uuid', 'title', 'description', 'genres')[:BATCH_SIZE]
+        )
+        if not movies:
+            break
+        last_id = movies[-1].id
+
+        contents = {}
+        for movie in movies:
+            movie.digest = entry_digest(movie.uuid, movie.title, movie.description, movie.genres)
+            contents[movie.digest] = movie
+        entries = dict(CatalogEntry.objects.filter(digest__in=contents).values_list('digest', 'id'))
+        new = [
+            CatalogEntry(digest=digest, uuid=movie.uuid, title=movie.title, description=movie.description,
+                         genres=movie.genres)
+            for digest, movie in contents.items() if digest not in entries
+        ]
+        CatalogEntry.objects.bulk_create(new)
+        links = []
+        for entry in CatalogEntry.objects.filter(digest__in=[entry.digest for entry in new]):
+            entries[entry.digest] = entry.id
+            for name in parse_genres(entry.genres):
+                if name not in genre_ids:
+                    genre_ids[name] = Genre.objects.get_or_create(name=name)[0].pk
+                links.append(EntryGenre(catalogentry_id=entry.id, genre_id=genre_ids[name]))
+        EntryGenre.objects.bulk_create(links)
+
+        for movie in movies:
+            movie.entry_id = entries[movie.digest]
+        Movie.objects.bulk_update(movies, ['entry'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collection', '0013_collection_versions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('uuid', models.UUIDField(db_index=True)),
+                ('title', models.CharField(max_length=100)),
+                ('description', models.TextField()),
+                ('genres', models.CharField(blank=True, max_length=255, null=True)),
+                ('digest', models.CharField(max_length=64, unique=True)),
+                ('genre_tags', models.ManyToManyField(blank=True, related_name='entries', to='collection.genre')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='entry',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='movies', to='collection.catalogentry'),
+        ),
+        migrations.RunPython(collapse_movies),
+        migrations.AlterField(
+            model_name='movie',
+            name='entry',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='movies', to='collection.catalogentry'),
+        ),
+        migrations.RemoveField(
+            model_name='movie',
+            name='genre_tags',
+        ),
+        migrations.RemoveField(
+            model_name='movie',
+            name='title',
+        ),
+        migrations.RemoveField(
+            model_name='movie',
+            name='description',
+        ),
+        migrations.RemoveField(
+            model_name='movie',
+            name='genres',
+        ),
+    ]
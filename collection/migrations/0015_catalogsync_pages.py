@@ -0,0 +1,25 @@
+from django.db import migrations, models
+
+
+def count_synced_pages(apps, schema_editor):
+    """
+    Take the page count of a completed sync from its last page, which was the last page of the catalog.
+    """
+    CatalogSync = apps.get_model('collection', 'CatalogSync')
+    CatalogSync.objects.filter(completed_at__isnull=False).update(pages=models.F('last_page'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collection', '0014_catalog_entries'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='catalogsync',
+            name='pages',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(count_synced_pages, migrations.RunPython.noop),
+    ]
@@ -8,34 +8,200 @@ class Collection(models.Model):
     """
 
     user = models.ForeignKey(User, on_delete=models.CASCADE)
-    uuid = models.UUIDField(default=uuid.uuid4, editable=False)
+    uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
     title = models.CharField(max_length=100)
     description = models.TextField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'id'], name='collection_user_id'),  # cursor pagination
+        ]
 
     def __str__(self):
         return self.title
 
-class Movie(models.Model):
+class Genre(models.Model):
+    """
+    Model representing a movie genre.
     """
-    Model representing a movie.
+
+    name = models.CharField(max_length=100, unique=True)
+
+    def __str__(self):
+        return self.name
+
+class CatalogEntry(models.Model):
+    """
+    Model representing the title, description and genres of a movie, stored once
+    for all the collections holding it.
+
+    Entries are keyed by the movie uuid and a digest of its content (see
+    collection.utils.entries.entry_digest): every collection saving a movie with
+    the same content shares one entry, and a collection changing the content of
+    a movie points to another entry instead of changing it for everyone.
     """
 
+    uuid = models.UUIDField(db_index=True)
     title = models.CharField(max_length=100)
     description = models.TextField()
     genres = models.CharField(max_length=255, null=True, blank=True)
+    digest = models.CharField(max_length=64, unique=True)
+    genre_tags = models.ManyToManyField(Genre, related_name="entries", blank=True)  # normalized `genres`
+
+    def __str__(self):
+        return self.title
+
+class MovieManager(models.Manager):
+    """
+    Manager selecting the catalog entry of the movies along with them, so their
+    content is read with a single join.
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().select_related('entry')
+
+class Movie(models.Model):
+    """
+    Model representing a movie in a collection.
+
+    The content of the movie is stored in its CatalogEntry.
+    """
+
     uuid = models.UUIDField()
     collection = models.ForeignKey(Collection, related_name="movies", on_delete=models.CASCADE)
+    entry = models.ForeignKey(CatalogEntry, related_name="movies", on_delete=models.PROTECT)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = MovieManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['collection', 'uuid'], name='unique_collection_movie'),
+        ]
+        indexes = [
+            models.Index(fields=['collection', 'id'], name='movie_collection_id'),  # cursor pagination
+        ]
+
+    @property
+    def title(self):
+        return self.entry.title
+
+    @property
+    def description(self):
+        return self.entry.description
+
+    @property
+    def genres(self):
+        return self.entry.genres
 
     def __str__(self):
         return self.title
 
+class UserGenreStat(models.Model):
+    """
+    Model representing the number of movies of a genre in all the collections of a user.
+
+    Kept up to date as movies are added, updated and deleted, so the favourite
+    genres of a user are a single indexed query.
+    """
+
+    user = models.ForeignKey(User, related_name="genre_stats", on_delete=models.CASCADE)
+    genre = models.ForeignKey(Genre, on_delete=models.CASCADE)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'genre'], name='unique_user_genre_stat'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-count'], name='user_genre_stat_count'),
+        ]
+
+    def __str__(self):
+        return f'{self.genre}: {self.count}'
+
+class CollectionVersion(models.Model):
+    """
+    Model representing the version of all the collections of a user.
+
+    The version goes up on every write to the collections or movies of the user, so
+    clients can be told their copy is still current after one primary key lookup.
+    """
+
+    user = models.OneToOneField(User, related_name="collection_version", on_delete=models.CASCADE, primary_key=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.user}: {self.version}'
+
 class RequestCounter(models.Model):
     """
-    Model representing a request counter.
+    Model representing one shard of the request counter.
+
+    Workers increment different shards to avoid contending on a single row;
+    the total request count is the sum over all shards.
     """
 
+    shard = models.PositiveSmallIntegerField(default=0, unique=True)
     count = models.IntegerField(default=0)
 
     def __str__(self):
-        return self.count
+        return f'Shard {self.shard}: {self.count}'
+
+class RouteMetric(models.Model):
+    """
+    Model representing the number of requests served by one route with a given
+    status class (e.g. '2xx') whose latency fell in a given histogram bucket.
+    """
 
+    route = models.CharField(max_length=100)
+    status_class = models.CharField(max_length=3)
+    bucket = models.PositiveSmallIntegerField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['route', 'status_class', 'bucket'], name='unique_route_metric'),
+        ]
+
+    def __str__(self):
+        return f'{self.route} {self.status_class} bucket {self.bucket}: {self.count}'
+
+class CatalogMovie(models.Model):
+    """
+    Model representing a movie mirrored from the third-party movie API.
+
+    Movies keep the page they were listed on and their rank within that page,
+    so pages can be served locally with the same boundaries as the API.
+    """
+
+    uuid = models.UUIDField(unique=True)
+    title = models.CharField(max_length=255)
+    description = models.TextField(blank=True)
+    genres = models.CharField(max_length=255, null=True, blank=True)
+    page = models.PositiveIntegerField()
+    rank = models.PositiveIntegerField()
+    synced_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['page', 'rank'], name='catalog_movie_page_rank'),
+        ]
+
+    def __str__(self):
+        return self.title
+
+class CatalogSync(models.Model):
+    """
+    Model representing the progress of the movie catalog mirror.
+    """
+
+    last_page = models.PositiveIntegerField(default=0)  # where the next incremental sync resumes
+    pages = models.PositiveIntegerField(default=0)  # number of pages, as of the last completed sync
+    count = models.PositiveIntegerField(default=0)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f'Page {self.last_page} of {self.count} movies'
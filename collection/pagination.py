@@ -0,0 +1,25 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class CollectionCursorPagination(CursorPagination):
+    """
+    Keyset pagination of a user's collections, in creation order.
+
+    Pages are selected with `id > <last id of the previous page>`, so every page
+    costs the same however deep the client pages.
+    """
+    ordering = 'id'
+    page_size = getattr(settings, 'COLLECTION_PAGE_SIZE', 100)
+    page_size_query_param = 'page_size'
+    max_page_size = getattr(settings, 'MAX_PAGE_SIZE', 1000)
+
+
+class MovieCursorPagination(CursorPagination):
+    """
+    Keyset pagination of the movies of a collection, in insertion order.
+    """
+    ordering = 'id'
+    page_size = getattr(settings, 'MOVIE_PAGE_SIZE', 100)
+    page_size_query_param = 'page_size'
+    max_page_size = getattr(settings, 'MAX_PAGE_SIZE', 1000)
@@ -1,8 +1,12 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import Collection, Movie
-from django.core.exceptions import ValidationError
-from uuid import UUID
+from .models import CatalogEntry, Collection
+from .utils.entries import add_movies
+from .utils.upsert import upsert_movies
+from .utils.versions import bump_collection_version
+from .utils.passwords import hash_password
+from django.conf import settings
+from django.db import transaction
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
     """
@@ -19,24 +23,31 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         """
         Create a new user instance with the validated data.
+        The password is hashed in the password hash pool.
 
         Parameters:
         - validated_data (dict): Validated data containing username and password.
 
         Returns:
         - User: Newly created user instance.
+
+        Raises:
+        - HashPoolBusy: If the password hash pool is overloaded.
         """
-        user = User.objects.create_user(**validated_data)
-        return user
+        validated_data['username'] = User.normalize_username(validated_data['username'])
+        validated_data['password'] = hash_password(validated_data['password'])
+        return User.objects.create(**validated_data)
     
 class MovieSerializer(serializers.ModelSerializer):
     """
-    Serializer for the Movie model.
+    Serializer for movies.
 
     Serializes movie data including title, description, genres, and UUID.
+    Movies are validated with the CatalogEntry fields, and read from Movie,
+    CatalogEntry or CatalogMovie instances alike.
     """
     class Meta:
-        model = Movie
+        model = CatalogEntry
         fields = ['title', 'description', 'genres', 'uuid']
 
 class CollectionSerializer(serializers.ModelSerializer):
@@ -50,10 +61,28 @@ class CollectionSerializer(serializers.ModelSerializer):
         model = Collection
         fields = ['title', 'uuid', 'description', 'movies']
 
+    def validate_movies(self, movies):
+        """
+        Reject a movie list adding the same movie more than once.
+
+        Parameters:
+        - movies (list): Validated movie data.
+
+        Returns:
+        - list: The movie data.
+        """
+        uuids = [movie['uuid'] for movie in movies]
+        if len(set(uuids)) != len(uuids):
+            raise serializers.ValidationError('Each movie can only be added once to a collection.')
+        return movies
+
     def create(self, validated_data):
         """
         Create a new collection instance with the validated data.
-        Also create movie instances with the movie details supplied after validating.
+        Also create its movies, already validated by the nested MovieSerializer,
+        with bulk inserts of MOVIE_BATCH_SIZE rows (see add_movies), sharing the
+        catalog entries of movies other collections already hold, and count their
+        genres in the user's genre stats. Nothing is created if any insert fails.
 
         Parameters:
         - validated_data (dict): Validated data containing collection details and nested movies.
@@ -62,24 +91,10 @@ class CollectionSerializer(serializers.ModelSerializer):
         - Collection: Newly created collection instance.
         """
         movies_data = validated_data.pop('movies')
-        collection = Collection.objects.create(**validated_data)
-        
-        movie_objects = []
-        errors = {}
-        for index, movie_data in enumerate(movies_data, start=1):
-            movie_serializer = MovieSerializer(data=movie_data)
-
-            title = movie_data.get('title')
-            
-            if movie_serializer.is_valid():
-                movie_objects.append(Movie(collection=collection, **movie_serializer.validated_data))
-            else:
-                errors[f'Movie {index}'] = {'errors': movie_serializer.errors, 'title': title}
-        
-        if errors:
-            raise ValidationError(errors)
-        
-        Movie.objects.bulk_create(movie_objects)
+        with transaction.atomic():
+            collection = Collection.objects.create(**validated_data)
+            add_movies(collection, movies_data, batch_size=getattr(settings, 'MOVIE_BATCH_SIZE', 500))
+            bump_collection_version(collection.user_id)
         return collection
 
 class CollectionListSerializer(serializers.ModelSerializer):
@@ -97,13 +112,30 @@ class CollectionDetailSerializer(serializers.ModelSerializer):
     Serializer for detailed view of a collection.
 
     Serializes collection data including title, description, and nested movies.
+    Only the movies passed in the `movies` context entry (e.g. one page) are
+    serialized when it is given.
     """
-    movies = MovieSerializer(many=True)
+    movies = serializers.SerializerMethodField()
 
     class Meta:
         model = Collection
         fields = ['title', 'description', 'movies']
 
+    def get_movies(self, collection):
+        """
+        Serialize the movies of the collection, or the ones given in the context.
+
+        Parameters:
+        - collection (Collection): The collection being serialized.
+
+        Returns:
+        - list: Serialized movies.
+        """
+        movies = self.context.get('movies')
+        if movies is None:
+            movies = collection.movies.all()
+        return MovieSerializer(movies, many=True).data
+
 
 class CollectionUpdateSerializer(serializers.ModelSerializer):
     """
@@ -117,32 +149,34 @@ class CollectionUpdateSerializer(serializers.ModelSerializer):
         model = Collection
         fields = ['title', 'description', 'movies']
 
-    def validate(self, attrs):
+    def validate_movies(self, movies):
         """
-        Validate the data before updating the collection.
+        Check that every movie has a uuid and that no movie is listed twice.
+
+        The format of the uuids is already checked by MovieSerializer, but the
+        update is partial so they may be missing.
 
         Parameters:
-        - attrs (dict): Dictionary containing updated collection data.
+        - movies (list): Validated movie data.
 
         Returns:
-        - dict: Validated data.
+        - list: The movie data.
         """
-        movies_data = attrs.get('movies', [])
-        for movie_data in movies_data:
-            uuid_str = movie_data.get('uuid')
-            if not uuid_str:
-                raise ValidationError({'uuid': 'UUID is required for each movie.'})
-            try:
-                UUID(str(uuid_str))                
-            except ValueError:
-                raise ValidationError({'uuid': f'Invalid UUID format: {uuid_str}'})
-
-        return attrs
-    
+        uuids = {movie.get('uuid') for movie in movies}
+        if None in uuids:
+            raise serializers.ValidationError('UUID is required for each movie.')
+        if len(uuids) != len(movies):
+            raise serializers.ValidationError('Each movie can only be added once to a collection.')
+        return movies
+
     def update(self, instance, validated_data):
         """
         Update the collection instance with the validated data.
 
+        The movies are upserted in bulk by uuid (see upsert_movies). Pass `replace`
+        in the context to also delete the movies missing from the list. The numbers
+        of movies inserted, updated and removed are kept in `movie_changes`.
+
         Parameters:
         - instance (Collection): Collection instance to be updated.
         - validated_data (dict): Validated data containing updated collection details.
@@ -150,10 +184,13 @@ class CollectionUpdateSerializer(serializers.ModelSerializer):
         Returns:
         - Collection: Updated collection instance.
         """
-        movies_data = validated_data.pop('movies', [])
-        instance = super().update(instance, validated_data)
-        
-        for movie_data in movies_data:
-           movie_instance, _ = Movie.objects.update_or_create(collection=instance, uuid=movie_data.get('uuid'), defaults=movie_data)
-        
+        movies_data = validated_data.pop('movies', None)
+        with transaction.atomic():
+            instance = super().update(instance, validated_data)
+            if movies_data is not None:
+                self.movie_changes = upsert_movies(instance, movies_data, replace=self.context.get('replace', False))
+            else:
+                self.movie_changes = {'inserted': 0, 'updated': 0, 'removed': 0}
+            bump_collection_version(instance.user_id)
+
         return instance
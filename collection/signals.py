@@ -0,0 +1,38 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import forget_active_user
+from .utils.database import apply_sqlite_pragmas
+from .utils.queries import install_query_recorder
+
+
+@receiver([post_save, post_delete], sender=User)
+def forget_changed_user(sender, instance, **kwargs):
+    """
+    Drop a saved or deleted user from the active users cache, so a deactivation or
+    deletion takes effect on the next request.
+
+    The entry is dropped once the transaction commits: dropped earlier, a concurrent
+    request could still read the user as active and cache it again for the TTL.
+    """
+    user_id = instance.pk
+    transaction.on_commit(lambda: forget_active_user(user_id))
+
+
+@receiver(connection_created)
+def tune_sqlite_connection(sender, connection, **kwargs):
+    """
+    Apply the SQLITE_PRAGMAS to every new SQLite connection.
+    """
+    apply_sqlite_pragmas(connection)
+
+
+@receiver(connection_created)
+def record_connection_queries(sender, connection, **kwargs):
+    """
+    Let the queries of a new database connection be recorded (see collection.utils.queries).
+    """
+    install_query_recorder(connection)
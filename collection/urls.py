@@ -5,8 +5,15 @@ urlpatterns = [
     path('login/', views.login, name='login'),
     path('register/', views.register, name='register'),
     path('movies/', views.get_movies, name='get_movies'),
+    path('movies/search/', views.search_movies, name='search_movies'),
     path('request-count/', views.RequestCountView.as_view(), name='request_count'),
     path('request-count/reset/', views.ResetRequestCountView.as_view(), name='reset_request_count'),
+    path('request-metrics/', views.RequestMetricsView.as_view(), name='request_metrics'),
+    path('cache-stats/', views.CacheStatsView.as_view(), name='cache_stats'),
+    path('profiles/', views.ProfilesView.as_view(), name='profiles'),
     path('collection/', views.CollectionListView.as_view(), name='cl_collection'), # create and list collections
+    path('collection/import/', views.CollectionImportView.as_view(), name='import_collection'), # stream NDJSON/CSV movies into a collection
+    path('collection/export/', views.CollectionExportView.as_view(), name='export_collections'), # stream all collections as NDJSON/CSV
+    path('collection/<str:collection_uuid>/movies/', views.CollectionMoviesView.as_view(), name='collection_movies'), # page through the movies of a collection
     path('collection/<str:collection_uuid>/', views.CollectionDetailView.as_view(), name='rud_collection'), # get, update and delete collection
 ]
\ No newline at end of file
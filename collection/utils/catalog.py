@@ -0,0 +1,129 @@
+from django.db import transaction
+from django.utils import timezone
+
+from collection.models import CatalogMovie, CatalogSync
+from .movies import fetch_movies_page
+
+
+def get_catalog_sync():
+    """
+    Return the state of the catalog mirror.
+
+    Returns:
+        CatalogSync: The catalog mirror state.
+    """
+    state, _ = CatalogSync.objects.get_or_create(pk=1)
+    return state
+
+
+def sync_catalog(url=None, start_page=None, incremental=False, max_pages=None):
+    """
+    Mirror the third-party movie catalog into the CatalogMovie table.
+
+    Pages are fetched one after the other and bulk upserted by movie uuid, one
+    transaction per page. The last synced page is recorded after every page, so an
+    incremental sync resumes from there (re-fetching that page, which may have grown).
+
+    A full sync that runs to the last page also removes the movies that are no
+    longer listed by the API. The number of pages served from the mirror is only
+    updated by a sync that runs to the last page, so a sync that fails or stops
+    early does not hide the pages past the one it reached.
+
+    Parameters:
+        url (str): URL of the movie API (default is settings.MOVIES_API_URL).
+        start_page (int): Page to start from (default is 1, or the last synced page
+            when incremental).
+        incremental (bool): Whether to resume from the last synced page (default is False).
+        max_pages (int): Maximum number of pages to fetch (default is None, all pages).
+
+    Returns:
+        dict: Number of pages fetched, movies upserted and movies removed.
+
+    Raises:
+        requests.exceptions.RequestException: If a page could not be fetched. The
+            pages synced before the failure are kept.
+    """
+    state = get_catalog_sync()
+    if start_page is None:
+        start_page = max(state.last_page, 1) if incremental else 1
+
+    started_at = timezone.now()
+    stats = {'pages': 0, 'movies': 0, 'removed': 0}
+    page_number = start_page
+    while page_number:
+        data = fetch_movies_page(page_number, url=url)
+        movies = [
+            CatalogMovie(
+                uuid=movie['uuid'],
+                title=movie.get('title') or '',
+                description=movie.get('description') or '',
+                genres=movie.get('genres'),
+                page=page_number,
+                rank=rank,
+                synced_at=started_at,
+            )
+            for rank, movie in enumerate(data.get('results', []))
+        ]
+        with transaction.atomic():
+            CatalogMovie.objects.bulk_create(
+                movies,
+                update_conflicts=True,
+                unique_fields=['uuid'],
+                update_fields=['title', 'description', 'genres', 'page', 'rank', 'synced_at'],
+            )
+            state.last_page = page_number
+            state.count = data.get('count') or 0
+            state.save(update_fields=['last_page', 'count'])
+
+        stats['pages'] += 1
+        stats['movies'] += len(movies)
+        page_number = page_number + 1 if data.get('next') else None
+        if max_pages and stats['pages'] >= max_pages:
+            break
+
+    if page_number is None:
+        if start_page == 1:
+            stats['removed'], _ = CatalogMovie.objects.filter(synced_at__lt=started_at).delete()
+        state.pages = state.last_page
+        state.completed_at = timezone.now()
+        state.save(update_fields=['pages', 'completed_at'])
+    return stats
+
+
+def get_completed_catalog_sync():
+    """
+    Return the state of the catalog mirror if a sync has ever run to the last page.
+
+    Returns:
+        CatalogSync: The catalog mirror state, or None if pages cannot be served
+            from the mirror yet.
+    """
+    return CatalogSync.objects.filter(pk=1, completed_at__isnull=False).first()
+
+
+def get_catalog_page(page_number, state):
+    """
+    Return a page of the catalog mirror in the same shape as the movie API.
+
+    Parameters:
+        page_number (int): The page to return.
+        state (CatalogSync): The catalog mirror state.
+
+    Returns:
+        dict: The page with its `count`, `next`, `previous` and `results`. `next` and
+            `previous` are booleans telling whether those pages exist. None if the
+            page is out of range.
+    """
+    if not 1 <= page_number <= max(state.pages, 1):
+        return None
+    results = list(
+        CatalogMovie.objects.filter(page=page_number)
+        .order_by('rank')
+        .values('title', 'description', 'genres', 'uuid')
+    )
+    return {
+        'count': state.count,
+        'next': page_number < state.pages,
+        'previous': page_number > 1,
+        'results': results,
+    }
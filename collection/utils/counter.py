@@ -0,0 +1,189 @@
+import logging
+import os
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.db.models import F, Sum
+
+from collection.models import RequestCounter
+
+logger = logging.getLogger(__name__)
+
+
+class BufferedRequestCounter:
+    """
+    Request counter that accumulates increments in process memory.
+
+    Increments are added to an in-memory delta and written to one RequestCounter
+    shard in bulk with a single UPDATE using an F() expression, either once
+    `flush_threshold` requests have been counted or once `flush_interval` seconds
+    have passed since the last flush. This avoids taking a row lock (and, on SQLite,
+    a database write lock) on every request.
+
+    The shard is picked by worker process id (`strategy='worker'`), so each worker
+    keeps writing to the same row, or at random on every flush (`strategy='random'`).
+    Reads sum all shards with one aggregate query.
+
+    Counts that have not been flushed yet are lost if the process dies, so at most
+    `flush_threshold` requests or `flush_interval` seconds worth of requests can go
+    missing per process.
+
+    Attributes:
+        flush_interval (float): Maximum number of seconds between two flushes.
+        flush_threshold (int): Number of pending increments that triggers a flush.
+        shards (int): Number of RequestCounter rows the count is spread over.
+        strategy (str): How a flush picks its shard, either 'worker' or 'random'.
+    """
+    def __init__(self, flush_interval=5, flush_threshold=100, shards=1, strategy='worker'):
+        """
+        Initialize the counter.
+
+        Parameters:
+            flush_interval (float): Maximum number of seconds between two flushes.
+            flush_threshold (int): Number of pending increments that triggers a flush.
+            shards (int): Number of RequestCounter rows the count is spread over (default is 1).
+            strategy (str): How a flush picks its shard, either 'worker' or 'random'
+                (default is 'worker').
+        """
+        if strategy not in ('worker', 'random'):
+            raise ValueError(f'Unknown shard strategy: {strategy}')
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self.shards = max(1, shards)
+        self.strategy = strategy
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    @property
+    def pending(self):
+        """
+        Number of increments counted in this process but not written to the database yet.
+        """
+        return self._pending
+
+    def increment(self, amount=1, flush=True):
+        """
+        Count `amount` requests, flushing to the database if a flush is due.
+
+        A failed flush is logged, not raised, so counting never fails a request; the
+        increments are kept for the next flush.
+
+        Parameters:
+            amount (int): Number of requests to add (default is 1).
+            flush (bool): Whether to flush when a flush is due (default is True).
+                Callers passing False flush themselves.
+
+        Returns:
+            bool: Whether a flush is due.
+        """
+        with self._lock:
+            self._pending += amount
+            due = (
+                self._pending >= self.flush_threshold
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            )
+        if due and flush:
+            self.flush_or_log()
+        return due
+
+    def flush(self):
+        """
+        Write the pending increments to the database.
+
+        The pending delta is restored if the write fails so no increments are lost.
+
+        Returns:
+            int: The number of increments written.
+        """
+        with self._flush_lock:
+            with self._lock:
+                delta = self._pending
+                self._pending = 0
+                self._last_flush = time.monotonic()
+            if not delta:
+                return 0
+            try:
+                self._write(self.shard(), delta)
+            except Exception:
+                with self._lock:
+                    self._pending += delta
+                raise
+            return delta
+
+    def flush_or_log(self):
+        """
+        Flush the pending increments, logging a failed write instead of raising it.
+
+        Returns:
+            int: The number of increments written, 0 if the write failed.
+        """
+        try:
+            return self.flush()
+        except Exception:
+            logger.exception('Could not flush the request counter')
+            return 0
+
+    def total(self):
+        """
+        Return the exact request count seen by this process.
+
+        This is the sum of all stored shards plus the increments that have not been
+        flushed yet. A concurrent flush cannot run in between the two reads.
+
+        Returns:
+            int: The total number of requests.
+        """
+        with self._flush_lock:
+            stored = RequestCounter.objects.aggregate(total=Sum('count'))['total'] or 0
+            return stored + self._pending
+
+    def reset(self):
+        """
+        Reset every shard to zero and discard the pending increments.
+
+        All shards are zeroed by a single UPDATE statement, so the reset is atomic.
+        """
+        with self._flush_lock:
+            with self._lock:
+                self._pending = 0
+                self._last_flush = time.monotonic()
+            RequestCounter.objects.update(count=0)
+
+    def shard(self):
+        """
+        Return the shard the next flush of this process writes to.
+
+        The worker id is read on every call so forked workers pick their own shard.
+
+        Returns:
+            int: A shard number in the range [0, shards).
+        """
+        if self.strategy == 'random':
+            return random.randrange(self.shards)
+        return os.getpid() % self.shards
+
+    def _write(self, shard, delta):
+        """
+        Add `delta` to a shard with a single UPDATE, creating the shard row if needed.
+
+        Parameters:
+            shard (int): Shard number to increment.
+            delta (int): Number of requests to add.
+        """
+        counters = RequestCounter.objects.filter(shard=shard)
+        if counters.update(count=F('count') + delta):
+            return
+        RequestCounter.objects.get_or_create(shard=shard)
+        counters.update(count=F('count') + delta)
+
+
+request_counter = BufferedRequestCounter(
+    flush_interval=getattr(settings, 'REQUEST_COUNTER_FLUSH_INTERVAL', 5),
+    flush_threshold=getattr(settings, 'REQUEST_COUNTER_FLUSH_THRESHOLD', 100),
+    shards=getattr(settings, 'REQUEST_COUNTER_SHARDS', 1),
+    strategy=getattr(settings, 'REQUEST_COUNTER_SHARD_STRATEGY', 'worker'),
+)
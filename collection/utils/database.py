@@ -0,0 +1,28 @@
+import re
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+_PRAGMA_NAME = re.compile(r'[a-z_]+')
+
+
+def apply_sqlite_pragmas(connection):
+    """
+    Apply settings.SQLITE_PRAGMAS to a new SQLite connection.
+
+    The PRAGMAs are run on the DB-API connection, below Django's cursor wrappers, so
+    they are not logged or counted against the query budget of the request that
+    happened to open the connection.
+
+    Parameters:
+        connection (BaseDatabaseWrapper): The new database connection.
+
+    Raises:
+        ImproperlyConfigured: If a PRAGMA name is not a plain identifier.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    for name, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+        if not _PRAGMA_NAME.fullmatch(name):
+            raise ImproperlyConfigured(f'Invalid SQLite PRAGMA name: {name!r}')
+        connection.connection.execute(f'PRAGMA {name} = {value}')
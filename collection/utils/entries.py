@@ -0,0 +1,89 @@
+import hashlib
+import json
+
+from django.conf import settings
+
+from collection.models import CatalogEntry, Movie
+from .genres import add_movie_genres, link_entry_genres
+
+ENTRY_FIELDS = ('title', 'description', 'genres')
+EMPTY_MOVIE = {'title': '', 'description': '', 'genres': None}  # content of a movie saved with its uuid only
+
+
+def entry_digest(movie_data):
+    """
+    Return the digest identifying the catalog entry of a movie.
+
+    Parameters:
+        movie_data (dict): The uuid, title, description and genres of the movie.
+
+    Returns:
+        str: The hex SHA-256 of the uuid and the content.
+    """
+    values = [str(movie_data['uuid'])] + [movie_data[field] for field in ENTRY_FIELDS]
+    return hashlib.sha256(json.dumps(values).encode()).hexdigest()
+
+
+def get_entries(movies_data, batch_size=None):
+    """
+    Return the CatalogEntry of every movie, creating the missing ones.
+
+    The existing entries are looked up by digest in one query, and the missing ones
+    are inserted in bulk and linked to their genres.
+
+    Parameters:
+        movies_data (list): Validated movie data (uuid, title, description, genres).
+        batch_size (int): Number of entries inserted per query (default is
+            settings.MOVIE_BATCH_SIZE).
+
+    Returns:
+        list: The entries, in the order of `movies_data`.
+    """
+    batch_size = batch_size or getattr(settings, 'MOVIE_BATCH_SIZE', 500)
+    digests = [entry_digest(dict(EMPTY_MOVIE, **movie_data)) for movie_data in movies_data]
+    entries = {entry.digest: entry for entry in CatalogEntry.objects.filter(digest__in=set(digests))}
+    missing = {digest: movie_data for digest, movie_data in zip(digests, movies_data) if digest not in entries}
+    if missing:
+        CatalogEntry.objects.bulk_create(
+            [CatalogEntry(digest=digest, **dict(EMPTY_MOVIE, **movie_data)) for digest, movie_data in missing.items()],
+            batch_size=batch_size, ignore_conflicts=True,
+        )
+        created = list(CatalogEntry.objects.filter(digest__in=missing))
+        link_entry_genres(created)
+        entries.update((entry.digest, entry) for entry in created)
+    return [entries[digest] for digest in digests]
+
+
+def add_movies(collection, movies_data, batch_size=None):
+    """
+    Add movies to a collection, and count their genres in the user's genre stats.
+
+    Parameters:
+        collection (Collection): The collection.
+        movies_data (list): Validated movie data, with distinct uuids not in the collection yet.
+        batch_size (int): Number of rows inserted per query (default is
+            settings.MOVIE_BATCH_SIZE).
+
+    Returns:
+        list: The saved Movie instances.
+    """
+    batch_size = batch_size or getattr(settings, 'MOVIE_BATCH_SIZE', 500)
+    movies = [
+        Movie(collection=collection, entry=entry, uuid=entry.uuid)
+        for entry in get_entries(movies_data, batch_size=batch_size)
+    ]
+    Movie.objects.bulk_create(movies, batch_size=batch_size)
+    add_movie_genres(collection.user_id, movies)
+    return movies
+
+
+def prune_entries(entry_ids):
+    """
+    Delete the given catalog entries that no collection holds anymore.
+
+    Parameters:
+        entry_ids (iterable): Ids of entries that movies were removed from.
+    """
+    entry_ids = set(entry_ids)
+    if entry_ids:
+        CatalogEntry.objects.filter(pk__in=entry_ids, movies=None).delete()
@@ -0,0 +1,80 @@
+import csv
+import json
+
+from django.conf import settings
+
+from collection.models import Collection
+from .importer import batched
+
+EXPORT_FIELDS = ('collection_uuid', 'collection_title', 'collection_description', 'title', 'description', 'genres', 'uuid')
+
+
+class Echo:
+    """
+    File-like object returning what is written to it, for csv.writer to format rows.
+    """
+    def write(self, value):
+        return value
+
+
+def export_rows(user, chunk_size=None):
+    """
+    Return the movies of all the collections of a user, one row per movie.
+
+    Collections, movies and their catalog entries are read with a single LEFT JOIN
+    query, fetched `chunk_size` rows at a time, so no more than one chunk is held in
+    memory. Collections without movies are exported as one row with empty movie fields.
+
+    Parameters:
+        user (User): The user whose collections are exported.
+        chunk_size (int): Number of rows fetched at a time (default is
+            settings.COLLECTION_EXPORT_CHUNK_SIZE).
+
+    Returns:
+        generator: Rows as tuples of the EXPORT_FIELDS values, ordered by collection.
+    """
+    chunk_size = chunk_size or getattr(settings, 'COLLECTION_EXPORT_CHUNK_SIZE', 2000)
+    rows = (
+        Collection.objects.filter(user=user)
+        .order_by('id', 'movies__id')
+        .values_list('uuid', 'title', 'description', 'movies__entry__title', 'movies__entry__description',
+                     'movies__entry__genres', 'movies__uuid')
+    )
+    for collection_uuid, *fields, movie_uuid in rows.iterator(chunk_size=chunk_size):
+        yield (str(collection_uuid), *fields, str(movie_uuid) if movie_uuid else None)
+
+
+def export_ndjson(rows, chunk_size=None):
+    """
+    Format export rows as newline delimited JSON objects keyed by EXPORT_FIELDS.
+
+    Parameters:
+        rows (iterable): Rows from export_rows().
+        chunk_size (int): Number of rows per yielded string (default is
+            settings.COLLECTION_EXPORT_CHUNK_SIZE).
+
+    Returns:
+        generator: Strings of up to `chunk_size` lines.
+    """
+    chunk_size = chunk_size or getattr(settings, 'COLLECTION_EXPORT_CHUNK_SIZE', 2000)
+    for chunk in batched(rows, chunk_size):
+        yield ''.join(json.dumps(dict(zip(EXPORT_FIELDS, row))) + '\n' for row in chunk)
+
+
+def export_csv(rows, chunk_size=None):
+    """
+    Format export rows as CSV under an EXPORT_FIELDS header.
+
+    Parameters:
+        rows (iterable): Rows from export_rows().
+        chunk_size (int): Number of rows per yielded string (default is
+            settings.COLLECTION_EXPORT_CHUNK_SIZE).
+
+    Returns:
+        generator: Strings of up to `chunk_size` lines, the header first.
+    """
+    chunk_size = chunk_size or getattr(settings, 'COLLECTION_EXPORT_CHUNK_SIZE', 2000)
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for chunk in batched(rows, chunk_size):
+        yield ''.join(writer.writerow(row) for row in chunk)
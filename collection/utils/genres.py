@@ -0,0 +1,227 @@
+from collections import Counter
+
+from django.db import connection, transaction
+from django.db.models import Count, F
+
+from collection.models import CatalogEntry, Genre, Movie, UserGenreStat
+from .versions import bump_collection_version
+
+EntryGenre = CatalogEntry.genre_tags.through
+
+
+def parse_genres(genres):
+    """
+    Split a comma separated genres string into genre names.
+
+    Parameters:
+        genres (str): Comma separated genres, e.g. 'Action, Drama'. May be None.
+
+    Returns:
+        list: The stripped, non-empty, distinct genre names in order.
+    """
+    names = (name.strip() for name in (genres or '').split(','))
+    return list(dict.fromkeys(name for name in names if name))
+
+
+def get_genres(names):
+    """
+    Return the Genre instances of the given names, creating the missing ones.
+
+    Parameters:
+        names (iterable): Genre names.
+
+    Returns:
+        dict: Mapping of genre name to Genre instance.
+    """
+    names = set(names)
+    if not names:
+        return {}
+    genres = {genre.name: genre for genre in Genre.objects.filter(name__in=names)}
+    missing = names - genres.keys()
+    if missing:
+        Genre.objects.bulk_create([Genre(name=name) for name in missing], ignore_conflicts=True)
+        genres.update((genre.name, genre) for genre in Genre.objects.filter(name__in=missing))
+    return genres
+
+
+def link_entry_genres(entries):
+    """
+    Link new catalog entries to the Genre rows of their `genres`.
+
+    Parameters:
+        entries (iterable): Saved CatalogEntry instances without genre links.
+    """
+    names_by_entry = [(entry.pk, parse_genres(entry.genres)) for entry in entries]
+    genres = get_genres(name for _, names in names_by_entry for name in names)
+    EntryGenre.objects.bulk_create([
+        EntryGenre(catalogentry_id=entry_id, genre_id=genres[name].pk)
+        for entry_id, names in names_by_entry
+        for name in names
+    ], ignore_conflicts=True)
+
+
+def add_movie_genres(user_id, movies):
+    """
+    Count the genres of movies added to the collections of a user in the user's stats.
+
+    Parameters:
+        user_id (int): Id of the user owning the movies.
+        movies (iterable): Movie instances with their catalog entry loaded.
+    """
+    counts = Counter(name for movie in movies for name in parse_genres(movie.genres))
+    genres = get_genres(counts)
+    update_genre_stats(user_id, {genres[name].pk: count for name, count in counts.items()})
+
+
+def remove_movie_genres(user_id, movies):
+    """
+    Discount the genres of movies removed from the collections of a user from the user's stats.
+
+    Parameters:
+        user_id (int): Id of the user owning the movies.
+        movies (QuerySet): The movies, still in the database.
+    """
+    removed = Counter({
+        row['genre_id']: -row['count']
+        for row in EntryGenre.objects.filter(catalogentry__movies__in=movies)
+        .values('genre_id').annotate(count=Count('id'))
+    })
+    update_genre_stats(user_id, removed)
+
+
+def update_genre_stats(user_id, delta):
+    """
+    Add per-genre movie counts to the stats of a user.
+
+    Every count is changed with an UPDATE using an F() expression, so concurrent
+    updates do not overwrite each other.
+
+    Parameters:
+        user_id (int): Id of the user.
+        delta (dict): Mapping of genre id to the number of movies to add (or remove,
+            if negative).
+    """
+    for genre_id, count in delta.items():
+        if not count:
+            continue
+        stats = UserGenreStat.objects.filter(user_id=user_id, genre_id=genre_id)
+        if not stats.update(count=F('count') + count):
+            UserGenreStat.objects.get_or_create(user_id=user_id, genre_id=genre_id)
+            stats.update(count=F('count') + count)
+
+
+def top_genres(user, limit=3):
+    """
+    Return the genres of the most movies in all the collections of a user.
+
+    Parameters:
+        user (User): The user.
+        limit (int): Maximum number of genres to return (default is 3).
+
+    Returns:
+        list: Genre names, most frequent first, ties broken by name.
+    """
+    return list(
+        UserGenreStat.objects.filter(user=user, count__gt=0)
+        .order_by('-count', 'genre__name')
+        .values_list('genre__name', flat=True)[:limit]
+    )
+
+
+def csv_genre_counts(user_id=None, limit=None, chunk_size=2000):
+    """
+    Count the movies per user and genre straight from the comma separated CatalogEntry.genres.
+
+    The genres strings are split and counted by the database (a recursive CTE on
+    SQLite, string_to_array on PostgreSQL), so no Movie instances are built. Other
+    databases stream only the genres column in chunks. A genre listed twice for the
+    same movie is counted once, as with the Genre links.
+
+    Parameters:
+        user_id (int): Only count the movies of this user (default is None, all users).
+        limit (int): Maximum number of genres to return per query (default is None, all).
+            Only meaningful together with `user_id`.
+        chunk_size (int): Number of rows fetched at a time by the fallback (default is 2000).
+
+    Returns:
+        list: (user_id, genre name, movie count) tuples, ordered by user, most movies
+            first, then by name.
+    """
+    where = 'WHERE c.user_id = %s' if user_id is not None else ''
+    params = [user_id] if user_id is not None else []
+    limit_sql = f'LIMIT {int(limit)}' if limit else ''
+
+    if connection.vendor == 'sqlite':
+        sql = f"""
+            WITH RECURSIVE split(user_id, movie_id, genre, rest) AS (
+                SELECT c.user_id, m.id, '', COALESCE(e.genres, '') || ','
+                FROM collection_movie m JOIN collection_collection c ON c.id = m.collection_id
+                JOIN collection_catalogentry e ON e.id = m.entry_id
+                {where}
+                UNION ALL
+                SELECT user_id, movie_id, TRIM(substr(rest, 1, instr(rest, ',') - 1)), substr(rest, instr(rest, ',') + 1)
+                FROM split WHERE rest <> ''
+            )
+            SELECT user_id, genre, COUNT(DISTINCT movie_id) AS movies
+            FROM split WHERE genre <> ''
+            GROUP BY user_id, genre
+            ORDER BY user_id, movies DESC, genre
+            {limit_sql}
+        """
+    elif connection.vendor == 'postgresql':
+        sql = f"""
+            SELECT c.user_id, g.genre, COUNT(DISTINCT m.id) AS movies
+            FROM collection_movie m JOIN collection_collection c ON c.id = m.collection_id
+            JOIN collection_catalogentry e ON e.id = m.entry_id
+            CROSS JOIN LATERAL (
+                SELECT trim(name) AS genre FROM unnest(string_to_array(coalesce(e.genres, ''), ',')) AS name
+            ) g
+            {where + ' AND' if where else 'WHERE'} g.genre <> ''
+            GROUP BY c.user_id, g.genre
+            ORDER BY c.user_id, movies DESC, g.genre
+            {limit_sql}
+        """
+    else:
+        movies = Movie.objects.all()
+        if user_id is not None:
+            movies = movies.filter(collection__user_id=user_id)
+        counts = Counter()
+        for owner_id, genres in movies.values_list('collection__user_id', 'entry__genres').iterator(chunk_size=chunk_size):
+            counts.update((owner_id, name) for name in parse_genres(genres))
+        rows = sorted(((owner_id, name, count) for (owner_id, name), count in counts.items()),
+                      key=lambda row: (row[0], -row[2], row[1]))
+        return rows[:limit] if limit else rows
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def rebuild_genre_stats(user_id=None):
+    """
+    Recompute UserGenreStat from the comma separated CatalogEntry.genres.
+
+    Repairs the stats if they drifted, e.g. after movies were edited outside of the
+    serializers.
+
+    Parameters:
+        user_id (int): Only rebuild the stats of this user (default is None, all users).
+
+    Returns:
+        int: The number of UserGenreStat rows written.
+    """
+    rows = csv_genre_counts(user_id)
+    with transaction.atomic():
+        stats = UserGenreStat.objects.all()
+        if user_id is not None:
+            stats = stats.filter(user_id=user_id)
+        user_ids = set(stats.values_list('user_id', flat=True)) | {owner_id for owner_id, _, _ in rows}
+        stats.delete()
+        genres = get_genres(name for _, name, _ in rows)
+        UserGenreStat.objects.bulk_create(
+            [UserGenreStat(user_id=owner_id, genre=genres[name], count=count) for owner_id, name, count in rows],
+            batch_size=1000,
+        )
+        for owner_id in user_ids:  # favourite_genres of these users may have changed
+            bump_collection_version(owner_id)
+    return len(rows)
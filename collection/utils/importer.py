@@ -0,0 +1,188 @@
+import csv
+import json
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+
+from collection.serializers import MovieSerializer
+from .entries import add_movies
+from .versions import bump_collection_version
+
+NDJSON_CONTENT_TYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl')
+CSV_CONTENT_TYPES = ('text/csv',)
+
+
+class InvalidLine(str):
+    """
+    A line of an upload that is not valid UTF-8, decoded with its invalid bytes replaced.
+
+    The parsers report the rows of such lines as failed instead of importing them.
+    """
+
+
+def read_lines(stream):
+    """
+    Decode a byte stream line by line.
+
+    Lines are decoded one at a time, so a line that is not valid UTF-8 fails on its
+    own instead of ending the upload.
+
+    Parameters:
+        stream (file-like): Binary stream, e.g. the body of a request.
+
+    Returns:
+        generator: The decoded lines, with their line endings. A leading UTF-8 BOM
+            is dropped. Lines that are not valid UTF-8 are InvalidLine instances.
+    """
+    encoding = 'utf-8-sig'
+    for line in iter(stream.readline, b''):
+        try:
+            yield line.decode(encoding)
+        except UnicodeDecodeError:
+            yield InvalidLine(line.decode(encoding, errors='replace'))
+        encoding = 'utf-8'
+
+
+def ndjson_rows(lines):
+    """
+    Parse newline delimited JSON, one movie object per line. Blank lines are skipped.
+
+    Parameters:
+        lines (iterable): Decoded lines.
+
+    Returns:
+        generator: (line number, movie dict, error) tuples. The movie is None and the
+            error is set when a line is not valid UTF-8 or not a JSON object.
+    """
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        if isinstance(line, InvalidLine):
+            yield number, None, 'Invalid UTF-8.'
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield number, None, f'Invalid JSON: {e}'
+            continue
+        if not isinstance(row, dict):
+            yield number, None, 'Expected a JSON object.'
+            continue
+        yield number, row, None
+
+
+def csv_rows(lines):
+    """
+    Parse CSV with a header row naming the movie fields (title, description, genres, uuid).
+
+    Parameters:
+        lines (iterable): Decoded lines.
+
+    Returns:
+        generator: (line number, movie dict, error) tuples. The movie is None and the
+            error is set when a line of the row is not valid UTF-8.
+    """
+    invalid = set()
+
+    def track(lines):
+        for number, line in enumerate(lines, start=1):
+            if isinstance(line, InvalidLine):
+                invalid.add(number)
+            yield line
+
+    reader = csv.DictReader(track(lines))
+    previous = 1  # the header row
+    for row in reader:
+        if invalid and any(previous < number <= reader.line_num for number in invalid):
+            yield reader.line_num, None, 'Invalid UTF-8.'
+        else:
+            yield reader.line_num, {field: value for field, value in row.items() if field is not None}, None
+        previous = reader.line_num
+
+
+def validate_rows(rows):
+    """
+    Validate parsed rows with the MovieSerializer field rules.
+
+    Parameters:
+        rows (iterable): (line number, movie dict, error) tuples.
+
+    Returns:
+        generator: (line number, validated movie data, errors) tuples, with either the
+            data or the errors set.
+    """
+    serializer = MovieSerializer()
+    for number, row, error in rows:
+        if error is not None:
+            yield number, None, error
+            continue
+        try:
+            yield number, serializer.run_validation(row), None
+        except ValidationError as e:
+            yield number, None, e.detail
+
+
+def batched(iterable, size):
+    """
+    Split an iterable into lists of at most `size` items, consuming it lazily.
+    """
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def import_movies(collection, lines, content_type, batch_size=None, max_errors=None):
+    """
+    Add the movies of an NDJSON or CSV upload to a collection.
+
+    The upload is read, parsed and validated row by row, and the valid movies are
+    inserted `batch_size` at a time, each batch in its own transaction, so memory
+    use does not depend on the size of the upload. Invalid rows and movies already
+    in the collection are skipped and reported.
+
+    Parameters:
+        collection (Collection): The collection to add the movies to.
+        lines (iterable): Decoded lines of the upload.
+        content_type (str): Media type of the upload, NDJSON or CSV.
+        batch_size (int): Number of movies inserted per query (default is
+            settings.MOVIE_BATCH_SIZE).
+        max_errors (int): Maximum number of row errors reported (default is
+            settings.MOVIE_IMPORT_MAX_ERRORS).
+
+    Returns:
+        dict: The number of movies imported, the number of rows that failed and the
+            errors of the first failed rows.
+    """
+    batch_size = batch_size or getattr(settings, 'MOVIE_BATCH_SIZE', 500)
+    max_errors = max_errors or getattr(settings, 'MOVIE_IMPORT_MAX_ERRORS', 100)
+    parse = csv_rows if content_type in CSV_CONTENT_TYPES else ndjson_rows
+    result = {'imported': 0, 'failed': 0, 'errors': []}
+
+    def fail(number, errors):
+        result['failed'] += 1
+        if len(result['errors']) < max_errors:
+            result['errors'].append({'line': number, 'errors': errors})
+
+    for chunk in batched(validate_rows(parse(lines)), batch_size):
+        batch = {}
+        for number, movie_data, errors in chunk:
+            if errors is not None:
+                fail(number, errors)
+            elif movie_data['uuid'] in batch:
+                fail(number, 'Movie listed more than once.')
+            else:
+                batch[movie_data['uuid']] = (number, movie_data)
+        if not batch:
+            continue
+
+        # Also catches movies repeated across batches, which were inserted already.
+        for uuid in collection.movies.filter(uuid__in=batch).values_list('uuid', flat=True):
+            number, _ = batch.pop(uuid)
+            fail(number, 'Movie already in the collection.')
+        with transaction.atomic():
+            movies = add_movies(collection, [movie_data for _, movie_data in batch.values()], batch_size=batch_size)
+            bump_collection_version(collection.user_id)
+        result['imported'] += len(movies)
+    return result
@@ -0,0 +1,224 @@
+import logging
+import math
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from collection.models import RouteMetric
+
+logger = logging.getLogger(__name__)
+
+# Bucket i holds latencies in [2 ** (i - 1), 2 ** i) milliseconds, bucket 0 holds
+# everything under 1ms and the last bucket everything from 2 ** (LATENCY_BUCKETS - 2) ms up.
+LATENCY_BUCKETS = 17
+
+PERCENTILES = (50, 95, 99)
+
+
+def latency_bucket(elapsed_ms):
+    """
+    Return the log-scale histogram bucket of a latency.
+
+    Parameters:
+        elapsed_ms (float): Latency in milliseconds.
+
+    Returns:
+        int: The bucket index.
+    """
+    return min(int(elapsed_ms).bit_length(), LATENCY_BUCKETS - 1)
+
+
+def bucket_upper_bound(bucket):
+    """
+    Return the upper latency bound, in milliseconds, of a histogram bucket.
+
+    Parameters:
+        bucket (int): The bucket index.
+
+    Returns:
+        int: The upper bound in milliseconds.
+    """
+    return 2 ** bucket
+
+
+def histogram_percentile(histogram, percentile):
+    """
+    Estimate a percentile from a latency histogram.
+
+    The estimate is the upper bound of the bucket the percentile falls in, so it is
+    never lower than the real value and at most twice as high.
+
+    Parameters:
+        histogram (dict): Mapping of bucket index to request count.
+        percentile (float): The percentile to estimate, between 0 and 100.
+
+    Returns:
+        int: The estimated latency in milliseconds, or None if the histogram is empty.
+    """
+    total = sum(histogram.values())
+    if not total:
+        return None
+    rank = math.ceil(total * percentile / 100)
+    seen = 0
+    for bucket in sorted(histogram):
+        seen += histogram[bucket]
+        if seen >= rank:
+            return bucket_upper_bound(bucket)
+
+
+class RouteMetrics:
+    """
+    Per-route request counts, status classes and latency histograms.
+
+    Every request adds one to an in-memory counter keyed by (route, status class,
+    latency bucket), which is a dict update under a lock. The counters are written
+    to the RouteMetric table in bulk with F() expression UPDATEs every
+    `flush_interval` seconds.
+
+    Attributes:
+        flush_interval (float): Maximum number of seconds between two flushes.
+    """
+    def __init__(self, flush_interval=10):
+        """
+        Initialize the metrics.
+
+        Parameters:
+            flush_interval (float): Maximum number of seconds between two flushes.
+        """
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = defaultdict(int)
+        self._last_flush = time.monotonic()
+
+    def record(self, route, status_code, elapsed_ms, flush=True):
+        """
+        Record one request, flushing to the database if a flush is due.
+
+        Parameters:
+            route (str): URL name of the route that served the request.
+            status_code (int): HTTP status code of the response.
+            elapsed_ms (float): Time taken to serve the request, in milliseconds.
+            flush (bool): Whether to flush when a flush is due (default is True). Async
+                callers pass False and run the flush in a thread themselves.
+
+        Returns:
+            bool: Whether a flush is due.
+        """
+        key = (route, f'{status_code // 100}xx', latency_bucket(elapsed_ms))
+        with self._lock:
+            self._pending[key] += 1
+            due = time.monotonic() - self._last_flush >= self.flush_interval
+        if due and flush:
+            self.flush_or_log()
+        return due
+
+    def flush(self):
+        """
+        Write the pending counters to the database in one transaction.
+
+        The pending counters are restored if the write fails.
+
+        Returns:
+            int: The number of requests written.
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending = self._pending
+                self._pending = defaultdict(int)
+                self._last_flush = time.monotonic()
+            if not pending:
+                return 0
+            try:
+                with transaction.atomic():
+                    for key, count in pending.items():
+                        self._write(key, count)
+            except Exception:
+                with self._lock:
+                    for key, count in pending.items():
+                        self._pending[key] += count
+                raise
+            return sum(pending.values())
+
+    def flush_or_log(self):
+        """
+        Flush the pending counters, logging a failed write instead of raising it.
+
+        Used where a flush runs after a response was produced, so a failed write of
+        the metrics does not turn a request that succeeded into an error. The pending
+        counters are kept for the next flush.
+
+        Returns:
+            int: The number of requests written, 0 if the write failed.
+        """
+        try:
+            return self.flush()
+        except Exception:
+            logger.exception('Could not flush the route metrics')
+            return 0
+
+    @staticmethod
+    def _write(key, count):
+        """
+        Add a count to the row of a (route, status class, bucket) key, creating it if missing.
+
+        The row is created in a savepoint; if another process created it in the
+        meantime, the unique constraint fails and the count is added to its row.
+        """
+        route, status_class, bucket = key
+        metrics = RouteMetric.objects.filter(route=route, status_class=status_class, bucket=bucket)
+        if metrics.update(count=F('count') + count):
+            return
+        try:
+            with transaction.atomic():
+                RouteMetric.objects.create(route=route, status_class=status_class, bucket=bucket, count=count)
+        except IntegrityError:
+            metrics.update(count=F('count') + count)
+
+    def summary(self):
+        """
+        Summarize the stored and pending metrics per route.
+
+        Returns:
+            dict: Mapping of route to its request count, status class counts and
+                p50/p95/p99 latencies in milliseconds, busiest routes first.
+        """
+        with self._flush_lock:
+            rows = list(RouteMetric.objects.values_list('route', 'status_class', 'bucket', 'count'))
+            with self._lock:
+                rows.extend(key + (count,) for key, count in self._pending.items())
+
+        statuses = defaultdict(lambda: defaultdict(int))
+        histograms = defaultdict(lambda: defaultdict(int))
+        for route, status_class, bucket, count in rows:
+            statuses[route][status_class] += count
+            histograms[route][bucket] += count
+
+        summary = {}
+        for route in sorted(histograms, key=lambda route: -sum(histograms[route].values())):
+            summary[route] = {
+                'requests': sum(histograms[route].values()),
+                'status': dict(sorted(statuses[route].items())),
+            }
+            for percentile in PERCENTILES:
+                summary[route][f'p{percentile}_ms'] = histogram_percentile(histograms[route], percentile)
+        return summary
+
+    def reset(self):
+        """
+        Delete the stored metrics and discard the pending counters.
+        """
+        with self._flush_lock:
+            with self._lock:
+                self._pending = defaultdict(int)
+                self._last_flush = time.monotonic()
+            RouteMetric.objects.all().delete()
+
+
+route_metrics = RouteMetrics(
+    flush_interval=getattr(settings, 'REQUEST_METRICS_FLUSH_INTERVAL', 10),
+)
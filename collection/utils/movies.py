@@ -0,0 +1,308 @@
+import logging
+import os
+import threading
+import time
+
+import aiohttp
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+
+from .util import get_async_client, get_shared_session
+
+logger = logging.getLogger(__name__)
+
+
+def fetch_movies_page(page_number, url=None):
+    """
+    Fetch one page of movies from the third-party movie API.
+
+    Parameters:
+        page_number (int): The page to fetch.
+        url (str): URL of the movie API (default is settings.MOVIES_API_URL).
+
+    Returns:
+        dict: The decoded JSON response of the API.
+
+    Raises:
+        requests.exceptions.RequestException: If the API could not be reached or
+            answered with an HTTP error.
+    """
+    username = os.getenv('USER_NAME')
+    password = os.getenv('PASS_WORD')
+
+    session = get_shared_session()
+    response = session.get(url or settings.MOVIES_API_URL, params={'page': page_number}, auth=(username, password))
+    response.raise_for_status()  # Raise an exception for any HTTP errors
+    return response.json()
+
+
+async def fetch_movies_page_async(page_number, url=None):
+    """
+    Fetch one page of movies from the third-party movie API without blocking the event loop.
+
+    Same as fetch_movies_page, through the async client of the running loop.
+
+    Parameters:
+        page_number (int): The page to fetch.
+        url (str): URL of the movie API (default is settings.MOVIES_API_URL).
+
+    Returns:
+        dict: The decoded JSON response of the API.
+
+    Raises:
+        requests.exceptions.RequestException: If the API could not be reached or
+            answered with an HTTP error.
+    """
+    username = os.getenv('USER_NAME')
+    password = os.getenv('PASS_WORD')
+
+    client = await get_async_client()
+    response = await client.get(url or settings.MOVIES_API_URL, params={'page': page_number},
+                                auth=aiohttp.BasicAuth(username or '', password or ''))
+    if not response.ok:
+        raise requests.exceptions.HTTPError(f'{response.status} Error for url: {response.url}')
+    return await response.json(content_type=None)
+
+
+class MoviePageCache:
+    """
+    Page-level cache for the third-party movie API.
+
+    Pages are stored in a Django cache backend, so any backend (locmem, file,
+    database, ...) can be used; eviction is left to the backend (locmem evicts the
+    least recently used pages once MAX_ENTRIES is reached).
+
+    A page is fresh for `ttl` seconds. After that it is stale but is kept for another
+    `stale_ttl` seconds: a stale page is served right away while it is refreshed in a
+    background thread, and it is also served if refreshing it fails, instead of
+    returning an error.
+
+    Pages can also be read from async code with `aget`, which fetches missing pages
+    with `afetch` without blocking the event loop. Stale pages are still refreshed
+    in a background thread, with `fetch`.
+
+    Attributes:
+        fetch (callable): Function fetching a page from the API given its number.
+        afetch (callable): Coroutine function fetching a page from the API given its
+            number, used by `aget`.
+        cache_alias (str): Alias of the Django cache the pages are stored in.
+        ttl (float): Number of seconds a page is fresh.
+        stale_ttl (float): Number of seconds a page can still be served once stale.
+        revalidate_in_background (bool): Whether stale pages are refreshed in a
+            background thread (True) or before answering (False).
+    """
+    def __init__(self, fetch, cache_alias='default', ttl=300, stale_ttl=86400, revalidate_in_background=True,
+                 afetch=None):
+        """
+        Initialize the cache.
+
+        Parameters:
+            fetch (callable): Function fetching a page from the API given its number.
+            cache_alias (str): Alias of the Django cache the pages are stored in (default is 'default').
+            ttl (float): Number of seconds a page is fresh (default is 300).
+            stale_ttl (float): Number of seconds a page can still be served once stale (default is 86400).
+            revalidate_in_background (bool): Whether stale pages are refreshed in a background
+                thread (default is True).
+            afetch (callable): Coroutine function fetching a page from the API given its
+                number (default is None, `fetch` run in a thread).
+        """
+        self.fetch = fetch
+        self.afetch = afetch or sync_to_async(fetch, thread_sensitive=False)
+        self.cache_alias = cache_alias
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.revalidate_in_background = revalidate_in_background
+        self._lock = threading.Lock()
+        self._revalidating = set()
+        self.reset_stats()
+
+    @property
+    def cache(self):
+        """
+        The Django cache the pages are stored in.
+        """
+        return caches[self.cache_alias]
+
+    def key(self, page_number):
+        """
+        Return the cache key of a page.
+        """
+        return f'movies:page:{page_number}'
+
+    def get(self, page_number):
+        """
+        Return a page of movies, from the cache when possible.
+
+        Parameters:
+            page_number (int): The page to return.
+
+        Returns:
+            dict: The decoded JSON response of the API for that page.
+
+        Raises:
+            requests.exceptions.RequestException: If the page is not cached and the
+                API could not be reached.
+        """
+        entry = self.cache.get(self.key(page_number))
+        if entry is None:
+            self._count('misses')
+            return self._refresh(page_number)
+
+        if time.time() - entry['fetched_at'] < self.ttl:
+            self._count('hits')
+            return entry['data']
+
+        self._count('stale_hits')
+        if self.revalidate_in_background:
+            self._revalidate(page_number)
+            return entry['data']
+        try:
+            return self._refresh(page_number)
+        except requests.exceptions.RequestException:
+            self._count('stale_on_error')
+            return entry['data']
+
+    async def aget(self, page_number):
+        """
+        Return a page of movies, from the cache when possible, without blocking the event loop.
+
+        Same as `get`, fetching missing pages with `afetch`.
+
+        Parameters:
+            page_number (int): The page to return.
+
+        Returns:
+            dict: The decoded JSON response of the API for that page.
+
+        Raises:
+            requests.exceptions.RequestException: If the page is not cached and the
+                API could not be reached.
+        """
+        entry = await self.cache.aget(self.key(page_number))
+        if entry is None:
+            self._count('misses')
+            return await self._arefresh(page_number)
+
+        if time.time() - entry['fetched_at'] < self.ttl:
+            self._count('hits')
+            return entry['data']
+
+        self._count('stale_hits')
+        if self.revalidate_in_background:
+            self._revalidate(page_number)
+            return entry['data']
+        try:
+            return await self._arefresh(page_number)
+        except requests.exceptions.RequestException:
+            self._count('stale_on_error')
+            return entry['data']
+
+    def stats(self):
+        """
+        Return the hit and miss counts of this process.
+
+        Returns:
+            dict: The counts, the hit ratio, the average time taken by the API and the
+                estimated time saved by the cache, in milliseconds.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        upstream_ms = stats.pop('upstream_ms')
+        lookups = stats['hits'] + stats['stale_hits'] + stats['misses']
+        served_from_cache = stats['hits'] + stats['stale_hits']
+        average_ms = upstream_ms / stats['upstream_calls'] if stats['upstream_calls'] else None
+        stats['hit_ratio'] = served_from_cache / lookups if lookups else None
+        stats['upstream_avg_ms'] = average_ms
+        stats['saved_ms'] = served_from_cache * average_ms if average_ms is not None else None
+        return stats
+
+    def reset_stats(self):
+        """
+        Reset the hit and miss counts to zero.
+        """
+        with self._lock:
+            self._stats = {
+                'hits': 0,
+                'stale_hits': 0,
+                'misses': 0,
+                'stale_on_error': 0,
+                'upstream_calls': 0,
+                'upstream_errors': 0,
+                'upstream_ms': 0.0,
+            }
+
+    def _count(self, name, amount=1):
+        """
+        Add `amount` to one of the counts.
+        """
+        with self._lock:
+            self._stats[name] += amount
+
+    def _refresh(self, page_number):
+        """
+        Fetch a page from the API and store it in the cache.
+        """
+        start = time.perf_counter()
+        try:
+            data = self.fetch(page_number)
+        except requests.exceptions.RequestException:
+            self._count('upstream_errors')
+            raise
+        finally:
+            self._count('upstream_calls')
+            self._count('upstream_ms', (time.perf_counter() - start) * 1000)
+
+        entry = {'data': data, 'fetched_at': time.time()}
+        self.cache.set(self.key(page_number), entry, timeout=self.ttl + self.stale_ttl)
+        return data
+
+    async def _arefresh(self, page_number):
+        """
+        Fetch a page from the API with `afetch` and store it in the cache.
+        """
+        start = time.perf_counter()
+        try:
+            data = await self.afetch(page_number)
+        except requests.exceptions.RequestException:
+            self._count('upstream_errors')
+            raise
+        finally:
+            self._count('upstream_calls')
+            self._count('upstream_ms', (time.perf_counter() - start) * 1000)
+
+        entry = {'data': data, 'fetched_at': time.time()}
+        await self.cache.aset(self.key(page_number), entry, timeout=self.ttl + self.stale_ttl)
+        return data
+
+    def _revalidate(self, page_number):
+        """
+        Refresh a stale page in a background thread, unless it is already being refreshed.
+        """
+        with self._lock:
+            if page_number in self._revalidating:
+                return
+            self._revalidating.add(page_number)
+
+        def revalidate():
+            try:
+                self._refresh(page_number)
+            except requests.exceptions.RequestException as e:
+                self._count('stale_on_error')
+                logger.warning('Could not revalidate movies page %s: %s', page_number, e)
+            finally:
+                with self._lock:
+                    self._revalidating.discard(page_number)
+
+        threading.Thread(target=revalidate, daemon=True).start()
+
+
+movie_page_cache = MoviePageCache(
+    fetch_movies_page,
+    cache_alias=getattr(settings, 'MOVIES_CACHE_ALIAS', 'default'),
+    ttl=getattr(settings, 'MOVIES_CACHE_TTL', 300),
+    stale_ttl=getattr(settings, 'MOVIES_CACHE_STALE_TTL', 86400),
+    revalidate_in_background=getattr(settings, 'MOVIES_CACHE_REVALIDATE_IN_BACKGROUND', True),
+    afetch=fetch_movies_page_async,
+)
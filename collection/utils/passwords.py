@@ -0,0 +1,158 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import check_password, make_password
+from django.contrib.auth.models import User
+from django.contrib.auth.signals import user_login_failed
+
+MODEL_BACKEND = 'django.contrib.auth.backends.ModelBackend'
+
+
+class HashPoolBusy(Exception):
+    """
+    Raised when a password cannot be hashed right now because the hash pool is full
+    or did not answer in time.
+    """
+
+
+class PasswordHashPool:
+    """
+    Bounded thread pool the password hashes are computed in.
+
+    Hashing a password costs tens to hundreds of milliseconds of CPU. Running the
+    hashes in `workers` threads caps the CPU that logins and registrations can take
+    from the other requests. At most `queue_size` more hashes wait for a worker;
+    past that, calls fail fast with HashPoolBusy instead of piling up.
+
+    Attributes:
+        workers (int): Number of hashes computed at the same time.
+        queue_size (int): Number of hashes allowed to wait for a worker.
+        timeout (float): Maximum number of seconds to wait for a hash.
+    """
+    def __init__(self, workers=2, queue_size=16, timeout=5):
+        """
+        Initialize the pool. Threads are started on first use.
+
+        Parameters:
+            workers (int): Number of hashes computed at the same time (default is 2).
+            queue_size (int): Number of hashes allowed to wait for a worker (default is 16).
+            timeout (float): Maximum number of seconds to wait for a hash (default is 5).
+        """
+        self.workers = workers
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+
+    def run(self, function, *args):
+        """
+        Run a hashing function in the pool and return its result.
+
+        Parameters:
+            function (callable): The function to run.
+            *args: Its arguments.
+
+        Returns:
+            The result of the function.
+
+        Raises:
+            HashPoolBusy: If the pool is full or the result took longer than `timeout`.
+        """
+        if not self._slots.acquire(blocking=False):
+            raise HashPoolBusy('Too many password hashes in progress.')
+        try:
+            future = self._executor.submit(function, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            raise HashPoolBusy('Password hash timed out.')
+
+
+hash_pool = PasswordHashPool(
+    workers=getattr(settings, 'PASSWORD_HASH_WORKERS', 2),
+    queue_size=getattr(settings, 'PASSWORD_HASH_QUEUE_SIZE', 16),
+    timeout=getattr(settings, 'PASSWORD_HASH_TIMEOUT', 5),
+)
+
+
+def hash_password(password):
+    """
+    Hash a password in the hash pool.
+
+    Parameters:
+        password (str): The raw password.
+
+    Returns:
+        str: The encoded password hash.
+
+    Raises:
+        HashPoolBusy: If the hash pool is overloaded.
+    """
+    return hash_pool.run(make_password, password)
+
+
+def check_credentials(username, password, request=None):
+    """
+    Return the active user with the given username and password.
+
+    Works like django.contrib.auth.authenticate with the ModelBackend, but the
+    password is checked in the hash pool. The user is looked up in the calling
+    thread, and a hash is computed even for unknown usernames so they take as
+    long as wrong passwords. The password is checked with Django's check_password,
+    so the stored hash is upgraded after a successful check when it was made by
+    another hasher than the preferred one or with other settings. Failed attempts
+    send the user_login_failed signal.
+
+    When other AUTHENTICATION_BACKENDS are configured, the credentials are checked
+    with authenticate() in the calling thread instead.
+
+    Parameters:
+        username (str): The username.
+        password (str): The raw password.
+        request (HttpRequest): The login request, passed on to the signal and the
+            backends (default is None).
+
+    Returns:
+        User: The user, or None if the credentials are wrong or the user is inactive.
+
+    Raises:
+        HashPoolBusy: If the hash pool is overloaded.
+    """
+    if list(settings.AUTHENTICATION_BACKENDS) != [MODEL_BACKEND]:
+        return authenticate(request, username=username, password=password)
+    user = None
+    if username and password is not None:
+        user = _check_model_credentials(username, password)
+    if user is None:
+        user_login_failed.send(sender=__name__, credentials={'username': username, 'password': '********'},
+                               request=request)
+    return user
+
+
+def _check_model_credentials(username, password):
+    """
+    Check a username and password against the User model, upgrading the stored hash if needed.
+    """
+    try:
+        user = User.objects.get_by_natural_key(username)
+    except User.DoesNotExist:
+        hash_password(password)
+        return None
+
+    upgraded = []  # filled in the pool thread, where the new hash is computed
+
+    def setter(raw_password):
+        upgraded.append(make_password(raw_password))
+
+    if not hash_pool.run(check_password, password, user.password, setter) or not user.is_active:
+        return None
+    if upgraded:
+        user.password = upgraded[0]
+        user.save(update_fields=['password'])
+    return user
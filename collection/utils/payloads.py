@@ -0,0 +1,105 @@
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.renderers import JSONRenderer
+
+from .versions import version_key
+
+
+class CollectionPayloadCache:
+    """
+    Read-through cache of the serialized collection list and detail payloads.
+
+    Payloads are stored in a Django cache backend under a key made of the user, the
+    user's collection version and the full request path (see version_key). Every write to the
+    collections of a user bumps the version (see bump_collection_version), so the
+    payloads cached before the write are never read again and are left to the
+    backend's LRU and TTL eviction.
+
+    Attributes:
+        cache_alias (str): Alias of the Django cache the payloads are stored in.
+        ttl (float): Number of seconds a payload is kept.
+    """
+    def __init__(self, cache_alias='default', ttl=300):
+        """
+        Initialize the cache.
+
+        Parameters:
+            cache_alias (str): Alias of the Django cache the payloads are stored in (default is 'default').
+            ttl (float): Number of seconds a payload is kept (default is 300).
+        """
+        self.cache_alias = cache_alias
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    @property
+    def cache(self):
+        """
+        The Django cache the payloads are stored in.
+        """
+        return caches[self.cache_alias]
+
+    def key(self, request):
+        """
+        Return the cache key of the payload of a request.
+        """
+        return f'collections:{version_key(request)}'
+
+    def get(self, request):
+        """
+        Return the cached payload of a request.
+
+        Parameters:
+            request (Request): The request.
+
+        Returns:
+            The payload, or None if it is not cached.
+        """
+        entry = self.cache.get(self.key(request))
+        with self._lock:
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+            self._stats['hits'] += 1
+            self._stats['bytes_saved'] += entry['size']
+        return entry['data']
+
+    def set(self, request, data):
+        """
+        Cache the payload of a request.
+
+        Parameters:
+            request (Request): The request.
+            data: The payload, a JSON serializable value.
+        """
+        size = len(JSONRenderer().render(data))
+        self.cache.set(self.key(request), {'data': data, 'size': size}, timeout=self.ttl)
+
+    def stats(self):
+        """
+        Return the hit and miss counts of this process.
+
+        Returns:
+            dict: The counts, the hit ratio and the number of response bytes served
+                from the cache instead of being queried and serialized again.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = stats['hits'] / lookups if lookups else None
+        return stats
+
+    def reset_stats(self):
+        """
+        Reset the hit and miss counts to zero.
+        """
+        with self._lock:
+            self._stats = {'hits': 0, 'misses': 0, 'bytes_saved': 0}
+
+
+collection_payload_cache = CollectionPayloadCache(
+    cache_alias=getattr(settings, 'COLLECTION_CACHE_ALIAS', 'default'),
+    ttl=getattr(settings, 'COLLECTION_CACHE_TTL', 300),
+)
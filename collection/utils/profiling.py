@@ -0,0 +1,131 @@
+import json
+import os
+import pstats
+from datetime import datetime, timezone
+
+from django.conf import settings
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+
+from collection.authentication import CachedJWTAuthentication, is_staff_user
+
+
+def profile_dir():
+    """
+    Return the directory profiles are written to (settings.PROFILING_DIR).
+    """
+    return getattr(settings, 'PROFILING_DIR', os.path.join(settings.BASE_DIR, 'profiles'))
+
+
+def header_key(header):
+    """
+    Return the request.META key of an HTTP header, e.g. 'HTTP_X_PROFILE' for 'X-Profile'.
+    """
+    return 'HTTP_' + header.upper().replace('-', '_')
+
+
+def is_staff_request(request):
+    """
+    Tell whether a request carries the access token of an active staff user.
+
+    Parameters:
+        request (HttpRequest): The request.
+
+    Returns:
+        bool: Whether the request is authenticated as a staff user.
+    """
+    try:
+        result = CachedJWTAuthentication().authenticate(request)
+    except (InvalidToken, AuthenticationFailed):
+        return False
+    return result is not None and is_staff_user(result[0].pk)
+
+
+def top_functions(profile, limit=10):
+    """
+    Return the functions a profile spent the most time in, excluding the functions they called.
+
+    Parameters:
+        profile (cProfile.Profile): The profile.
+        limit (int): Maximum number of functions returned (default is 10).
+
+    Returns:
+        list: The function, number of calls, own time and cumulative time in ms of
+            each function, most time first.
+    """
+    stats = pstats.Stats(profile).stats
+    rows = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)[:limit]
+    return [
+        {'function': pstats.func_std_string(function), 'calls': calls,
+         'own_ms': round(own * 1000, 3), 'cumulative_ms': round(cumulative * 1000, 3)}
+        for function, (_, calls, own, cumulative, _) in rows
+    ]
+
+
+def save_profile(profile, info):
+    """
+    Write a profile and its summary to the profiles directory.
+
+    The profile is written as `<name>.prof`, readable with pstats or snakeviz, and
+    its summary as `<name>.json`. Names start with the time of the request, and
+    only the PROFILING_MAX_FILES most recent profiles are kept.
+
+    Parameters:
+        profile (cProfile.Profile): The profile of the request.
+        info (dict): What to record about the request (view, method, path, status, duration_ms...).
+
+    Returns:
+        str: The name of the profile file.
+    """
+    directory = profile_dir()
+    os.makedirs(directory, exist_ok=True)
+    now = datetime.now(timezone.utc)
+    name = f"{now:%Y%m%dT%H%M%S%f}-{os.getpid()}-{info.get('view') or 'unresolved'}"
+    profile.dump_stats(os.path.join(directory, f'{name}.prof'))
+
+    summary = dict(info, profile=f'{name}.prof', profiled_at=now.isoformat(timespec='milliseconds'),
+                   top_functions=top_functions(profile, getattr(settings, 'PROFILING_TOP_FUNCTIONS', 10)))
+    path = os.path.join(directory, f'{name}.json')
+    with open(f'{path}.tmp', 'w') as file:
+        json.dump(summary, file)
+    os.replace(f'{path}.tmp', path)  # readers never see a partial summary
+    rotate_profiles(directory, getattr(settings, 'PROFILING_MAX_FILES', 100))
+    return f'{name}.prof'
+
+
+def rotate_profiles(directory, max_files):
+    """
+    Remove the oldest profiles of a directory, keeping the `max_files` most recent.
+    """
+    names = sorted(name[:-len('.json')] for name in os.listdir(directory) if name.endswith('.json'))
+    for name in names[:max(0, len(names) - max_files)]:
+        for suffix in ('.json', '.prof'):
+            try:
+                os.remove(os.path.join(directory, name + suffix))
+            except FileNotFoundError:
+                pass  # removed by another process
+
+
+def slowest_profiles(limit=20):
+    """
+    Return the summaries of the slowest profiled requests still in the profiles directory.
+
+    Parameters:
+        limit (int): Maximum number of summaries returned (default is 20).
+
+    Returns:
+        list: The summaries, slowest request first.
+    """
+    directory = profile_dir()
+    try:
+        names = [name for name in os.listdir(directory) if name.endswith('.json')]
+    except FileNotFoundError:
+        return []
+    summaries = []
+    for name in names:
+        try:
+            with open(os.path.join(directory, name)) as file:
+                summaries.append(json.load(file))
+        except FileNotFoundError:
+            continue  # rotated away since listed
+    summaries.sort(key=lambda summary: summary['duration_ms'], reverse=True)
+    return summaries[:limit]
@@ -0,0 +1,226 @@
+import re
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connection
+
+_recorders = ContextVar('query_recorders', default=())  # innermost last
+
+_IN_LIST = re.compile(r'\bIN \((?:%s|\?)(?:, (?:%s|\?))*\)', re.IGNORECASE)
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_SPACE = re.compile(r'\s+')
+_WRITE = re.compile(r'\s*(?:INSERT|UPDATE|DELETE|REPLACE)\b', re.IGNORECASE)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """
+    Raised when a view or a block of code runs more queries than its budget.
+
+    It is an AssertionError so that test runners report it as a test failure.
+    """
+
+
+def normalize_sql(sql):
+    """
+    Return a SQL statement with its literals and IN lists replaced by placeholders.
+
+    Statements running the same query with different values normalize to the same
+    string, so repeated ones can be counted together.
+
+    Parameters:
+        sql (str): The SQL statement.
+
+    Returns:
+        str: The normalized statement.
+    """
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql.replace('%s', '?'))
+    return _SPACE.sub(' ', sql).strip()
+
+
+class QueryRecorder:
+    """
+    Counts the SQL statements run while it is recording.
+
+    Statements are counted as run and only normalized when they are reported, so
+    recording costs one dict update per query.
+    """
+    def __init__(self):
+        """
+        Initialize an empty recorder.
+        """
+        self.statements = Counter()
+
+    @property
+    def count(self):
+        """
+        Number of queries recorded.
+        """
+        return sum(self.statements.values())
+
+    def add(self, sql):
+        self.statements[sql] += 1
+
+    def wrote(self):
+        """
+        Tell whether any of the recorded statements writes to the database.
+        """
+        return any(_WRITE.match(sql) for sql in self.statements)
+
+    def clear(self):
+        self.statements.clear()
+
+    def repeated(self, limit=5):
+        """
+        Return the most repeated statements, normalized.
+
+        Parameters:
+            limit (int): Maximum number of statements returned (default is 5).
+
+        Returns:
+            list: (count, normalized statement) tuples, most repeated first.
+        """
+        normalized = Counter()
+        for sql, count in self.statements.items():
+            normalized[normalize_sql(sql)] += count
+        return [(count, sql) for sql, count in normalized.most_common(limit)]
+
+    def report(self, limit=5):
+        """
+        Return the most repeated statements as text, one per line.
+        """
+        return '\n'.join(f'{count} x {sql}' for count, sql in self.repeated(limit))
+
+
+def current_recorder():
+    """
+    Return the innermost recorder of the current context, or None when no queries are recorded.
+    """
+    recorders = _recorders.get()
+    return recorders[-1] if recorders else None
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Database execute wrapper adding the statement to the recorders of the current context.
+    """
+    for recorder in _recorders.get():
+        recorder.add(sql)
+    return execute(sql, params, many, context)
+
+
+def install_query_recorder(connection):
+    """
+    Add record_query to the execute wrappers of a database connection.
+
+    Installed on every connection when it is created (see collection.signals), so
+    queries run in any thread are recorded, including the threads async views run
+    their queries in.
+
+    Parameters:
+        connection (BaseDatabaseWrapper): The database connection.
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@contextmanager
+def record_queries():
+    """
+    Record the queries run in the block, in this context and the threads it hands work to.
+
+    Blocks can be nested: the queries of an inner block are recorded by the outer ones too.
+
+    Yields:
+        QueryRecorder: The recorder, filled as the block runs.
+    """
+    install_query_recorder(connection)
+    recorder = QueryRecorder()
+    token = _recorders.set(_recorders.get() + (recorder,))
+    try:
+        yield recorder
+    finally:
+        _recorders.reset(token)
+
+
+@contextmanager
+def unrecorded():
+    """
+    Leave the queries run in the block out of every recorder of the current context.
+
+    Used for queries whose number does not depend on the view, e.g. the active user
+    check of authentication, which only queries on a cache miss.
+    """
+    token = _recorders.set(())
+    try:
+        yield
+    finally:
+        _recorders.reset(token)
+
+
+def budget_message(label, budget, recorder):
+    """
+    Return the message reporting a budget overrun, with the most repeated statements.
+    """
+    return f'{label} ran {recorder.count} queries, over its budget of {budget}. Most repeated:\n{recorder.report()}'
+
+
+@contextmanager
+def max_queries(budget, label='Block'):
+    """
+    Fail when the block runs more than `budget` queries.
+
+    Unlike assertNumQueries, any number of queries up to the budget passes, and the
+    failure lists the most repeated statements, which usually point at an N+1.
+
+        with max_queries(3):
+            self.client.get(url)
+
+    Parameters:
+        budget (int): Maximum number of queries.
+        label (str): Name of the block in the failure message.
+
+    Yields:
+        QueryRecorder: The recorder of the queries of the block.
+
+    Raises:
+        QueryBudgetExceeded: If the block ran more than `budget` queries.
+    """
+    with record_queries() as recorder:
+        yield recorder
+    if recorder.count > budget:
+        raise QueryBudgetExceeded(budget_message(label, budget, recorder))
+
+
+def view_name(request):
+    """
+    Return the name of the view and method that served a request, e.g. 'CollectionDetailView.get'.
+
+    Parameters:
+        request (HttpRequest): The request, after URL resolution.
+
+    Returns:
+        str: The name, or None if the request did not resolve to a view.
+    """
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return None
+    view = getattr(match.func, 'view_class', match.func)
+    return f'{view.__name__}.{request.method.lower()}'
+
+
+def query_budget(name):
+    """
+    Return the query budget of a view declared in settings.QUERY_BUDGETS, or None.
+
+    Parameters:
+        name (str): Name of the view and method, as returned by view_name().
+
+    Returns:
+        int: The maximum number of queries, or None if the view has no budget.
+    """
+    return getattr(settings, 'QUERY_BUDGETS', {}).get(name)
@@ -0,0 +1,90 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+class TokenBucketLimiter:
+    """
+    In-memory token bucket rate limiter, one bucket per key.
+
+    Every bucket holds up to `burst` tokens and refills at `rate` tokens per second.
+    An attempt takes one token and is refused when the bucket is empty, so a key
+    can make `burst` attempts at once and then `rate` attempts per second. Buckets are
+    kept in an LRU of at most `max_keys` entries, so memory stays bounded however
+    many keys are seen; an evicted bucket starts full again.
+
+    The buckets live in the memory of one process: with several worker processes,
+    every process enforces the limit on its own.
+
+    Attributes:
+        rate (float): Number of tokens added per second.
+        burst (int): Maximum number of tokens in a bucket.
+        max_keys (int): Maximum number of buckets kept.
+    """
+    def __init__(self, rate, burst, max_keys=10000):
+        """
+        Initialize the limiter.
+
+        Parameters:
+            rate (float): Number of tokens added per second.
+            burst (int): Maximum number of tokens in a bucket.
+            max_keys (int): Maximum number of buckets kept (default is 10000).
+        """
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()
+
+    def hit(self, key):
+        """
+        Take one token from the bucket of a key, if it has one.
+
+        Parameters:
+            key (str): The key, e.g. a username or an IP address.
+
+        Returns:
+            float: 0 if the attempt is allowed, otherwise the number of seconds
+                until it would be.
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)  # most recently used last
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return 0 if allowed else (1 - tokens) / self.rate
+
+    def reset(self):
+        """
+        Forget all the buckets.
+        """
+        with self._lock:
+            self._buckets.clear()
+
+
+def retry_after(seconds):
+    """
+    Return the value of a Retry-After header for a wait of `seconds`.
+    """
+    return str(max(1, math.ceil(seconds)))
+
+
+username_limiter = TokenBucketLimiter(
+    rate=getattr(settings, 'LOGIN_RATE_PER_USERNAME', 10) / 60,
+    burst=getattr(settings, 'LOGIN_BURST_PER_USERNAME', 5),
+    max_keys=getattr(settings, 'LOGIN_RATE_MAX_KEYS', 10000),
+)
+
+ip_limiter = TokenBucketLimiter(
+    rate=getattr(settings, 'LOGIN_RATE_PER_IP', 60) / 60,
+    burst=getattr(settings, 'LOGIN_BURST_PER_IP', 20),
+    max_keys=getattr(settings, 'LOGIN_RATE_MAX_KEYS', 10000),
+)
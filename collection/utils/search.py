@@ -0,0 +1,107 @@
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+from collection.models import CatalogMovie
+
+TOKEN_RE = re.compile(r'(\w+)(\*?)')
+
+# Shorter prefixes match too large a share of the catalog to be ranked quickly.
+MIN_PREFIX_LENGTH = 3
+
+# Must match the expression of the collection_catalogmovie_search index (migration 0008).
+POSTGRES_SEARCH_VECTOR = """(
+    setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(genres, '')), 'B') ||
+    setweight(to_tsvector('english', coalesce(description, '')), 'C')
+)"""
+
+
+def parse_query(query):
+    """
+    Split a search query into terms.
+
+    A term is a prefix term if it ends with `*`. The last term is always a prefix
+    term, so results show up while the user is still typing. Terms shorter than
+    MIN_PREFIX_LENGTH are only matched as whole words.
+
+    Parameters:
+        query (str): The search query typed by the user.
+
+    Returns:
+        list: (term, is_prefix) tuples, in query order.
+    """
+    terms = [(term, bool(star)) for term, star in TOKEN_RE.findall(query)]
+    if terms:
+        terms[-1] = (terms[-1][0], True)
+    return [(term, prefix and len(term) >= MIN_PREFIX_LENGTH) for term, prefix in terms]
+
+
+def search_catalog(query, page_number=1, page_size=10):
+    """
+    Full-text search the catalog mirror by title, description and genres.
+
+    On SQLite this uses the collection_catalogmovie_fts FTS5 index ranked with bm25,
+    on PostgreSQL the collection_catalogmovie_search tsvector index ranked with
+    ts_rank. Title matches rank above genre matches, which rank above description
+    matches. Other databases fall back to a case-insensitive substring scan.
+
+    Parameters:
+        query (str): The search query.
+        page_number (int): The page of results to return (default is 1).
+        page_size (int): The number of results per page (default is 10).
+
+    Returns:
+        tuple: The list of matching CatalogMovie instances on that page, and whether
+            there is a next page.
+    """
+    terms = parse_query(query)
+    if not terms:
+        return [], False
+
+    offset = (page_number - 1) * page_size
+    limit = page_size + 1  # one more to know if there is a next page
+    if connection.vendor == 'sqlite':
+        movies = _search_sqlite(terms, limit, offset)
+    elif connection.vendor == 'postgresql':
+        movies = _search_postgres(terms, limit, offset)
+    else:
+        movies = _search_fallback(terms, limit, offset)
+    return movies[:page_size], len(movies) > page_size
+
+
+def _search_sqlite(terms, limit, offset):
+    match = ' '.join(f'"{term}"*' if prefix else f'"{term}"' for term, prefix in terms)
+    return list(CatalogMovie.objects.raw(
+        """
+        SELECT m.id, m.uuid, m.title, m.description, m.genres
+        FROM collection_catalogmovie_fts
+        JOIN collection_catalogmovie m ON m.id = collection_catalogmovie_fts.rowid
+        WHERE collection_catalogmovie_fts MATCH %s
+        ORDER BY bm25(collection_catalogmovie_fts, 10.0, 1.0, 5.0), m.id
+        LIMIT %s OFFSET %s
+        """,
+        [match, limit, offset],
+    ))
+
+
+def _search_postgres(terms, limit, offset):
+    tsquery = ' & '.join(f'{term}:*' if prefix else term for term, prefix in terms)
+    return list(CatalogMovie.objects.raw(
+        f"""
+        SELECT id, uuid, title, description, genres
+        FROM collection_catalogmovie
+        WHERE {POSTGRES_SEARCH_VECTOR} @@ to_tsquery('english', %s)
+        ORDER BY ts_rank({POSTGRES_SEARCH_VECTOR}, to_tsquery('english', %s)) DESC, id
+        LIMIT %s OFFSET %s
+        """,
+        [tsquery, tsquery, limit, offset],
+    ))
+
+
+def _search_fallback(terms, limit, offset):
+    movies = CatalogMovie.objects.all()
+    for term, _ in terms:
+        movies = movies.filter(Q(title__icontains=term) | Q(description__icontains=term) | Q(genres__icontains=term))
+    return list(movies.order_by('page', 'rank')[offset:offset + limit])
@@ -0,0 +1,77 @@
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from collection.models import Movie
+from .entries import EMPTY_MOVIE, ENTRY_FIELDS, get_entries, prune_entries
+from .genres import add_movie_genres, remove_movie_genres
+
+
+def upsert_movies(collection, movies_data, replace=False):
+    """
+    Insert or update the movies of a collection in bulk, matching them by uuid.
+
+    The existing movies are loaded in one query and diffed against the given ones.
+    The catalog entries of the new and changed movies are looked up or created at
+    once (see get_entries). New movies are inserted with one bulk_create, changed
+    movies are pointed to their new entry with one bulk_update and unchanged movies
+    are not written at all. With `replace`, the movies of the collection missing
+    from `movies_data` are deleted. Everything runs in one transaction, the genre
+    stats follow the changes, and the entries left without movies are deleted.
+
+    Parameters:
+        collection (Collection): The collection the movies belong to.
+        movies_data (list): Validated movie data (title, description, genres, uuid),
+            with distinct uuids.
+        replace (bool): Whether to delete the movies missing from `movies_data`
+            (default is False).
+
+    Returns:
+        dict: The number of movies inserted, updated and removed.
+    """
+    incoming = {movie_data['uuid']: movie_data for movie_data in movies_data}
+    batch_size = getattr(settings, 'MOVIE_BATCH_SIZE', 500)
+    with transaction.atomic():
+        existing = collection.movies.all()
+        if not replace:
+            existing = existing.filter(uuid__in=incoming)
+        existing = {movie.uuid: movie for movie in existing}
+
+        created, updated, genres_changed = [], [], []
+        targets, contents = [], []  # the new and changed movies, and their new content
+        for uuid, movie_data in incoming.items():
+            movie = existing.pop(uuid, None)
+            if movie is None:
+                movie = Movie(collection=collection, uuid=uuid)
+                created.append(movie)
+                targets.append(movie)
+                contents.append(dict(EMPTY_MOVIE, **movie_data))
+                continue
+            changed = [field for field in ENTRY_FIELDS if field in movie_data and getattr(movie, field) != movie_data[field]]
+            if not changed:
+                continue
+            if 'genres' in changed:
+                genres_changed.append(movie)
+            updated.append(movie)
+            targets.append(movie)
+            contents.append({field: getattr(movie, field) for field in ENTRY_FIELDS} | movie_data)
+
+        removed = list(existing.values()) if replace else []
+        if removed or genres_changed:
+            remove_movie_genres(collection.user_id, Movie.objects.filter(pk__in=[movie.pk for movie in removed + genres_changed]))
+        if removed:
+            Movie.objects.filter(pk__in=[movie.pk for movie in removed]).delete()
+
+        previous_entries = [movie.entry_id for movie in removed + updated]
+        now = timezone.now()
+        for movie, entry in zip(targets, get_entries(contents, batch_size=batch_size) if contents else []):
+            movie.entry = entry
+            movie.updated_at = now  # bulk_update does not apply auto_now
+        if updated:
+            Movie.objects.bulk_update(updated, ['entry', 'updated_at'], batch_size=batch_size)
+        if created:
+            Movie.objects.bulk_create(created, batch_size=batch_size)
+        add_movie_genres(collection.user_id, created + genres_changed)
+        prune_entries(previous_entries)
+
+    return {'inserted': len(created), 'updated': len(updated), 'removed': len(removed)}
@@ -1,8 +1,56 @@
+import asyncio
+import socket
+import threading
+import weakref
+
+import aiohttp
 import requests
+from aiohttp.tcp_helpers import tcp_keepalive
+from django.conf import settings
+from urllib3.connection import HTTPConnection
 from urllib3.util.retry import Retry
-from requests.adapters import HTTPAdapter
+from requests.adapters import HTTPAdapter, DEFAULT_POOLSIZE
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """
+    HTTPAdapter with a default timeout and TCP keep-alive on pooled connections.
+
+    Requests sent without an explicit timeout use the adapter's `timeout`, so a
+    slow server cannot hold the calling thread forever.
+
+    Attributes:
+        timeout (float or tuple): Default (connect, read) timeout in seconds.
+        keepalive (bool): Whether SO_KEEPALIVE is set on the pooled sockets.
+    """
+    def __init__(self, timeout=None, keepalive=True, **kwargs):
+        """
+        Initialize the adapter.
 
-def create_retry_session(retries=5, backoff_factor=0.3, status_forcelist=(500, 502, 504)):
+        Parameters:
+            timeout (float or tuple): Default (connect, read) timeout in seconds (default is None).
+            keepalive (bool): Whether SO_KEEPALIVE is set on the pooled sockets (default is True).
+            **kwargs: Passed on to HTTPAdapter (pool_connections, pool_maxsize, max_retries, ...).
+        """
+        self.timeout = timeout
+        self.keepalive = keepalive
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        if self.keepalive:
+            kwargs['socket_options'] = HTTPConnection.default_socket_options + [
+                (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1),
+            ]
+        super().init_poolmanager(*args, **kwargs)
+
+    def send(self, request, timeout=None, **kwargs):
+        if timeout is None:
+            timeout = self.timeout
+        return super().send(request, timeout=timeout, **kwargs)
+
+
+def create_retry_session(retries=5, backoff_factor=0.3, status_forcelist=(500, 502, 504),
+                         pool_maxsize=DEFAULT_POOLSIZE, timeout=None, keepalive=True):
     """
     Create a session with retry functionality.
 
@@ -15,6 +63,12 @@ def create_retry_session(retries=5, backoff_factor=0.3, status_forcelist=(500, 5
             (default is 0.3).
         status_forcelist (tuple): A tuple of HTTP status codes that will trigger a retry
             (default is (500, 502, 504)).
+        pool_maxsize (int): The maximum number of connections kept open per host
+            (default is requests' DEFAULT_POOLSIZE).
+        timeout (float or tuple): The default (connect, read) timeout in seconds of
+            every request (default is None, no timeout).
+        keepalive (bool): Whether TCP keep-alive is enabled on pooled connections
+            (default is True).
 
     Returns:
         requests.Session: A requests Session object configured with retry functionality.
@@ -25,9 +79,203 @@ def create_retry_session(retries=5, backoff_factor=0.3, status_forcelist=(500, 5
         backoff_factor=backoff_factor,
         status_forcelist=status_forcelist
     )
-    adapter = HTTPAdapter(max_retries=retry)
+    adapter = PooledHTTPAdapter(timeout=timeout, keepalive=keepalive, max_retries=retry,
+                                pool_maxsize=pool_maxsize)
     session.mount("https://", adapter)
     session.mount("http://", adapter)
     return session
 
 
+_shared_session = None
+_shared_session_lock = threading.Lock()
+
+
+def get_shared_session():
+    """
+    Return the retry session shared by all the threads of this process.
+
+    The session is created on first use from the MOVIES_API_POOL_SIZE,
+    MOVIES_API_TIMEOUT and MOVIES_API_KEEPALIVE settings. Its connection pool keeps
+    connections open between requests, so only the first request to a host pays for
+    the TCP and TLS handshakes.
+
+    Returns:
+        requests.Session: The shared session.
+    """
+    global _shared_session
+    if _shared_session is None:
+        with _shared_session_lock:
+            if _shared_session is None:
+                _shared_session = create_retry_session(
+                    pool_maxsize=getattr(settings, 'MOVIES_API_POOL_SIZE', DEFAULT_POOLSIZE),
+                    timeout=getattr(settings, 'MOVIES_API_TIMEOUT', None),
+                    keepalive=getattr(settings, 'MOVIES_API_KEEPALIVE', True),
+                )
+    return _shared_session
+
+
+
+class KeepAliveConnector(aiohttp.TCPConnector):
+    """
+    TCPConnector setting SO_KEEPALIVE on the connections it opens.
+    """
+    async def _wrap_create_connection(self, *args, **kwargs):
+        transport, protocol = await super()._wrap_create_connection(*args, **kwargs)
+        tcp_keepalive(transport)
+        return transport, protocol
+
+
+class AsyncRetryClient:
+    """
+    Async counterpart of the sessions made by create_retry_session.
+
+    Requests go through an aiohttp.ClientSession, whose connector keeps connections
+    open between requests. Unlike a requests session, the number of connections is
+    only bounded by `max_connections`, so every coroutine waiting on the server has
+    a connection of its own. Like urllib3's Retry, a request is retried up to
+    `retries` times when it fails to connect or read, or when it is answered with a
+    status in `status_forcelist`, sleeping `backoff_factor * 2 ** (failures - 1)`
+    seconds before every retry but the first.
+
+    Failures are raised as the requests exceptions a retry session raises, so
+    callers handle both clients the same way.
+
+    The session belongs to the event loop the client is created in.
+
+    Attributes:
+        session (aiohttp.ClientSession): The underlying session.
+        retries (int): The maximum number of retries for each request.
+        backoff_factor (float): The backoff factor for exponential backoff between retries.
+        status_forcelist (tuple): The HTTP status codes that trigger a retry.
+    """
+    def __init__(self, retries=5, backoff_factor=0.3, status_forcelist=(500, 502, 504),
+                 max_connections=0, timeout=None, keepalive=True):
+        """
+        Initialize the client. Must be called from a running event loop.
+
+        Parameters:
+            retries (int): The maximum number of retries for each request (default is 5).
+            backoff_factor (float): The backoff factor for exponential backoff between retries
+                (default is 0.3).
+            status_forcelist (tuple): A tuple of HTTP status codes that will trigger a retry
+                (default is (500, 502, 504)).
+            max_connections (int): The maximum number of connections open at the same time;
+                requests past it wait for a free connection (default is 0, no limit).
+            timeout (float or tuple): The (connect, read) timeout in seconds of every request
+                (default is None, no timeout).
+            keepalive (bool): Whether TCP keep-alive is enabled on pooled connections
+                (default is True).
+        """
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.status_forcelist = status_forcelist
+        connect, read = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+        connector_class = KeepAliveConnector if keepalive else aiohttp.TCPConnector
+        self.session = aiohttp.ClientSession(
+            connector=connector_class(limit=max_connections),
+            timeout=aiohttp.ClientTimeout(total=None, sock_connect=connect, sock_read=read),
+        )
+
+    def backoff(self, failures):
+        """
+        Return the number of seconds to sleep after `failures` consecutive failures.
+        """
+        if failures <= 1:
+            return 0
+        return min(Retry.DEFAULT_BACKOFF_MAX, self.backoff_factor * 2 ** (failures - 1))
+
+    async def get(self, url, **kwargs):
+        """
+        Send a GET request, retrying on failure.
+
+        The body of the response is read before it is returned, so the connection is
+        back in the pool and `await response.json()` does not touch the network.
+
+        Parameters:
+            url (str): The URL.
+            **kwargs: Passed on to aiohttp.ClientSession.get (params, auth, ...).
+
+        Returns:
+            aiohttp.ClientResponse: The response.
+
+        Raises:
+            requests.exceptions.RequestException: If the server could not be reached or
+                kept answering with a status in `status_forcelist`.
+        """
+        failures = 0
+        while True:
+            error = None
+            try:
+                async with self.session.get(url, **kwargs) as response:
+                    if response.status not in self.status_forcelist:
+                        await response.read()
+                        return response
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = e
+
+            if failures >= self.retries:
+                if error is None:
+                    raise requests.exceptions.RetryError(
+                        f'Max retries exceeded with url: {url} '
+                        f'(Caused by too many {response.status} error responses)'
+                    )
+                raise self.requests_error(error) from error
+            failures += 1
+            await asyncio.sleep(self.backoff(failures))
+
+    async def close(self):
+        """
+        Close the session and its connections.
+        """
+        await self.session.close()
+
+    @staticmethod
+    def requests_error(error):
+        """
+        Return the requests exception matching an aiohttp error.
+        """
+        if isinstance(error, asyncio.TimeoutError):
+            return requests.exceptions.Timeout(str(error) or 'Request timed out')
+        return requests.exceptions.ConnectionError(str(error))
+
+
+_async_clients = weakref.WeakKeyDictionary()
+
+
+async def _close_with_loop(client):
+    """
+    Async generator closing `client` when it is finalized.
+
+    The event loop finalizes the async generators it ran when it shuts down
+    (asyncio.run and asgiref do), so the client is closed with its loop.
+    """
+    try:
+        yield
+    finally:
+        await client.close()
+
+
+async def get_async_client():
+    """
+    Return the async retry client shared by the coroutines of the running event loop.
+
+    aiohttp connections belong to the event loop they were opened in, so there is
+    one client per loop, created on first use from the MOVIES_API_TIMEOUT and
+    MOVIES_API_KEEPALIVE settings and closed when the loop shuts down. Under an ASGI
+    server one loop serves every request of the process, so they all share its
+    connections. Under WSGI, Django runs every async view in a loop of its own, so
+    views served under WSGI use get_shared_session() instead.
+
+    Returns:
+        AsyncRetryClient: The client of the running loop.
+    """
+    loop = asyncio.get_running_loop()
+    if loop not in _async_clients:
+        client = AsyncRetryClient(
+            timeout=getattr(settings, 'MOVIES_API_TIMEOUT', None),
+            keepalive=getattr(settings, 'MOVIES_API_KEEPALIVE', True),
+        )
+        closer = _close_with_loop(client)
+        await closer.__anext__()
+        _async_clients[loop] = client, closer
+    return _async_clients[loop][0]
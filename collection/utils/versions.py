@@ -0,0 +1,81 @@
+import hashlib
+from functools import wraps
+
+from django.db.models import F
+from django.utils import timezone
+from django.utils.http import http_date
+from django.utils.cache import get_conditional_response
+
+from collection.models import CollectionVersion
+
+
+def bump_collection_version(user_id):
+    """
+    Record a write to the collections or movies of a user.
+
+    Call it in the transaction of the write, so the new version is visible together
+    with the data it describes.
+
+    Parameters:
+        user_id (int): Id of the user.
+    """
+    versions = CollectionVersion.objects.filter(user_id=user_id)
+    if not versions.update(version=F('version') + 1, updated_at=timezone.now()):
+        CollectionVersion.objects.get_or_create(user_id=user_id)
+        versions.update(version=F('version') + 1, updated_at=timezone.now())
+
+
+def get_collection_version(user_id):
+    """
+    Return the version of the collections of a user.
+
+    Parameters:
+        user_id (int): Id of the user.
+
+    Returns:
+        tuple: The version number and the time of the last write, or (0, None) if
+            the user never wrote to their collections.
+    """
+    row = CollectionVersion.objects.filter(user_id=user_id).values_list('version', 'updated_at').first()
+    return row or (0, None)
+
+
+def version_key(request):
+    """
+    Return a key identifying the collection version of the user and the full path of a request.
+
+    The time of the last write is part of the key along with the version number, so
+    the key changes even if the versions are reset, e.g. when a backup is restored.
+    The version is read from `request.collection_version` when already looked up.
+    """
+    version, updated_at = getattr(request, 'collection_version', None) or get_collection_version(request.user.pk)
+    written = updated_at.timestamp() if updated_at else 0
+    return hashlib.md5(f'{request.user.pk}:{version}:{written}:{request.get_full_path()}'.encode()).hexdigest()
+
+
+def conditional_collection_get(view_method):
+    """
+    Answer conditional GET requests of a collection view from the user's collection version.
+
+    If-None-Match and If-Modified-Since are checked against the ETag and
+    Last-Modified derived from the version before the view runs, and a 304 is
+    returned when the client's copy is current. Successful responses get both headers.
+    The (version, updated_at) pair is kept in `request.collection_version` for the view.
+    """
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        version, updated_at = request.collection_version = get_collection_version(request.user.pk)
+        etag = '"%s"' % version_key(request)
+        last_modified = int(updated_at.timestamp()) if updated_at else None
+
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        response = view_method(self, request, *args, **kwargs)
+        if response.status_code == 200:
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+        return response
+    return wrapper
@@ -1,17 +1,95 @@
-from rest_framework import status
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_safe
+from rest_framework import exceptions, status
+from rest_framework.request import Request
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
 from .serializers import UserRegistrationSerializer
 import requests
-from django.contrib.auth import authenticate
-from .utils.util import create_retry_session
+from .utils.passwords import HashPoolBusy, check_credentials
+from .utils.ratelimit import ip_limiter, retry_after, username_limiter
+from .utils.movies import movie_page_cache
+from .utils.catalog import get_completed_catalog_sync, get_catalog_page
+from .utils.search import search_catalog
+from .utils.importer import CSV_CONTENT_TYPES, NDJSON_CONTENT_TYPES, import_movies, read_lines
+from .utils.exporter import export_csv, export_ndjson, export_rows
+from .utils.versions import bump_collection_version, conditional_collection_get
+from .utils.payloads import collection_payload_cache
+from .utils.genres import top_genres, remove_movie_genres
+from .utils.entries import prune_entries
 from rest_framework.decorators import api_view, authentication_classes, permission_classes
 from rest_framework.permissions import IsAuthenticated
-from .models import Collection, Movie, RequestCounter
-from .serializers import CollectionSerializer, CollectionListSerializer, CollectionDetailSerializer, CollectionUpdateSerializer
-import os
+from .models import Collection
+from .pagination import CollectionCursorPagination, MovieCursorPagination
+from .utils.counter import request_counter
+from .utils.metrics import route_metrics
+from .utils.profiling import slowest_profiles
+from .authentication import IsStaffUser
+from .serializers import MovieSerializer, CollectionSerializer, CollectionListSerializer, CollectionDetailSerializer, CollectionUpdateSerializer
 from uuid import UUID
+from urllib.parse import urlencode
+
+def throttle_login(request, username=None):
+    """
+    Rate limit a login or registration attempt before any password is hashed.
+
+    Parameters:
+    - request (HttpRequest): HTTP request of the attempt.
+    - username (str): Username tried, for login attempts.
+
+    Returns:
+    - Response: Error response with status code 429 if the client IP address or the
+                username made too many attempts, otherwise None.
+    """
+    wait = ip_limiter.hit(request.META.get('REMOTE_ADDR'))
+    if not wait and username:
+        wait = username_limiter.hit(str(username).lower())
+    if wait:
+        return Response({'error': 'Too many attempts, try again later.'},
+                        status=status.HTTP_429_TOO_MANY_REQUESTS, headers={'Retry-After': retry_after(wait)})
+    return None
+
+def hash_pool_busy():
+    """
+    Return the response to a login or registration refused because the password hash pool is full.
+    """
+    return Response({'error': 'Server busy, try again later.'},
+                    status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': '1'})
+
+def authenticate_async_view(request):
+    """
+    Authenticate a request to an async view like IsAuthenticated APIViews do.
+
+    Async views cannot be APIViews, so the request is wrapped in a DRF Request and
+    authenticated with the DEFAULT_AUTHENTICATION_CLASSES. Authentication may query
+    the database, so call this with sync_to_async.
+
+    Parameters:
+    - request (HttpRequest): HTTP request.
+
+    Returns:
+    - JsonResponse: Error response with status code 401 if the request is not
+                    authenticated, otherwise None.
+    """
+    authenticators = [authentication() for authentication in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+    drf_request = Request(request, authenticators=authenticators)
+    try:
+        if drf_request.user and drf_request.user.is_authenticated:
+            request.user = drf_request.user
+            return None
+        error = exceptions.NotAuthenticated()
+    except exceptions.APIException as e:
+        error = e
+    response = JsonResponse({'detail': error.detail}, status=status.HTTP_401_UNAUTHORIZED)
+    if authenticators:
+        response['WWW-Authenticate'] = authenticators[0].authenticate_header(drf_request)
+    return response
 
 @api_view(['POST'])
 @authentication_classes([])
@@ -34,7 +112,9 @@ def register(request):
 
     Returns:
     - Response: HTTP response containing access token on successful registration,
-                or error response with status code 400 if registration fails.
+                or error response with status code 400 if registration fails,
+                429 if there were too many attempts from the client or 503 if the
+                server is busy hashing passwords (both with a Retry-After header).
     
     Response:
         {
@@ -42,9 +122,15 @@ def register(request):
         }
     """
     if request.method == 'POST':
+        throttled = throttle_login(request)
+        if throttled:
+            return throttled
         serializer = UserRegistrationSerializer(data=request.data)
         if serializer.is_valid():
-            user = serializer.save()
+            try:
+                user = serializer.save()
+            except HashPoolBusy:
+                return hash_pool_busy()
             refresh = RefreshToken.for_user(user)
             return Response({'access_token': str(refresh.access_token)}, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -71,7 +157,10 @@ def login(request):
 
     Returns:
     - Response: HTTP response containing access token on successful login,
-                or error response with status code 401 if login fails.
+                or error response with status code 401 if login fails,
+                429 if there were too many attempts for the username or from the
+                client or 503 if the server is busy hashing passwords (both with a
+                Retry-After header).
 
     Response:
         {
@@ -83,7 +172,13 @@ def login(request):
         username = request.data.get('username')
         password = request.data.get('password')
 
-        user = authenticate(username=username, password=password)
+        throttled = throttle_login(request, username)
+        if throttled:
+            return throttled
+        try:
+            user = check_credentials(username, password, request)
+        except HashPoolBusy:
+            return hash_pool_busy()
 
         if user:
             refresh = RefreshToken.for_user(user)
@@ -92,15 +187,24 @@ def login(request):
 
     return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
 
-@api_view(['GET'])
-@permission_classes([IsAuthenticated])
-def get_movies(request):
+@require_safe
+async def get_movies(request):
     """
     Retrieve paginated list of movies from a third-party API.
 
     Makes a request to a third-party API to retrieve a paginated list of movies.
     The data is then returned in the API response.
-    Since the third-party API is flaky, the request is retried 5 times usin retry session.
+    Since the third-party API is flaky, the request is retried 5 times with backoff
+    (see collection.utils.util.AsyncRetryClient).
+    Pages are cached (see collection.utils.movies.MoviePageCache); a stale page is
+    served while it is refreshed, or when the third-party API fails.
+    Once the local catalog mirror has been synced (see the sync_catalog management
+    command), pages are served from it instead of the third-party API.
+
+    The view is async: served under ASGI, it does not hold a thread while waiting
+    for the third-party API. Under WSGI, Django runs it in an event loop of its own
+    for every request, where the async client could not reuse connections, so pages
+    are fetched with the pooled requests session shared by the process instead.
 
     GET /movies/
 
@@ -108,32 +212,89 @@ def get_movies(request):
     - request (HttpRequest): HTTP request.
 
     Returns:
-    - Response: HTTP response containing paginated list of movies,
-                or error response with status code 500 if an error occurs.
+    - JsonResponse: HTTP response containing paginated list of movies,
+                    or error response with status code 404 if the page of the local
+                    catalog does not exist or 500 if an error occurs.
     """
-    base_url = "https://demo.credy.in/api/v1/maya/movies/"
-    username = os.getenv('USER_NAME')
-    password = os.getenv('PASS_WORD')
+    error = await sync_to_async(authenticate_async_view)(request)
+    if error:
+        return error
 
     try:
-        session = create_retry_session()
-        page_number = request.query_params.get('page', 1)
-        url = f"{base_url}?page={page_number}"
-        response = session.get(url, auth=(username, password))
-        response.raise_for_status()  # Raise an exception for any HTTP errors
+        page_number = int(request.GET.get('page', 1))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid page number.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    catalog = None
+    if settings.MOVIES_SERVE_FROM_CATALOG:
+        catalog = await sync_to_async(get_completed_catalog_sync)()
+    if catalog:
+        data = await sync_to_async(get_catalog_page)(page_number, catalog)
+        if data is None:
+            return JsonResponse({'error': 'Invalid page.'}, status=status.HTTP_404_NOT_FOUND)
+    else:
+        try:
+            if isinstance(request, ASGIRequest):
+                data = dict(await movie_page_cache.aget(page_number))
+            else:
+                data = dict(await sync_to_async(movie_page_cache.get)(page_number))
+        except requests.exceptions.RequestException as e:
+            return JsonResponse({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-        data = response.json()
-        data['data'] = data.pop('results', [])
+    data['data'] = data.pop('results', [])
 
-        if data['next']:
-            data['next'] = request.build_absolute_uri(f"{request.path}?page={int(page_number) + 1}")
-        if data['previous']:
-            data['previous'] = request.build_absolute_uri(f"{request.path}?page={int(page_number) - 1}")
+    if data['next']:
+        data['next'] = request.build_absolute_uri(f"{request.path}?page={page_number + 1}")
+    if data['previous']:
+        data['previous'] = request.build_absolute_uri(f"{request.path}?page={page_number - 1}")
 
-        return Response(data)
-    
-    except requests.exceptions.RequestException as e:
-        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    return JsonResponse(data)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def search_movies(request):
+    """
+    Search the local movie catalog by title, description and genre.
+
+    Results are ranked by relevance, title matches first. The last word of the query
+    is matched as a prefix, as is any word ending with `*`.
+
+    GET /movies/search/?q=<query>&page=<page number>
+
+    Parameters:
+    - request (HttpRequest): HTTP request.
+
+    Returns:
+    - Response: HTTP response containing a page of matching movies,
+                or error response with status code 400 if the query is missing.
+
+    Response:
+        {
+            “next”: <link for next page, if present>,
+            “previous”: <link for previous page, if present>,
+            “data”: [{“title”: ..., “description”: ..., “genres”: ..., “uuid”: ...}, ...]
+        }
+    """
+    query = request.query_params.get('q', '')
+    if not query.strip():
+        return Response({'error': 'A search query is required.'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        page_number = int(request.query_params.get('page', 1))
+    except ValueError:
+        page_number = 0
+    if page_number < 1:
+        return Response({'error': 'Invalid page number.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    movies, has_next = search_catalog(query, page_number, settings.MOVIES_SEARCH_PAGE_SIZE)
+
+    def page_link(page):
+        return request.build_absolute_uri(f"{request.path}?{urlencode({'q': query, 'page': page})}")
+
+    return Response({
+        'next': page_link(page_number + 1) if has_next else None,
+        'previous': page_link(page_number - 1) if page_number > 1 else None,
+        'data': MovieSerializer(movies, many=True).data,
+    })
 
 class CollectionListView(APIView):
     """
@@ -143,6 +304,7 @@ class CollectionListView(APIView):
     """
     permission_classes = [IsAuthenticated]
 
+    @conditional_collection_get
     def get(self, request):
         """
         Handle GET request for listing collections.
@@ -152,29 +314,35 @@ class CollectionListView(APIView):
         Parameters:
         - request (HttpRequest): HTTP request.
 
+        Query parameters:
+        - cursor (str): Opaque cursor from the `next` or `previous` link of a previous page.
+        - page_size (int): Number of collections per page (default is settings.COLLECTION_PAGE_SIZE).
+
         Returns:
-        - Response: HTTP response containing serialized list of collections.
+        - Response: HTTP response containing one page of serialized collections, with
+                    links to the next and previous pages (None on the last/first page),
+                    or 304 Not Modified if the client's ETag/Last-Modified is current.
         """
+        data = collection_payload_cache.get(request)
+        if data is not None:
+            return Response(data)
+
         collections = Collection.objects.filter(user=request.user)
-        serializer = CollectionListSerializer(collections, many=True, context={'request': request})
-        user = request.user        
-        movies = Movie.objects.filter(collection__user=user)
-        genre_count = {}
-        for movie in movies:
-            for genre in movie.genres.split(','):
-                if genre != '' and genre != ' ' and genre is not None:
-                    genre_count[genre] = genre_count.get(genre, 0) + 1
-        sorted_genres = sorted(genre_count.items(), key=lambda x: x[1], reverse=True)
-        top_3_genres = [genre[0] for genre in sorted_genres[:3] if genre[0] != ''] if len(sorted_genres) >= 3 else sorted_genres
-        favourite_genres = ', '.join(top_3_genres) if top_3_genres else ""
-    
+        paginator = CollectionCursorPagination()
+        page = paginator.paginate_queryset(collections, request, view=self)
+        serializer = CollectionListSerializer(page, many=True, context={'request': request})
+        favourite_genres = ', '.join(top_genres(request.user))
+
         data = {
             'is_success': True,
             'data': {
                 'collections': serializer.data,
                 'favourite_genres': favourite_genres,
+                'next': paginator.get_next_link(),
+                'previous': paginator.get_previous_link(),
             }
         }
+        collection_payload_cache.set(request, data)
         return Response(data)
 
     def post(self, request):
@@ -215,6 +383,106 @@ class CollectionListView(APIView):
             return Response({'collection_uuid': serializer.instance.uuid}, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class CollectionImportView(APIView):
+    """
+    API view for importing movies in bulk.
+
+    Reads an NDJSON or CSV upload as a stream, so large collections can be created
+    without holding the whole upload in memory.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        """
+        Handle POST request for importing movies into a new or an existing collection.
+
+        POST /collection/import/?title=<title>&description=<description>
+        POST /collection/import/?collection=<collection_uuid>
+
+        Parameters:
+        - request (HttpRequest): HTTP request whose body holds one movie per line, as
+                                 JSON objects (Content-Type: application/x-ndjson) or
+                                 as CSV rows under a title,description,genres,uuid
+                                 header (Content-Type: text/csv).
+
+        Response payload:
+        {
+            "collection_uuid": <uuid of the collection>,
+            "imported": <number of movies added>,
+            "failed": <number of rows skipped>,
+            "errors": [{"line": <line number>, "errors": <errors>}, ...]
+        }
+
+        Returns:
+        - Response: HTTP response with status code 201 (new collection) or 200 (existing
+                    collection), 400 if the collection data is invalid, 404 if the
+                    collection does not exist or 415 if the upload type is not supported.
+        """
+        content_type = request.content_type.split(';')[0].strip().lower()
+        if content_type not in NDJSON_CONTENT_TYPES + CSV_CONTENT_TYPES:
+            return Response({'error': 'Upload NDJSON (application/x-ndjson) or CSV (text/csv).'},
+                            status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+
+        collection_uuid = request.query_params.get('collection')
+        if collection_uuid:
+            try:
+                collection = Collection.objects.get(uuid=UUID(collection_uuid), user=request.user)
+            except ValueError:
+                return Response({"error": "Invalid UUID format."}, status=status.HTTP_400_BAD_REQUEST)
+            except Collection.DoesNotExist:
+                return Response({'error': 'Collection not found'}, status=status.HTTP_404_NOT_FOUND)
+            response_status = status.HTTP_200_OK
+        else:
+            serializer = CollectionListSerializer(data=request.query_params)
+            if not serializer.is_valid():
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            with transaction.atomic():
+                collection = serializer.save(user=request.user)
+                bump_collection_version(request.user.pk)
+            response_status = status.HTTP_201_CREATED
+
+        lines = read_lines(request.stream) if request.stream is not None else []
+        result = import_movies(collection, lines, content_type)
+        return Response({'collection_uuid': collection.uuid, **result}, status=response_status)
+
+class CollectionExportView(APIView):
+    """
+    API view for exporting all the collections of a user.
+
+    Streams every movie of every collection in one response, so users can back
+    up their library without one request per collection.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """
+        Handle GET request for exporting collections.
+
+        GET /collection/export/?type=<ndjson|csv>
+
+        Parameters:
+        - request (HttpRequest): HTTP request.
+
+        Each line (or CSV row) holds one movie with its collection: collection_uuid,
+        collection_title, collection_description, title, description, genres and uuid.
+        Collections without movies have one line with empty movie fields.
+
+        Returns:
+        - StreamingHttpResponse: The export as NDJSON (default) or CSV,
+                                 or error response with status code 400 if the type is unknown.
+        """
+        export_type = request.query_params.get('type', 'ndjson')
+        if export_type not in ('ndjson', 'csv'):
+            return Response({'error': 'type must be ndjson or csv.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        rows = export_rows(request.user)
+        if export_type == 'csv':
+            response = StreamingHttpResponse(export_csv(rows), content_type=CSV_CONTENT_TYPES[0])
+        else:
+            response = StreamingHttpResponse(export_ndjson(rows), content_type=NDJSON_CONTENT_TYPES[0])
+        response['Content-Disposition'] = f'attachment; filename="collections.{export_type}"'
+        return response
+
 class CollectionDetailView(APIView):
     """
     API view for retrieving, updating, and deleting collections.
@@ -237,6 +505,7 @@ class CollectionDetailView(APIView):
         except ValueError:
             return False
 
+    @conditional_collection_get
     def get(self, request, collection_uuid):
         """
         Handle GET request for retrieving a collection.
@@ -247,19 +516,34 @@ class CollectionDetailView(APIView):
         - request (HttpRequest): HTTP request.
         - collection_uuid (str): UUID of the collection to retrieve.
 
+        Query parameters:
+        - cursor (str): Opaque cursor from the `next` or `previous` link of a previous page of movies.
+        - page_size (int): Number of movies per page (default is settings.MOVIE_PAGE_SIZE).
+
         Returns:
-        - Response: HTTP response containing serialized collection data,
+        - Response: HTTP response containing serialized collection data with one page
+                    of its movies and links to the next and previous pages,
+                    304 Not Modified if the client's ETag/Last-Modified is current,
                     or error response with status code 404 if collection does not exist.
         """
         if not self.valid_uuid(collection_uuid):
             return Response({"error": "Invalid UUID format."}, status=status.HTTP_400_BAD_REQUEST)
+        data = collection_payload_cache.get(request)
+        if data is not None:
+            return Response(data)
         try:
             collection = Collection.objects.get(uuid=collection_uuid, user=request.user)
         except Collection.DoesNotExist:
             return Response({'error': 'Collection not found'}, status=status.HTTP_404_NOT_FOUND)
 
-        serializer = CollectionDetailSerializer(collection)
-        return Response(serializer.data)
+        paginator = MovieCursorPagination()
+        movies = paginator.paginate_queryset(collection.movies.all(), request, view=self)
+        serializer = CollectionDetailSerializer(collection, context={'movies': movies})
+        data = dict(serializer.data)
+        data['next'] = paginator.get_next_link()
+        data['previous'] = paginator.get_previous_link()
+        collection_payload_cache.set(request, data)
+        return Response(data)
 
     def put(self, request, collection_uuid):
         """
@@ -278,8 +562,12 @@ class CollectionDetailView(APIView):
             “movies”: <Optional movie list to be updated>,
         }
 
+        Query parameters:
+        - replace (bool): Also delete the movies of the collection missing from `movies`.
+
         Returns:
-        - Response: HTTP response containing updated collection data,
+        - Response: HTTP response containing updated collection data and the numbers
+                    of movies inserted, updated and removed (`movies_changed`),
                     or error response with status code 404 if collection does not exist.
         """
         if not self.valid_uuid(collection_uuid):
@@ -289,10 +577,13 @@ class CollectionDetailView(APIView):
         except Collection.DoesNotExist:
             return Response({'error': 'Collection not found'}, status=status.HTTP_404_NOT_FOUND)
 
-        serializer = CollectionUpdateSerializer(collection, data=request.data, partial=True)
+        replace = request.query_params.get('replace', '').lower() in ('1', 'true', 'yes')
+        serializer = CollectionUpdateSerializer(collection, data=request.data, partial=True, context={'replace': replace})
         if serializer.is_valid():
             serializer.save()
-            return Response(serializer.data)
+            data = dict(serializer.data)
+            data['movies_changed'] = serializer.movie_changes
+            return Response(data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def delete(self, request, collection_uuid):
@@ -314,14 +605,71 @@ class CollectionDetailView(APIView):
         except Collection.DoesNotExist:
             return Response({'error': 'Collection not found'}, status=status.HTTP_404_NOT_FOUND)
 
-        collection.delete()
+        with transaction.atomic():
+            remove_movie_genres(collection.user_id, collection.movies.all())
+            entry_ids = list(collection.movies.values_list('entry_id', flat=True))
+            collection.delete()
+            prune_entries(entry_ids)
+            bump_collection_version(collection.user_id)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+class CollectionMoviesView(CollectionDetailView):
+    """
+    API view for paging through the movies of a collection.
+
+    Lets clients fetch the movies of a large collection page by page without
+    the collection metadata.
+    """
+    http_method_names = ['get', 'head', 'options']
+
+    @conditional_collection_get
+    def get(self, request, collection_uuid):
+        """
+        Handle GET request for listing the movies of a collection.
+
+        GET /collection/<collection_uuid>/movies/
+
+        Parameters:
+        - request (HttpRequest): HTTP request.
+        - collection_uuid (str): UUID of the collection.
+
+        Query parameters:
+        - cursor (str): Opaque cursor from the `next` or `previous` link of a previous page.
+        - page_size (int): Number of movies per page (default is settings.MOVIE_PAGE_SIZE).
+
+        Response:
+        {
+            "next": <link to the next page, or null>,
+            "previous": <link to the previous page, or null>,
+            "data": [<movies>]
+        }
+
+        Returns:
+        - Response: HTTP response containing one page of movies,
+                    304 Not Modified if the client's ETag/Last-Modified is current,
+                    or error response with status code 404 if collection does not exist.
+        """
+        if not self.valid_uuid(collection_uuid):
+            return Response({"error": "Invalid UUID format."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            collection = Collection.objects.get(uuid=collection_uuid, user=request.user)
+        except Collection.DoesNotExist:
+            return Response({'error': 'Collection not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        paginator = MovieCursorPagination()
+        page = paginator.paginate_queryset(collection.movies.all(), request, view=self)
+        return Response({
+            'next': paginator.get_next_link(),
+            'previous': paginator.get_previous_link(),
+            'data': MovieSerializer(page, many=True).data,
+        })
+
 class RequestCountView(APIView):
     """
     API view for retrieving the request count.
 
     Allows users to retrieve the total number of requests made to the server.
+    Requests counted in memory but not flushed to the database yet are included.
     """
     permission_classes = [IsAuthenticated]
 
@@ -342,14 +690,14 @@ class RequestCountView(APIView):
         Returns:
         - Response: HTTP response containing the request count.
         """
-        counter = RequestCounter.objects.first()
-        return Response({'requests': counter.count}, status=status.HTTP_200_OK)
+        return Response({'requests': request_counter.total()}, status=status.HTTP_200_OK)
 
 class ResetRequestCountView(APIView):
     """
     API view for resetting the request
 
-    Allows users to reset the request count.
+    Allows users to reset the request count, including the requests counted
+    in memory but not flushed to the database yet.
     """
 
     permission_classes = [IsAuthenticated]
@@ -371,8 +719,141 @@ class ResetRequestCountView(APIView):
         Returns:
         - Response: HTTP response containing the request count.
         """
- 
-        counter = RequestCounter.objects.first()
-        counter.count = 0
-        counter.save()
-        return Response({'message': 'Request count reset successfully'}, status=status.HTTP_200_OK)
\ No newline at end of file
+        request_counter.reset()
+        return Response({'message': 'Request count reset successfully'}, status=status.HTTP_200_OK)
+
+class RequestMetricsView(APIView):
+    """
+    API view for retrieving per-route request metrics.
+
+    Allows users to find the busiest and slowest routes of the server.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """
+        Handle GET request for retrieving the request metrics.
+
+        Parameters:
+        - request (HttpRequest): HTTP request.
+
+        GET /request-metrics/
+
+        Response:
+        {
+            “routes”: {
+                <url name>: {
+                    “requests”: <number of requests served by the route>,
+                    “status”: {<status class, e.g. 2xx>: <number of responses>, ...},
+                    “p50_ms”: <median latency>,
+                    “p95_ms”: <95th percentile latency>,
+                    “p99_ms”: <99th percentile latency>
+                }, ...
+            }
+        }
+
+        Latencies are upper bounds of log-scale histogram buckets, in milliseconds.
+
+        Returns:
+        - Response: HTTP response containing the metrics, busiest routes first.
+        """
+        return Response({'routes': route_metrics.summary()}, status=status.HTTP_200_OK)
+
+class CacheStatsView(APIView):
+    """
+    API view for retrieving cache statistics.
+
+    Allows users to measure how often responses are served from cache.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """
+        Handle GET request for retrieving the cache statistics of this server process.
+
+        Parameters:
+        - request (HttpRequest): HTTP request.
+
+        GET /cache-stats/
+
+        Response:
+        {
+            “movies”: {
+                “hits”: <pages served fresh from cache>,
+                “stale_hits”: <pages served stale from cache>,
+                “misses”: <pages fetched from the third-party API>,
+                “stale_on_error”: <stale pages served because the third-party API failed>,
+                “upstream_calls”: <requests made to the third-party API>,
+                “upstream_errors”: <failed requests to the third-party API>,
+                “hit_ratio”: <share of pages served from cache>,
+                “upstream_avg_ms”: <average time taken by the third-party API>,
+                “saved_ms”: <estimated time saved by the cache>
+            },
+            “collections”: {
+                “hits”: <collection payloads served from cache>,
+                “misses”: <collection payloads queried and serialized>,
+                “bytes_saved”: <response bytes served from cache>,
+                “hit_ratio”: <share of payloads served from cache>
+            }
+        }
+
+        Returns:
+        - Response: HTTP response containing the cache statistics.
+        """
+        return Response({
+            'movies': movie_page_cache.stats(),
+            'collections': collection_payload_cache.stats(),
+        }, status=status.HTTP_200_OK)
+
+class ProfilesView(APIView):
+    """
+    API view listing the slowest profiled requests (see ProfilingMiddleware).
+
+    Allows staff users to find where the time of slow requests goes.
+    """
+    permission_classes = [IsStaffUser]
+
+    def get(self, request):
+        """
+        Handle GET request for listing the slowest requests among the recent profiles.
+
+        Parameters:
+        - request (HttpRequest): HTTP request.
+
+        GET /profiles/?limit=<number of requests, default 20, at most 100>
+
+        Response:
+        {
+            “profiles”: [
+                {
+                    “view”: <view and method, e.g. CollectionListView.get>,
+                    “method”: <HTTP method>,
+                    “path”: <request path>,
+                    “status”: <response status code>,
+                    “duration_ms”: <time taken by the request>,
+                    “reason”: <“sample” or “header”>,
+                    “pid”: <server process id>,
+                    “profile”: <name of the cProfile file in PROFILING_DIR>,
+                    “profiled_at”: <time of the request>,
+                    “top_functions”: [
+                        {
+                            “function”: <file:line(function)>,
+                            “calls”: <number of calls>,
+                            “own_ms”: <time spent in the function itself>,
+                            “cumulative_ms”: <time spent in the function and the functions it called>
+                        }, ...
+                    ]
+                }, ...
+            ]
+        }
+
+        Returns:
+        - Response: HTTP response containing the profiles, slowest request first.
+        """
+        try:
+            limit = min(int(request.query_params.get('limit', 20)), 100)
+            if limit < 1:
+                raise ValueError
+        except ValueError:
+            return Response({'error': 'Invalid limit.'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'profiles': slowest_profiles(limit)}, status=status.HTTP_200_OK)
@@ -1,17 +1,45 @@
-from django.db import transaction
-from collection.models import RequestCounter
+import cProfile
+import logging
+import os
+import random
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from collection.utils.counter import request_counter
+from collection.utils.metrics import route_metrics
+from collection.utils.profiling import header_key, is_staff_request, save_profile
+from collection.utils.queries import (
+    QueryBudgetExceeded, budget_message, current_recorder, query_budget, record_queries, view_name,
+)
+
+logger = logging.getLogger(__name__)
 
 class RequestCounterMiddleware:
     """
     Middleware to count the incoming requests.
 
-    This middleware intercepts incoming requests and increments the request counter
-    stored in the database. It uses a transaction to ensure that the counter is
-    incremented atomically.
+    This middleware intercepts incoming requests and increments the request counter.
+    Increments are buffered in process memory and flushed to the database in bulk
+    (see collection.utils.counter.BufferedRequestCounter), so requests are not
+    serialized on a row lock.
+
+    It also records per-route request counts, status classes and latency histograms
+    (see collection.utils.metrics.RouteMetrics). Routes are keyed by URL name.
+
+    The middleware supports both sync and async requests, so async views served
+    under ASGI are not moved to a thread by it; only the periodic database flushes
+    are.
 
     Attributes:
         get_response (callable): The next middleware or view function in the chain.
     """
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         """
         Initialize the middleware.
@@ -20,14 +48,16 @@ class RequestCounterMiddleware:
             get_response (callable): The next middleware or view function in the chain.
         """
         self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
         """
         Call method to process incoming requests.
 
-        This method is called for each incoming request. It intercepts the request,
-        increments the request counter, and then passes the request to the next middleware
-        or view function in the chain.
+        This method is called for each incoming request. It passes the request to the
+        next middleware or view function in the chain and records the time taken and
+        the response status against the route that served it.
 
         Parameters:
             request (HttpRequest): The incoming HTTP request.
@@ -35,15 +65,47 @@ class RequestCounterMiddleware:
         Returns:
             HttpResponse: The HTTP response generated by the next middleware or view function.
         """
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = time.perf_counter()
         response = self.get_response(request)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        route_metrics.record(self.route(request), response.status_code, elapsed_ms)
+        return response
+
+    async def __acall__(self, request):
+        """
+        Async version of __call__, used when the chain is async.
+
+        Parameters:
+            request (HttpRequest): The incoming HTTP request.
+
+        Returns:
+            HttpResponse: The HTTP response generated by the next middleware or view function.
+        """
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        if route_metrics.record(self.route(request), response.status_code, elapsed_ms, flush=False):
+            await sync_to_async(route_metrics.flush_or_log)()
         return response
 
+    @staticmethod
+    def route(request):
+        """
+        Return the URL name of the route that served a request, or 'unresolved'.
+        """
+        match = getattr(request, 'resolver_match', None)
+        return match.url_name if match and match.url_name else 'unresolved'
+
     def process_view(self, request, view_func, view_args, view_kwargs):
         """
         Process the view function.
 
         This method is called just before the view function is called. It increments
-        the request counter stored in the database using a transaction to ensure atomicity.
+        the in-memory request counter, which is flushed to the database periodically.
 
         Parameters:
             request (HttpRequest): The incoming HTTP request.
@@ -51,7 +113,241 @@ class RequestCounterMiddleware:
             view_args (tuple): The arguments passed to the view function.
             view_kwargs (dict): The keyword arguments passed to the view function.
         """
-        with transaction.atomic():
-            counter, created = RequestCounter.objects.select_for_update().get_or_create(pk=1)
-            counter.count += 1
-            counter.save()
\ No newline at end of file
+        request_counter.increment()
+
+
+class ProfilingMiddleware:
+    """
+    Middleware profiling a sample of the requests with cProfile.
+
+    A share PROFILING_SAMPLE_RATE of the requests is profiled, as well as the
+    requests of staff users carrying the PROFILING_HEADER header (any value). The
+    profiles are written to PROFILING_DIR (see collection.utils.profiling), and the
+    slowest ones are listed by /profiles/. Profiled header requests get the name of
+    their profile in the same header of the response.
+
+    With a sample rate of 0, requests without the header only cost a dict lookup;
+    with no header either, the middleware is removed from the chain.
+
+    Under ASGI, a profile records everything the event loop ran while the request
+    was served, other requests included, and only one request is profiled at a time.
+
+    Attributes:
+        get_response (callable): The next middleware or view function in the chain.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        """
+        Initialize the middleware.
+
+        Parameters:
+            get_response (callable): The next middleware or view function in the chain.
+
+        Raises:
+            MiddlewareNotUsed: If there is neither a sample rate nor a header.
+        """
+        self.sample_rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 0)
+        self.header = getattr(settings, 'PROFILING_HEADER', None)
+        if not self.sample_rate and not self.header:
+            raise MiddlewareNotUsed
+        self.header_key = header_key(self.header) if self.header else None
+        self.async_lock = threading.Lock()
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def reason(self, request):
+        """
+        Return why a request should be profiled ('header' or 'sample'), or None.
+
+        A 'header' request still has to be checked with is_staff_request.
+        """
+        if self.header_key and self.header_key in request.META:
+            return 'header'
+        if self.sample_rate and random.random() < self.sample_rate:
+            return 'sample'
+        return None
+
+    def __call__(self, request):
+        """
+        Profile the request if it is sampled or sent by staff with the header.
+
+        Parameters:
+            request (HttpRequest): The incoming HTTP request.
+
+        Returns:
+            HttpResponse: The HTTP response generated by the next middleware or view function.
+        """
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        reason = self.reason(request)
+        if reason == 'header' and not is_staff_request(request):
+            reason = None
+        if reason is None:
+            return self.get_response(request)
+
+        profile = cProfile.Profile()
+        start = time.perf_counter()
+        profile.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            profile.disable()
+        self.save(request, response, profile, reason, start)
+        return response
+
+    async def __acall__(self, request):
+        """
+        Async version of __call__, used when the chain is async.
+
+        Parameters:
+            request (HttpRequest): The incoming HTTP request.
+
+        Returns:
+            HttpResponse: The HTTP response generated by the next middleware or view function.
+        """
+        reason = self.reason(request)
+        if reason == 'header' and not await sync_to_async(is_staff_request)(request):
+            reason = None
+        if reason is None or not self.async_lock.acquire(blocking=False):
+            return await self.get_response(request)
+
+        try:
+            profile = cProfile.Profile()
+            start = time.perf_counter()
+            profile.enable()
+            try:
+                response = await self.get_response(request)
+            finally:
+                profile.disable()
+        finally:
+            self.async_lock.release()
+        await sync_to_async(self.save)(request, response, profile, reason, start)
+        return response
+
+    def save(self, request, response, profile, reason, start):
+        """
+        Write the profile of a served request, naming it in the response of header requests.
+        """
+        name = save_profile(profile, {
+            'view': view_name(request),
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': round((time.perf_counter() - start) * 1000, 2),
+            'reason': reason,
+            'pid': os.getpid(),
+        })
+        if reason == 'header':
+            response[self.header] = name
+
+
+class QueryBudgetMiddleware:
+    """
+    Middleware recording the SQL queries of every request, to catch N+1 patterns.
+
+    The queries run by the view are counted against the budget declared for the view
+    and method in settings.QUERY_BUDGETS, e.g. 'CollectionDetailView.get'. When a
+    view goes over its budget, QueryBudgetExceeded is raised if QUERY_BUDGET_MODE is
+    'raise' (the default in the tests, so they fail), or a warning listing the most
+    repeated statements is logged if it is 'log'. A view that wrote to the database
+    is never failed after the fact: its overrun is logged as an error instead. A statement repeated
+    QUERY_REPEAT_THRESHOLD times or more in one request is logged as a possible N+1,
+    budget or not. With 'off', the middleware is removed from the chain.
+
+    Queries run before the view, e.g. by other middleware, while a streaming response
+    is consumed, and by the active user check of authentication are not counted.
+
+    Attributes:
+        get_response (callable): The next middleware or view function in the chain.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        """
+        Initialize the middleware.
+
+        Parameters:
+            get_response (callable): The next middleware or view function in the chain.
+
+        Raises:
+            MiddlewareNotUsed: If QUERY_BUDGET_MODE is 'off'.
+        """
+        if getattr(settings, 'QUERY_BUDGET_MODE', 'off') == 'off':
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        """
+        Record the queries of a request and check them once it is served.
+
+        Parameters:
+            request (HttpRequest): The incoming HTTP request.
+
+        Returns:
+            HttpResponse: The HTTP response generated by the next middleware or view function.
+
+        Raises:
+            QueryBudgetExceeded: If the view went over its budget in 'raise' mode.
+        """
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with record_queries() as recorder:
+            response = self.get_response(request)
+        self.check(request, recorder)
+        return response
+
+    async def __acall__(self, request):
+        """
+        Async version of __call__, used when the chain is async.
+
+        The queries of async views run in other threads, in a copy of the request's
+        context, and are recorded by the same recorder.
+        """
+        with record_queries() as recorder:
+            response = await self.get_response(request)
+        self.check(request, recorder)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        """
+        Forget the queries run before the view, so only the view's count against its budget.
+        """
+        recorder = current_recorder()
+        if recorder is not None:
+            recorder.clear()
+
+    @staticmethod
+    def check(request, recorder):
+        """
+        Check the queries of a served request against the budget of its view.
+
+        Parameters:
+            request (HttpRequest): The served request.
+            recorder (QueryRecorder): The queries of the request.
+
+        Raises:
+            QueryBudgetExceeded: If the view went over its budget without writing, in
+                'raise' mode.
+        """
+        name = view_name(request)
+        if name is None or not recorder.count:
+            return
+        budget = query_budget(name)
+        if budget is not None and recorder.count > budget:
+            message = budget_message(name, budget, recorder)
+            if getattr(settings, 'QUERY_BUDGET_MODE', 'off') == 'raise':
+                if not recorder.wrote():
+                    raise QueryBudgetExceeded(message)
+                logger.error('%s\nNot raised, the view already wrote to the database.', message)
+                return
+            logger.warning(message)
+            return
+        top = recorder.repeated(limit=1)
+        if top and top[0][0] >= getattr(settings, 'QUERY_REPEAT_THRESHOLD', 10):
+            logger.warning('Possible N+1 in %s, %s queries. Most repeated:\n%s', name, recorder.count, recorder.report())
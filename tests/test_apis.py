@@ -1,10 +1,46 @@
+from django.contrib.auth.hashers import get_hasher, identify_hasher, make_password
 from django.contrib.auth.models import User
+from django.contrib.auth.signals import user_login_failed
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
+from rest_framework_simplejwt.tokens import RefreshToken
+from django.test import AsyncClient
 from django.urls import reverse
-from collection.models import Collection, Movie, RequestCounter
+from django.core.cache import caches
+from django.db import DatabaseError
+from django.db.models import QuerySet, Sum
+from contextlib import contextmanager
+from unittest import mock
+import csv
+import json
+import time
+import requests
+from uuid import uuid4
+from collection.authentication import active_user_key
+from collection.models import CatalogEntry, Collection, Movie, RequestCounter, RouteMetric, UserGenreStat
+from collection.utils.counter import request_counter
+from collection.utils.metrics import route_metrics, histogram_percentile
+from collection.utils.movies import movie_page_cache
+from collection.utils.payloads import collection_payload_cache
+from collection.utils.passwords import HashPoolBusy, hash_pool
+from collection.utils.ratelimit import ip_limiter, username_limiter
+from collection.utils.entries import add_movies, get_entries
+from collection.utils.genres import csv_genre_counts, rebuild_genre_stats, top_genres
+
+@contextmanager
+def deferred_metrics():
+    """Keep the request counter and route metrics from flushing to the database, e.g. in assertNumQueries."""
+    with mock.patch.object(request_counter, 'flush'), mock.patch.object(route_metrics, 'flush'):
+        yield
+
+def reset_login_limits():
+    ip_limiter.reset()
+    username_limiter.reset()
 
 class RegistrationTestCase(APITestCase):
+    def setUp(self):
+        reset_login_limits()
+
     def test_registration(self):
         data = {"username": "testuser", "password": "testpass"}
         response = self.client.post("/register/", data)
@@ -13,6 +49,7 @@ class RegistrationTestCase(APITestCase):
 
 class LoginTestCase(APITestCase):
     def setUp(self):
+        reset_login_limits()
         self.user = User.objects.create_user(username="testuser", password="testpass")
 
     def test_login(self):
@@ -21,6 +58,96 @@ class LoginTestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertTrue('access_token' in response.json())
 
+    def test_login_with_wrong_password(self):
+        response = self.client.post("/login/", {"username": "testuser", "password": "wrong"})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_login_upgrades_hash_of_another_hasher(self):
+        self.user.password = make_password("testpass", hasher="pbkdf2_sha1")
+        self.user.save()
+        response = self.client.post("/login/", {"username": "testuser", "password": "testpass"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertEqual(identify_hasher(self.user.password).algorithm, get_hasher().algorithm)
+        self.assertTrue(self.user.check_password("testpass"))
+
+    def test_failed_login_sends_signal(self):
+        handler = mock.Mock()
+        user_login_failed.connect(handler)
+        self.addCleanup(user_login_failed.disconnect, handler)
+        self.client.post("/login/", {"username": "testuser", "password": "wrong"})
+        self.client.post("/login/", {"username": "nobody", "password": "wrong"})
+        self.assertEqual([call.kwargs['credentials']['username'] for call in handler.call_args_list],
+                         ["testuser", "nobody"])
+        self.assertNotIn("wrong", str(handler.call_args_list))
+
+    def test_login_uses_other_authentication_backends(self):
+        backends = ["django.contrib.auth.backends.ModelBackend", "django.contrib.auth.backends.RemoteUserBackend"]
+        with self.settings(AUTHENTICATION_BACKENDS=backends), \
+                mock.patch("collection.utils.passwords.authenticate", return_value=self.user) as authenticate:
+            response = self.client.post("/login/", {"username": "testuser", "password": "testpass"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(authenticate.call_args.kwargs, {"username": "testuser", "password": "testpass"})
+
+    def test_login_attempts_are_rate_limited_per_username(self):
+        with mock.patch.object(hash_pool, 'run', return_value=False) as run:
+            for _ in range(5):
+                self.client.post("/login/", {"username": "TestUser", "password": "wrong"})
+            response = self.client.post("/login/", {"username": "testuser", "password": "testpass"})
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+        self.assertEqual(run.call_count, 5)  # the refused attempt hashed nothing
+
+    def test_login_when_hash_pool_is_busy(self):
+        with mock.patch.object(hash_pool, 'run', side_effect=HashPoolBusy):
+            response = self.client.post("/login/", {"username": "testuser", "password": "testpass"})
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response['Retry-After'], '1')
+
+class TokenAuthenticationTestCase(APITestCase):
+    def setUp(self):
+        reset_login_limits()
+        self.user = User.objects.create_user(username="testuser", password="testpass")
+        response = self.client.post("/login/", {"username": "testuser", "password": "testpass"})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.json()['access_token']}")
+
+    def test_user_is_not_loaded_on_every_request(self):
+        self.assertEqual(self.client.get("/collection/").status_code, status.HTTP_200_OK)
+        with deferred_metrics(), self.assertNumQueries(1):  # the collection version, served from cache
+            self.assertEqual(self.client.get("/collection/").status_code, status.HTTP_200_OK)
+
+    def test_created_collection_belongs_to_token_user(self):
+        response = self.client.post("/collection/", {"title": "Collection", "description": "Description", "movies": []}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Collection.objects.get().user, self.user)
+
+    def test_deactivated_user_is_refused(self):
+        self.client.get("/collection/")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        self.assertEqual(self.client.get("/collection/").status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_user_is_refused(self):
+        self.client.get("/collection/")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+        self.assertEqual(self.client.get("/collection/").status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_active_users_are_cached_in_the_configured_cache(self):
+        with self.settings(AUTH_ACTIVE_USER_CACHE_ALIAS='collections'):
+            self.client.get("/collection/")
+            self.assertTrue(caches['collections'].get(active_user_key(self.user.pk)))
+            with self.captureOnCommitCallbacks(execute=True):
+                self.user.is_active = False
+                self.user.save()
+                self.assertTrue(caches['collections'].get(active_user_key(self.user.pk)))  # until the commit
+            self.assertIsNone(caches['collections'].get(active_user_key(self.user.pk)))
+
+    def test_invalid_token_is_refused(self):
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer not-a-token")
+        self.assertEqual(self.client.get("/collection/").status_code, status.HTTP_401_UNAUTHORIZED)
+
 class CollectionTestCase(APITestCase):
     def setUp(self):
         self.user = User.objects.create_user(username="testuser", password="testpass")
@@ -36,6 +163,21 @@ class CollectionTestCase(APITestCase):
         response = self.client.post("/collection/", data, format='json')
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
 
+    def test_create_collection_with_duplicate_movies(self):
+        movie = {"title": "Movie", "description": "Description", "genres": "Drama", "uuid": str(uuid4())}
+        data = {"title": "my title 2", "description": "collection description", "movies": [movie, movie]}
+        response = self.client.post("/collection/", data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_failed_create_leaves_no_collection(self):
+        movie = {"title": "Movie", "description": "Description", "genres": "Drama", "uuid": str(uuid4())}
+        data = {"title": "my title 2", "description": "collection description", "movies": [movie]}
+        with mock.patch('collection.utils.entries.add_movie_genres', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                self.client.post("/collection/", data, format='json')
+        self.assertFalse(Collection.objects.filter(title="my title 2").exists())
+        self.assertFalse(Movie.objects.exists())
+
     def test_get_collection_detail(self):
         response = self.client.get(reverse("rud_collection", kwargs={"collection_uuid": self.collection.uuid}))
         self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -49,10 +191,325 @@ class CollectionTestCase(APITestCase):
         response = self.client.delete(reverse("rud_collection", kwargs={"collection_uuid": self.collection.uuid}))
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
 
+class CollectionUpdateTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpass")
+        self.client.force_authenticate(user=self.user)
+        self.collection = Collection.objects.create(user=self.user, title="Collection", description="Description")
+        self.movies = [
+            {"title": f"Movie {i}", "description": "Description", "genres": "Drama", "uuid": str(uuid4())} for i in range(3)
+        ]
+        self.url = reverse("rud_collection", kwargs={"collection_uuid": self.collection.uuid})
+        self.client.put(self.url, {"movies": self.movies}, format='json')
+
+    def test_update_reports_changes(self):
+        movies = [dict(self.movies[0], genres="Comedy"), self.movies[1], self.new_movie()]
+        response = self.client.put(self.url, {"movies": movies}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['movies_changed'], {"inserted": 1, "updated": 1, "removed": 0})
+        self.assertEqual(self.collection.movies.count(), 4)
+        self.assertEqual(top_genres(self.user), ["Drama", "Comedy"])
+
+    def test_replace_removes_missing_movies(self):
+        response = self.client.put(self.url + "?replace=true", {"movies": [self.movies[0]]}, format='json')
+        self.assertEqual(response.json()['movies_changed'], {"inserted": 0, "updated": 0, "removed": 2})
+        self.assertEqual(list(self.collection.movies.values_list('entry__title', flat=True)), ["Movie 0"])
+        self.assertEqual(UserGenreStat.objects.get(user=self.user).count, 1)
+
+    def test_update_query_count_does_not_grow_with_movies(self):
+        movies = [self.new_movie() for _ in range(50)] + [dict(movie, title="Renamed") for movie in self.movies]
+        with deferred_metrics(), self.assertNumQueries(22):
+            self.client.put(self.url, {"movies": movies}, format='json')
+        self.assertEqual(self.collection.movies.filter(entry__title="Renamed").count(), 3)
+
+    def test_update_with_duplicate_movies(self):
+        response = self.client.put(self.url, {"movies": [self.movies[0], self.movies[0]]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def new_movie(self):
+        return {"title": "New", "description": "Description", "genres": "Drama", "uuid": str(uuid4())}
+
+class CatalogEntryTestCase(APITestCase):
+    def setUp(self):
+        self.movie = {"title": "Movie", "description": "A long description." * 20, "genres": "Drama", "uuid": str(uuid4())}
+        self.clients = []
+        for name in ("first", "second"):
+            user = User.objects.create_user(username=name, password="testpass")
+            client = APIClient()
+            client.force_authenticate(user=user)
+            response = client.post("/collection/", {"title": name, "description": "Description", "movies": [self.movie]}, format='json')
+            detail_url = reverse("rud_collection", kwargs={"collection_uuid": response.json()['collection_uuid']})
+            self.clients.append((client, detail_url))
+
+    def test_collections_share_entries(self):
+        self.assertEqual((Movie.objects.count(), CatalogEntry.objects.count()), (2, 1))
+        client, detail_url = self.clients[1]
+        self.assertEqual(client.get(detail_url).json()['movies'], [self.movie])
+
+    def test_changes_do_not_leak_to_other_collections(self):
+        client, detail_url = self.clients[0]
+        client.put(detail_url, {"movies": [dict(self.movie, title="Renamed")]}, format='json')
+        self.assertEqual(client.get(detail_url).json()['movies'][0]['title'], "Renamed")
+        client, detail_url = self.clients[1]
+        self.assertEqual(client.get(detail_url).json()['movies'], [self.movie])
+        self.assertEqual(CatalogEntry.objects.count(), 2)
+
+    def test_unused_entries_are_deleted(self):
+        for client, detail_url in self.clients:
+            client.delete(detail_url)
+        self.assertFalse(CatalogEntry.objects.exists())
+
+class CollectionImportTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpass")
+        self.client.force_authenticate(user=self.user)
+
+    def test_import_ndjson(self):
+        movies = [{"title": f"Movie {i}", "description": "Description", "genres": "Drama", "uuid": str(uuid4())} for i in range(5)]
+        body = "\n".join(json.dumps(movie) for movie in movies) + "\n\nnot json\n" + json.dumps(movies[0])
+        with self.settings(MOVIE_BATCH_SIZE=2):
+            response = self.client.post("/collection/import/?title=Imported&description=Description", body,
+                                        content_type="application/x-ndjson")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        data = response.json()
+        self.assertEqual((data['imported'], data['failed']), (5, 2))
+        self.assertEqual([error['line'] for error in data['errors']], [7, 8])
+        collection = Collection.objects.get(uuid=data['collection_uuid'])
+        self.assertEqual(collection.movies.count(), 5)
+        self.assertEqual(top_genres(self.user), ["Drama"])
+
+    def test_import_csv_into_existing_collection(self):
+        collection = Collection.objects.create(user=self.user, title="Collection", description="Description")
+        body = f"title,description,genres,uuid\nMovie,\"A movie, with a comma\",Drama,{uuid4()}\nBad,Description,Drama,not-a-uuid\n"
+        response = self.client.post(f"/collection/import/?collection={collection.uuid}", body, content_type="text/csv")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['imported'], 1)
+        self.assertEqual(response.json()['errors'][0]['line'], 3)
+        self.assertEqual(collection.movies.get().entry.description, "A movie, with a comma")
+
+    def test_import_reports_lines_that_are_not_utf8(self):
+        collection = Collection.objects.create(user=self.user, title="Collection", description="Description")
+        movie = {"title": "Movie", "description": "Description", "genres": "Drama", "uuid": str(uuid4())}
+        body = b'{"uuid": "\xff\xfe"}\n' + json.dumps(movie).encode()
+        response = self.client.post(f"/collection/import/?collection={collection.uuid}", body,
+                                    content_type="application/x-ndjson")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['imported'], 1)
+        self.assertEqual(response.json()['errors'], [{'line': 1, 'errors': 'Invalid UTF-8.'}])
+
+        body = f"title,description,genres,uuid\nMovie,Description,Drama,{uuid4()}\n".encode() + b"Bad,\xff,Drama,x\n"
+        response = self.client.post(f"/collection/import/?collection={collection.uuid}", body, content_type="text/csv")
+        self.assertEqual(response.json()['imported'], 1)
+        self.assertEqual(response.json()['errors'], [{'line': 3, 'errors': 'Invalid UTF-8.'}])
+
+    def test_import_requires_ndjson_or_csv(self):
+        response = self.client.post("/collection/import/?title=Imported&description=Description", {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+        self.assertFalse(Collection.objects.exists())
+
+class CollectionExportTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpass")
+        self.client.force_authenticate(user=self.user)
+        self.collection = Collection.objects.create(user=self.user, title="Collection", description="Description")
+        self.movies = add_movies(self.collection, [
+            {"title": f"Movie {i}", "description": "A movie, with a comma", "genres": "Drama", "uuid": uuid4()}
+            for i in range(3)
+        ])
+        self.empty = Collection.objects.create(user=self.user, title="Empty", description="Description")
+        other = User.objects.create_user(username="other", password="testpass")
+        Collection.objects.create(user=other, title="Other", description="Description")
+
+    def content(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_export_ndjson(self):
+        with self.settings(COLLECTION_EXPORT_CHUNK_SIZE=2):
+            response = self.client.get("/collection/export/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rows = [json.loads(line) for line in self.content(response).splitlines()]
+        self.assertEqual([row['title'] for row in rows], ["Movie 0", "Movie 1", "Movie 2", None])
+        self.assertEqual(rows[0]['collection_uuid'], str(self.collection.uuid))
+        self.assertEqual(rows[0]['uuid'], str(self.movies[0].uuid))
+        self.assertEqual(rows[3]['collection_title'], "Empty")
+
+    def test_export_csv(self):
+        response = self.client.get("/collection/export/?type=csv")
+        self.assertEqual(response['Content-Type'], "text/csv")
+        rows = list(csv.DictReader(self.content(response).splitlines()))
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[0]['description'], "A movie, with a comma")
+
+    def test_export_can_be_imported(self):
+        body = self.content(self.client.get("/collection/export/"))
+        response = self.client.post("/collection/import/?title=Copy&description=Description", body,
+                                    content_type="application/x-ndjson")
+        self.assertEqual(response.json()['imported'], 3)
+
+class ConditionalGetTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpass")
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post("/collection/", {"title": "Collection", "description": "Description", "movies": []}, format='json')
+        self.detail_url = reverse("rud_collection", kwargs={"collection_uuid": response.json()['collection_uuid']})
+
+    def test_unchanged_collections_are_not_modified(self):
+        for url in ("/collection/", self.detail_url):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            with deferred_metrics(), self.assertNumQueries(1):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_if_modified_since(self):
+        last_modified = self.client.get("/collection/")['Last-Modified']
+        response = self.client.get("/collection/", HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_writes_change_the_etag(self):
+        etag = self.client.get("/collection/")['ETag']
+        self.client.put(self.detail_url, {"title": "Renamed"}, format='json')
+        response = self.client.get("/collection/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+        self.client.delete(self.detail_url)
+        response = self.client.get("/collection/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['data']['collections'], [])
+
+    def test_pages_have_their_own_etag(self):
+        self.assertNotEqual(self.client.get("/collection/")['ETag'], self.client.get("/collection/?page_size=1")['ETag'])
+
+class CollectionPayloadCacheTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpass")
+        self.client.force_authenticate(user=self.user)
+        movies = [{"title": "Movie", "description": "Description", "genres": "Drama", "uuid": str(uuid4())}]
+        response = self.client.post("/collection/", {"title": "Collection", "description": "Description", "movies": movies}, format='json')
+        self.detail_url = reverse("rud_collection", kwargs={"collection_uuid": response.json()['collection_uuid']})
+        collection_payload_cache.reset_stats()
+
+    def test_payloads_are_cached(self):
+        for url in ("/collection/", self.detail_url):
+            first = self.client.get(url).json()
+            with deferred_metrics(), self.assertNumQueries(1):  # the version lookup
+                self.assertEqual(self.client.get(url).json(), first)
+        stats = self.client.get("/cache-stats/").json()['collections']
+        self.assertEqual((stats['hits'], stats['misses'], stats['hit_ratio']), (2, 2, 0.5))
+        self.assertGreater(stats['bytes_saved'], 0)
+
+    def test_writes_invalidate_payloads(self):
+        self.client.get("/collection/")
+        self.client.get(self.detail_url)
+        self.client.put(self.detail_url, {"title": "Renamed", "movies": [
+            {"title": "Other", "description": "Description", "genres": "Comedy", "uuid": str(uuid4())}
+        ]}, format='json')
+        self.assertEqual(self.client.get(self.detail_url).json()['title'], "Renamed")
+        data = self.client.get("/collection/").json()['data']
+        self.assertEqual(data['collections'][0]['title'], "Renamed")
+        self.assertEqual(data['favourite_genres'], "Comedy, Drama")
+        self.client.delete(self.detail_url)
+        self.assertEqual(self.client.get("/collection/").json()['data']['collections'], [])
+        self.assertEqual(self.client.get(self.detail_url).status_code, status.HTTP_404_NOT_FOUND)
+
+class CollectionPaginationTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpass")
+        self.client.force_authenticate(user=self.user)
+
+    def follow(self, url, page):
+        """Collect the items of every page, following the `next` links."""
+        items = []
+        while url:
+            data = self.client.get(url).json()
+            results, url = page(data)
+            items.extend(results)
+        return items
+
+    def test_collections_are_cursor_paginated(self):
+        for i in range(5):
+            Collection.objects.create(user=self.user, title=f"Collection {i}", description="Description")
+        first = self.client.get("/collection/?page_size=2").json()['data']
+        self.assertEqual([c['title'] for c in first['collections']], ["Collection 0", "Collection 1"])
+        self.assertIsNone(first['previous'])
+        collections = self.follow("/collection/?page_size=2",
+                                  lambda data: (data['data']['collections'], data['data']['next']))
+        self.assertEqual([c['title'] for c in collections], [f"Collection {i}" for i in range(5)])
+
+    def test_collection_movies_are_cursor_paginated(self):
+        collection = Collection.objects.create(user=self.user, title="Collection", description="Description")
+        add_movies(collection, [
+            {"title": f"Movie {i}", "description": "", "genres": "", "uuid": uuid4()} for i in range(5)
+        ])
+        detail_url = reverse("rud_collection", kwargs={"collection_uuid": collection.uuid})
+        detail = self.client.get(detail_url + "?page_size=3").json()
+        self.assertEqual(detail['title'], "Collection")
+        self.assertEqual(len(detail['movies']), 3)
+        self.assertIsNotNone(detail['next'])
+
+        movies_url = reverse("collection_movies", kwargs={"collection_uuid": collection.uuid})
+        movies = self.follow(movies_url + "?page_size=2", lambda data: (data['data'], data['next']))
+        self.assertEqual([m['title'] for m in movies], [f"Movie {i}" for i in range(5)])
+
+    def test_collection_movies_of_another_user(self):
+        other = User.objects.create_user(username="other", password="testpass")
+        collection = Collection.objects.create(user=other, title="Collection", description="Description")
+        response = self.client.get(reverse("collection_movies", kwargs={"collection_uuid": collection.uuid}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+class FavouriteGenresTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpass")
+        self.client.force_authenticate(user=self.user)
+
+    def movie(self, genres, uuid=None):
+        return {"title": "Movie", "description": "Description", "genres": genres, "uuid": uuid or str(uuid4())}
+
+    def create_collection(self, movies):
+        data = {"title": "Collection", "description": "Description", "movies": movies}
+        response = self.client.post("/collection/", data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.json()['collection_uuid']
+
+    def favourite_genres(self):
+        return self.client.get("/collection/").json()['data']['favourite_genres']
+
+    def test_favourite_genres(self):
+        self.create_collection([self.movie("Drama, Comedy"), self.movie("Drama,Horror"), self.movie("Comedy,Drama")])
+        self.create_collection([self.movie("Action"), self.movie("")])
+        self.assertEqual(self.favourite_genres(), "Drama, Comedy, Action")
+
+    def test_favourite_genres_with_fewer_than_three_genres(self):
+        self.create_collection([self.movie("Drama"), self.movie("Drama,Comedy")])
+        self.assertEqual(self.favourite_genres(), "Drama, Comedy")
+
+    def test_favourite_genres_follow_updates_and_deletes(self):
+        movie_uuid = str(uuid4())
+        collection_uuid = self.create_collection([self.movie("Drama", movie_uuid), self.movie("Drama")])
+        other_uuid = self.create_collection([self.movie("Comedy")])
+        data = {"movies": [self.movie("Western", movie_uuid), self.movie("Western")]}
+        self.client.put(reverse("rud_collection", kwargs={"collection_uuid": collection_uuid}), data, format='json')
+        self.assertEqual(self.favourite_genres(), "Western, Comedy, Drama")
+        self.client.delete(reverse("rud_collection", kwargs={"collection_uuid": collection_uuid}))
+        self.assertEqual(self.favourite_genres(), "Comedy")
+        self.client.delete(reverse("rud_collection", kwargs={"collection_uuid": other_uuid}))
+        self.assertEqual(self.favourite_genres(), "")
+        self.assertFalse(UserGenreStat.objects.filter(count__gt=0).exists())
+
+    def test_rebuild_genre_stats(self):
+        self.create_collection([self.movie("Drama, Comedy"), self.movie("Drama,Drama"), self.movie(None)])
+        collection = Collection.objects.create(user=self.user, title="Raw", description="Description")
+        entry, = get_entries([{"title": "Raw", "description": "", "genres": "Comedy, Horror", "uuid": uuid4()}])
+        Movie.objects.create(collection=collection, entry=entry, uuid=entry.uuid)  # not counted in the stats
+        self.assertEqual(csv_genre_counts(self.user.id, limit=2), [(self.user.id, "Comedy", 2), (self.user.id, "Drama", 2)])
+        rebuild_genre_stats(self.user.id)
+        self.assertEqual(self.favourite_genres(), "Comedy, Drama, Horror")
+
 class RequestCountTestCase(APITestCase):
     def setUp(self):
         self.user = User.objects.create_user(username="testuser", password="testpass")
         self.client.force_authenticate(user=self.user)
+        request_counter.reset()
         RequestCounter.objects.create(count=10)
 
     def test_get_request_count(self):
@@ -66,6 +523,93 @@ class RequestCountTestCase(APITestCase):
         counter = RequestCounter.objects.first()
         self.assertEqual(counter.count, 0)
 
+    def test_request_count_is_buffered(self):
+        self.client.get("/request-count/")
+        self.client.get("/request-count/")
+        self.assertEqual(RequestCounter.objects.first().count, 10)
+        self.assertEqual(request_counter.pending, 2)
+        request_counter.flush()
+        self.assertEqual(RequestCounter.objects.aggregate(total=Sum('count'))['total'], 12)
+        self.assertEqual(request_counter.pending, 0)
+
+    def test_failed_counter_flush_does_not_fail_the_request(self):
+        self.addCleanup(setattr, request_counter, 'flush_threshold', request_counter.flush_threshold)
+        request_counter.flush_threshold = 1
+        with mock.patch.object(request_counter, '_write', side_effect=DatabaseError('database is locked')), \
+                self.assertLogs('collection.utils.counter', 'ERROR'):
+            response = self.client.get("/request-count/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(request_counter.pending, 1)  # kept for the next flush
+
+    def test_request_count_sums_shards(self):
+        RequestCounter.objects.create(shard=3, count=5)
+        response = self.client.get("/request-count/")
+        self.assertEqual(response.json()['requests'], 16)
+
+    def test_reset_request_count_zeroes_all_shards(self):
+        RequestCounter.objects.create(shard=3, count=5)
+        self.client.post("/request-count/reset/")
+        self.assertFalse(RequestCounter.objects.exclude(count=0).exists())
+
+class RequestMetricsTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpass")
+        self.client.force_authenticate(user=self.user)
+        route_metrics.reset()
+
+    def test_get_request_metrics(self):
+        self.client.get("/collection/")
+        self.client.get("/collection/")
+        self.client.get(reverse("rud_collection", kwargs={"collection_uuid": "not-a-uuid"}))
+        response = self.client.get("/request-metrics/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        routes = response.json()['routes']
+        self.assertEqual(routes['cl_collection']['requests'], 2)
+        self.assertEqual(routes['cl_collection']['status'], {'2xx': 2})
+        self.assertEqual(routes['rud_collection']['status'], {'4xx': 1})
+        self.assertIsNotNone(routes['cl_collection']['p99_ms'])
+
+    def test_flush_request_metrics(self):
+        self.client.get("/collection/")
+        route_metrics.flush()
+        self.assertEqual(RouteMetric.objects.get(route='cl_collection').count, 1)
+        self.assertEqual(route_metrics.summary()['cl_collection']['requests'], 1)
+
+    def test_failed_flush_does_not_fail_the_request(self):
+        self.addCleanup(setattr, route_metrics, 'flush_interval', route_metrics.flush_interval)
+        route_metrics.flush_interval = 0
+        with mock.patch.object(RouteMetric.objects, 'filter', side_effect=DatabaseError('locked')), \
+                self.assertLogs('collection.utils.metrics', 'ERROR'):
+            response = self.client.get("/collection/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(route_metrics.flush(), 1)  # kept for the next flush
+        self.assertEqual(RouteMetric.objects.get(route='cl_collection').count, 1)
+
+    def test_flush_adds_to_a_row_created_concurrently(self):
+        self.client.get("/collection/")
+        route, status_class, bucket = next(iter(route_metrics._pending))
+        update = QuerySet.update
+        updates = []
+
+        def update_after_concurrent_create(queryset, **kwargs):
+            if not updates:  # another process creates the row right after the first update
+                RouteMetric.objects.create(route=route, status_class=status_class, bucket=bucket, count=5)
+                updates.append(0)
+                return 0
+            return update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, 'update', autospec=True, side_effect=update_after_concurrent_create):
+            route_metrics.flush()
+        self.assertEqual(RouteMetric.objects.get(route=route, status_class=status_class, bucket=bucket).count, 6)
+
+    def test_histogram_percentile(self):
+        histogram = {0: 90, 3: 9, 10: 1}
+        self.assertEqual(histogram_percentile(histogram, 50), 1)
+        self.assertEqual(histogram_percentile(histogram, 95), 8)
+        self.assertEqual(histogram_percentile(histogram, 99), 8)
+        self.assertEqual(histogram_percentile(histogram, 100), 1024)
+        self.assertIsNone(histogram_percentile({}, 50))
+
 class MoviesTestCase(APITestCase):
     def setUp(self):
         self.user = User.objects.create_user(username="testuser", password="testpass")
@@ -75,4 +619,64 @@ class MoviesTestCase(APITestCase):
         response = self.client.get("/movies/")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         data = response.json()['data']
-        self.assertEqual(len(data), 10)
\ No newline at end of file
+        self.assertEqual(len(data), 10)
+
+class MoviesCacheTestCase(APITestCase):
+    page = {"count": 20, "next": "https://upstream/?page=2", "previous": None,
+            "results": [{"title": "Movie", "description": "", "genres": "", "uuid": "9e7c5f29-7c4e-4c4a-8b4e-4b5e8a0c4d11"}]}
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpass")
+        self.client.force_authenticate(user=self.user)
+        movie_page_cache.cache.clear()
+        movie_page_cache.reset_stats()
+
+    def tearDown(self):
+        movie_page_cache.cache.clear()
+
+    def test_get_movies_is_cached(self):
+        with mock.patch.object(movie_page_cache, 'fetch', return_value=self.page) as fetch:
+            first = self.client.get("/movies/")
+            second = self.client.get("/movies/")
+        self.assertEqual(fetch.call_count, 1)
+        self.assertEqual(first.json(), second.json())
+        self.assertEqual(second.json()['data'], self.page['results'])
+        self.assertTrue(second.json()['next'].endswith("/movies/?page=2"))
+        stats = self.client.get("/cache-stats/").json()['movies']
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+    def test_get_movies_serves_stale_page_when_upstream_fails(self):
+        movie_page_cache.cache.set(movie_page_cache.key(1), {'data': self.page, 'fetched_at': time.time() - 3600})
+        error = requests.exceptions.ConnectionError("upstream down")
+        with mock.patch.object(movie_page_cache, 'fetch', side_effect=error), \
+                mock.patch.object(movie_page_cache, 'revalidate_in_background', False):
+            response = self.client.get("/movies/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['data'], self.page['results'])
+        self.assertEqual(movie_page_cache.stats()['stale_on_error'], 1)
+
+    def test_get_movies_fails_without_cached_page(self):
+        error = requests.exceptions.ConnectionError("upstream down")
+        with mock.patch.object(movie_page_cache, 'fetch', side_effect=error) as fetch:
+            response = self.client.get("/movies/")
+        self.assertEqual(fetch.call_count, 1)
+        self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    def test_get_movies_under_wsgi_uses_the_shared_session(self):
+        with mock.patch.object(movie_page_cache, 'fetch', return_value=self.page), \
+                mock.patch.object(movie_page_cache, 'afetch') as afetch:
+            response = self.client.get("/movies/")
+        self.assertEqual(response.json()['data'], self.page['results'])
+        afetch.assert_not_called()
+
+    async def test_get_movies_under_asgi(self):
+        user = await User.objects.acreate(username="asgiuser")
+        token = RefreshToken.for_user(user).access_token
+        client = AsyncClient()
+        with mock.patch.object(movie_page_cache, 'afetch', return_value=self.page):
+            response = await client.get("/movies/", headers={"Authorization": f"Bearer {token}"})
+            anonymous = await client.get("/movies/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['data'], self.page['results'])
+        self.assertEqual(anonymous.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertIn("Bearer", anonymous["WWW-Authenticate"])
@@ -0,0 +1,177 @@
+import io
+import json
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.utils import timezone
+from django.core.management import call_command
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from collection.models import CatalogMovie, CatalogSync
+
+PAGE_SIZE = 10
+
+
+class StubMoviesHandler(BaseHTTPRequestHandler):
+    """
+    Stand-in for the third-party movie API serving `server.movies` in pages of PAGE_SIZE.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        page = int(parse_qs(urlparse(self.path).query).get('page', ['1'])[0])
+        movies = self.server.movies
+        start = (page - 1) * PAGE_SIZE
+        body = json.dumps({
+            'count': len(movies),
+            'next': f'http://stub/?page={page + 1}' if start + PAGE_SIZE < len(movies) else None,
+            'previous': f'http://stub/?page={page - 1}' if page > 1 else None,
+            'results': movies[start:start + PAGE_SIZE],
+        }).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_movies(count, genres='Drama'):
+    return [
+        {'title': f'Movie {i}', 'description': f'Description {i}', 'genres': genres, 'uuid': str(uuid.uuid4())}
+        for i in range(count)
+    ]
+
+
+class CatalogSyncTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpass")
+        self.client.force_authenticate(user=self.user)
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubMoviesHandler)
+        self.server.movies = make_movies(25)
+        self.url = f'http://127.0.0.1:{self.server.server_port}/api/v1/maya/movies/'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def sync(self, **options):
+        call_command('sync_catalog', url=self.url, stdout=io.StringIO(), **options)
+
+    def test_sync_catalog(self):
+        self.sync()
+        self.assertEqual(CatalogMovie.objects.count(), 25)
+        state = CatalogSync.objects.get()
+        self.assertEqual((state.last_page, state.pages, state.count), (3, 3, 25))
+        self.assertIsNotNone(state.completed_at)
+
+    def test_sync_catalog_incremental(self):
+        self.sync(max_pages=2)
+        self.assertEqual(CatalogMovie.objects.count(), 20)
+        self.assertIsNone(CatalogSync.objects.get().completed_at)
+        self.server.movies += make_movies(10, genres='Comedy')
+        self.sync(incremental=True)
+        self.assertEqual(CatalogMovie.objects.count(), 35)
+        self.assertEqual(CatalogSync.objects.get().last_page, 4)
+
+    def test_partial_sync_keeps_serving_every_page(self):
+        self.sync()
+        self.sync(max_pages=1)
+        state = CatalogSync.objects.get()
+        self.assertEqual((state.last_page, state.pages), (1, 3))
+        self.assertTrue(self.client.get("/movies/?page=2").json()['next'])
+
+    def test_get_movies_from_catalog_out_of_range(self):
+        self.sync()
+        for page in (0, 4):
+            response = self.client.get(f"/movies/?page={page}")
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_get_movies_from_catalog_fits_its_query_budget(self):
+        self.sync()
+        caches['auth'].clear()  # the active user check
+        self.client.force_authenticate(user=None)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(self.user).access_token}")
+        with self.settings(QUERY_BUDGET_MODE='raise'):
+            self.assertEqual(self.client.get("/movies/").status_code, status.HTTP_200_OK)
+
+    def test_full_sync_removes_delisted_movies(self):
+        self.sync()
+        self.server.movies = self.server.movies[5:]
+        self.sync()
+        self.assertEqual(CatalogMovie.objects.count(), 20)
+
+    def test_get_movies_from_catalog(self):
+        self.sync()
+        response = self.client.get("/movies/?page=2")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(data['count'], 25)
+        self.assertEqual([movie['uuid'] for movie in data['data']],
+                         [movie['uuid'] for movie in self.server.movies[10:20]])
+        self.assertTrue(data['next'].endswith('/movies/?page=3'))
+        self.assertTrue(data['previous'].endswith('/movies/?page=1'))
+
+class SearchMoviesTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpass")
+        self.client.force_authenticate(user=self.user)
+        movies = [
+            ("The Godfather", "A crime family saga.", "Crime,Drama"),
+            ("Goodfellas", "The story of a mob associate, not the godfather.", "Crime"),
+            ("Toy Story", "Toys come to life.", "Animation,Comedy"),
+        ]
+        for rank, (title, description, genres) in enumerate(movies):
+            CatalogMovie.objects.create(uuid=uuid.uuid4(), title=title, description=description, genres=genres,
+                                        page=1, rank=rank, synced_at=timezone.now())
+
+    def search(self, query, page=1):
+        response = self.client.get("/movies/search/", {"q": query, "page": page})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()
+
+    def test_search_ranks_title_matches_first(self):
+        titles = [movie['title'] for movie in self.search("godfather")['data']]
+        self.assertEqual(titles, ["The Godfather", "Goodfellas"])
+
+    def test_search_prefix_and_genre(self):
+        self.assertEqual([movie['title'] for movie in self.search("anim")['data']], ["Toy Story"])
+        self.assertEqual(len(self.search("crim")['data']), 2)
+
+    def test_search_follows_updates_and_deletes(self):
+        CatalogMovie.objects.filter(title="Toy Story").update(title="Toy Story 2")
+        self.assertEqual([movie['title'] for movie in self.search("toy")['data']], ["Toy Story 2"])
+        CatalogMovie.objects.filter(title="Toy Story 2").delete()
+        self.assertEqual(self.search("toy")['data'], [])
+
+    def test_search_pagination(self):
+        with self.settings(MOVIES_SEARCH_PAGE_SIZE=1):
+            first = self.search("crime")
+            second = self.search("crime", page=2)
+        self.assertEqual(len(first['data']), 1)
+        self.assertIn("page=2", first['next'])
+        self.assertIsNone(second['next'])
+        self.assertNotEqual(first['data'], second['data'])
+
+    def test_search_pages_of_tied_scores_do_not_overlap(self):
+        for i in range(5):
+            CatalogMovie.objects.create(uuid=uuid.uuid4(), title="Heat", description="Same.", genres="Crime",
+                                        page=2, rank=i, synced_at=timezone.now())
+        with self.settings(MOVIES_SEARCH_PAGE_SIZE=2):
+            pages = [self.search("heat", page=page)['data'] for page in (1, 2, 3)]
+        uuids = [movie['uuid'] for page in pages for movie in page]
+        self.assertEqual(len(uuids), 5)
+        self.assertEqual(len(set(uuids)), 5)
+
+    def test_search_requires_query(self):
+        response = self.client.get("/movies/search/", {"q": " "})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,34 @@
+from unittest import skipUnless
+from uuid import uuid4
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+
+from collection.models import Collection, Movie
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Query plans are checked on SQLite')
+class QueryPlanTestCase(TestCase):
+    """
+    Guard the indexes the collection endpoints rely on: these lookups must never
+    fall back to scanning the tables.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="testuser", password="testpass")
+        cls.collection = Collection.objects.create(user=cls.user, title="Collection", description="Description")
+
+    def assertUsesIndex(self, queryset, columns):
+        plan = queryset.explain()
+        self.assertIn('USING INDEX', plan)
+        self.assertIn(f'({columns})', plan)
+        self.assertNotIn('SCAN', plan)
+
+    def test_collection_lookup_uses_uuid_index(self):
+        queryset = Collection.objects.filter(uuid=uuid4(), user=self.user)
+        self.assertUsesIndex(queryset, 'uuid=?')
+
+    def test_movie_lookup_uses_collection_uuid_constraint(self):
+        queryset = Movie.objects.filter(collection=self.collection, uuid=uuid4())
+        self.assertUsesIndex(queryset, 'collection_id=? AND uuid=?')
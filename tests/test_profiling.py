@@ -0,0 +1,63 @@
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth.models import User
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from collection.models import Collection
+
+
+class ProfilingTestCase(APITestCase):
+    def setUp(self):
+        self.profile_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.profile_dir)
+        self.user = User.objects.create(username='profileuser')
+        self.staff = User.objects.create(username='staffuser', is_staff=True)
+        Collection.objects.create(user=self.user, title='Collection', description='A collection')
+
+    def auth(self, user):
+        return {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(user).access_token}'}
+
+    def profiles(self):
+        return sorted(os.listdir(self.profile_dir))
+
+    def test_sampled_requests_are_profiled(self):
+        with self.settings(PROFILING_SAMPLE_RATE=1, PROFILING_DIR=self.profile_dir):
+            self.client.get('/collection/', **self.auth(self.user))
+            response = self.client.get('/profiles/', **self.auth(self.staff))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        profile = next(p for p in response.json()['profiles'] if p['view'] == 'CollectionListView.get')
+        self.assertEqual(profile['reason'], 'sample')
+        self.assertEqual(profile['status'], 200)
+        self.assertTrue(profile['top_functions'])
+        self.assertIn(profile['profile'], self.profiles())
+
+    def test_header_requests_are_profiled_for_staff_only(self):
+        with self.settings(PROFILING_SAMPLE_RATE=0, PROFILING_DIR=self.profile_dir):
+            response = self.client.get('/collection/', HTTP_X_PROFILE='1', **self.auth(self.user))
+            self.assertNotIn('X-Profile', response)
+            self.assertEqual(self.profiles(), [])
+            response = self.client.get('/collection/', HTTP_X_PROFILE='1', **self.auth(self.staff))
+        self.assertIn(response['X-Profile'], self.profiles())
+
+    def test_oldest_profiles_are_removed(self):
+        with self.settings(PROFILING_SAMPLE_RATE=1, PROFILING_DIR=self.profile_dir, PROFILING_MAX_FILES=2):
+            for _ in range(4):
+                self.client.get('/collection/', **self.auth(self.user))
+        self.assertEqual(len([name for name in self.profiles() if name.endswith('.prof')]), 2)
+
+    @override_settings(PROFILING_SAMPLE_RATE=0, PROFILING_HEADER=None)
+    def test_off_without_sample_rate_or_header(self):
+        with self.settings(PROFILING_DIR=self.profile_dir):
+            self.client.get('/collection/', HTTP_X_PROFILE='1', **self.auth(self.staff))
+        self.assertEqual(self.profiles(), [])
+
+    def test_summary_is_for_staff_only(self):
+        response = self.client.get('/profiles/', **self.auth(self.user))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        response = self.client.get('/profiles/?limit=0', **self.auth(self.staff))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
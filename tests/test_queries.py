@@ -0,0 +1,98 @@
+from unittest import mock
+from uuid import uuid4
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.test import AsyncClient, SimpleTestCase, TestCase, override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from collection.models import Collection
+from collection.utils.entries import add_movies
+from collection.utils.movies import movie_page_cache
+from collection.utils.queries import QueryBudgetExceeded, max_queries, normalize_sql
+
+
+class NormalizeSqlTestCase(SimpleTestCase):
+    def test_literals_and_in_lists_are_replaced(self):
+        self.assertEqual(
+            normalize_sql("SELECT *  FROM t WHERE a = 'x' AND b = 12 AND c IN (%s, %s, %s) LIMIT 21"),
+            'SELECT * FROM t WHERE a = ? AND b = ? AND c IN (...) LIMIT ?',
+        )
+        self.assertEqual(normalize_sql('SELECT * FROM t WHERE c IN (%s)'), normalize_sql('SELECT * FROM t WHERE c IN (%s, %s)'))
+
+
+class MaxQueriesTestCase(TestCase):
+    def test_within_budget(self):
+        with max_queries(2) as recorder:
+            User.objects.count()
+            User.objects.count()
+        self.assertEqual(recorder.count, 2)
+
+    def test_over_budget_lists_repeated_statements(self):
+        users = [User.objects.create(username=f'user{i}') for i in range(3)]
+        with self.assertRaises(QueryBudgetExceeded) as context:
+            with max_queries(1, label='Loop'):
+                for user in users:
+                    Collection.objects.filter(user=user).count()
+        self.assertIn('Loop ran 3 queries, over its budget of 1', str(context.exception))
+        self.assertIn('3 x SELECT COUNT(*)', str(context.exception))
+
+    def test_nested_blocks_record_inner_queries(self):
+        with max_queries(2) as outer:
+            with max_queries(1):
+                User.objects.count()
+            User.objects.count()
+        self.assertEqual(outer.count, 2)
+
+
+class QueryBudgetMiddlewareTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='budgetuser')
+        for i in range(3):
+            Collection.objects.create(user=self.user, title=f'Collection {i}', description='A collection')
+        self.headers = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(self.user).access_token}'}
+
+    @override_settings(QUERY_BUDGET_MODE='raise', QUERY_BUDGETS={'CollectionListView.get': 0})
+    def test_over_budget_fails_in_raise_mode(self):
+        with self.assertRaisesMessage(QueryBudgetExceeded, 'CollectionListView.get ran'):
+            self.client.get('/collection/', **self.headers)
+
+    @override_settings(QUERY_BUDGET_MODE='log', QUERY_BUDGETS={'CollectionListView.get': 0})
+    def test_over_budget_is_logged_in_log_mode(self):
+        with self.assertLogs('middlewares.middleware', 'WARNING') as logs:
+            response = self.client.get('/collection/', **self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('CollectionListView.get ran', logs.output[0])
+        self.assertIn('Most repeated', logs.output[0])
+
+    @override_settings(QUERY_BUDGET_MODE='log', QUERY_BUDGETS={}, QUERY_REPEAT_THRESHOLD=1)
+    def test_repeated_statements_are_flagged(self):
+        with self.assertLogs('middlewares.middleware', 'WARNING') as logs:
+            self.client.get('/collection/', **self.headers)
+        self.assertIn('Possible N+1 in CollectionListView.get', logs.output[0])
+
+    @override_settings(QUERY_BUDGET_MODE='raise')
+    def test_reads_fit_their_budgets_with_cold_caches(self):
+        collection = Collection.objects.first()
+        add_movies(collection, [{'uuid': uuid4(), 'title': 'Movie', 'description': 'A movie', 'genres': 'Drama'}])
+        paths = ('/collection/', f'/collection/{collection.uuid}/', f'/collection/{collection.uuid}/movies/',
+                 '/request-count/', '/request-metrics/', '/cache-stats/', '/movies/search/?q=movie')
+        for path in paths:
+            caches['auth'].clear()  # the active user check
+            caches['collections'].clear()
+            self.assertEqual(self.client.get(path, **self.headers).status_code, 200, path)
+
+    @override_settings(QUERY_BUDGET_MODE='raise', QUERY_BUDGETS={'CollectionListView.post': 0})
+    def test_over_budget_is_not_raised_after_a_write(self):
+        with self.assertLogs('middlewares.middleware', 'ERROR') as logs:
+            response = self.client.post('/collection/', {'title': 'New', 'description': 'A collection', 'movies': []},
+                                        content_type='application/json', **self.headers)
+        self.assertEqual(response.status_code, 201)
+        self.assertIn('CollectionListView.post ran', logs.output[0])
+
+    @override_settings(QUERY_BUDGET_MODE='raise', QUERY_BUDGETS={'get_movies.get': 0})
+    async def test_queries_of_async_views_are_counted(self):
+        page = {'count': 0, 'next': None, 'previous': None, 'results': []}
+        with mock.patch.object(movie_page_cache, 'afetch', return_value=page):
+            with self.assertRaisesMessage(QueryBudgetExceeded, 'get_movies.get ran'):
+                await AsyncClient().get('/movies/', headers={'Authorization': self.headers['HTTP_AUTHORIZATION']})
@@ -0,0 +1,204 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from unittest import mock
+
+import requests
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import SimpleTestCase, override_settings
+from urllib3.exceptions import ConnectTimeoutError
+from urllib3.util.retry import Retry
+
+from collection.utils.passwords import HashPoolBusy, PasswordHashPool
+from collection.utils.ratelimit import TokenBucketLimiter
+from collection.utils.util import (
+    AsyncRetryClient, create_retry_session, get_async_client, get_shared_session,
+)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.clients.add(self.client_address)
+        self.server.paths.append(self.path)
+        if self.path.startswith('/slow'):
+            self.server.release.wait(5)
+            return
+        body = json.dumps({'path': self.path}).encode()
+        self.send_response(self.server.statuses.pop(0) if self.server.statuses else 200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServerTestCase(SimpleTestCase):
+    """Runs a StubHandler server, answering with `server.statuses` in turn and then with 200."""
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+        self.server.release = threading.Event()
+        self.server.clients = set()
+        self.server.paths = []
+        self.server.statuses = []
+        self.url = f'http://127.0.0.1:{self.server.server_port}'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.server.release.set()
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class RetrySessionTestCase(StubServerTestCase):
+    def test_shared_session_is_reused(self):
+        self.assertIs(get_shared_session(), get_shared_session())
+
+    def test_connections_are_reused(self):
+        session = create_retry_session()
+        for _ in range(3):
+            self.assertEqual(session.get(f'{self.url}/movies/').json(), {'path': '/movies/'})
+        self.assertEqual(len(self.server.clients), 1)
+
+    def test_default_timeout(self):
+        session = create_retry_session(retries=0, timeout=(1, 0.2))
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            session.get(f'{self.url}/slow')
+
+
+class AsyncRetryClientTestCase(StubServerTestCase):
+    async def get(self, path, **kwargs):
+        """Send one GET request to the stub server with a new client and close it."""
+        client = AsyncRetryClient(backoff_factor=0, **kwargs)
+        try:
+            return await client.get(f'{self.url}{path}')
+        finally:
+            await client.close()
+
+    async def test_retries_server_errors(self):
+        self.server.statuses = [502, 504]
+        response = await self.get('/movies/')
+        self.assertEqual(await response.json(), {'path': '/movies/'})
+        self.assertEqual(len(self.server.paths), 3)
+
+    async def test_gives_up_after_retries(self):
+        self.server.statuses = [500] * 3
+        with self.assertRaises(requests.exceptions.RetryError):
+            await self.get('/movies/', retries=2)
+        self.assertEqual(len(self.server.paths), 3)
+
+    async def test_client_errors_are_not_retried(self):
+        self.server.statuses = [404]
+        response = await self.get('/movies/')
+        self.assertEqual((response.status, len(self.server.paths)), (404, 1))
+
+    def test_backoff_matches_retry_session(self):
+        client = AsyncRetryClient.__new__(AsyncRetryClient)
+        client.backoff_factor = 0.3
+        retry = Retry(total=5, backoff_factor=0.3)
+        for failures in range(1, 6):
+            retry = retry.increment(method='GET', url='/movies/', error=ConnectTimeoutError())
+            self.assertEqual(client.backoff(failures), retry.get_backoff_time())
+
+    async def test_connections_are_reused(self):
+        client = AsyncRetryClient()
+        try:
+            for _ in range(3):
+                response = await client.get(f'{self.url}/movies/')
+                self.assertEqual(await response.json(), {'path': '/movies/'})
+        finally:
+            await client.close()
+        self.assertEqual(len(self.server.clients), 1)
+
+    async def test_default_timeout(self):
+        with self.assertRaises(requests.exceptions.Timeout):
+            await self.get('/slow', retries=0, timeout=(1, 0.2))
+
+    def test_async_client_is_shared_and_closed_with_its_loop(self):
+        async def get_clients():
+            return await get_async_client(), await get_async_client()
+
+        first, second = asyncio.run(get_clients())
+        self.assertIs(first, second)
+        self.assertTrue(first.session.closed)
+        self.assertIsNot(asyncio.run(get_clients())[0], first)
+
+
+class PasswordHashPoolTestCase(SimpleTestCase):
+    def test_full_pool_refuses_work(self):
+        pool = PasswordHashPool(workers=1, queue_size=1, timeout=5)
+        release = threading.Event()
+        waiting = [threading.Thread(target=pool.run, args=(release.wait,)) for _ in range(2)]
+        for thread in waiting:
+            thread.start()
+        deadline = time.monotonic() + 5
+        while pool._slots._value and time.monotonic() < deadline:  # one running, one queued
+            time.sleep(0.01)
+        with self.assertRaises(HashPoolBusy):
+            pool.run(str, 'refused')
+        release.set()
+        for thread in waiting:
+            thread.join()
+        self.assertEqual(pool.run(str.upper, 'admitted'), 'ADMITTED')
+
+    def test_slow_work_times_out(self):
+        pool = PasswordHashPool(workers=1, queue_size=0, timeout=0.05)
+        release = threading.Event()
+        with self.assertRaises(HashPoolBusy):
+            pool.run(release.wait)
+        release.set()
+
+
+class TokenBucketLimiterTestCase(SimpleTestCase):
+    def test_burst_then_rate(self):
+        limiter = TokenBucketLimiter(rate=1, burst=2)
+        with mock.patch('collection.utils.ratelimit.time.monotonic', return_value=100):
+            self.assertEqual([limiter.hit('key') for _ in range(2)], [0, 0])
+            self.assertAlmostEqual(limiter.hit('key'), 1)
+            self.assertEqual(limiter.hit('other'), 0)
+        with mock.patch('collection.utils.ratelimit.time.monotonic', return_value=101):
+            self.assertEqual(limiter.hit('key'), 0)
+
+    def test_buckets_are_bounded(self):
+        limiter = TokenBucketLimiter(rate=1, burst=1, max_keys=2)
+        for key in ('a', 'b', 'c'):
+            limiter.hit(key)
+        self.assertEqual(list(limiter._buckets), ['b', 'c'])
+
+
+class SQLitePragmasTestCase(SimpleTestCase):
+    def open_database(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        wrapper = DatabaseWrapper({**connection.settings_dict, 'NAME': os.path.join(directory.name, 'db.sqlite3')})
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def pragma(self, wrapper, name):
+        with wrapper.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    @override_settings(SQLITE_PRAGMAS={'journal_mode': 'WAL', 'synchronous': 'NORMAL', 'busy_timeout': 1234,
+                                       'cache_size': -2048})
+    def test_pragmas_are_applied_to_new_connections(self):
+        wrapper = self.open_database()
+        self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma(wrapper, 'synchronous'), 1)  # NORMAL
+        self.assertEqual(self.pragma(wrapper, 'busy_timeout'), 1234)
+        self.assertEqual(self.pragma(wrapper, 'cache_size'), -2048)
+
+    @override_settings(SQLITE_PRAGMAS={'journal_mode = DELETE; --': 'WAL'})
+    def test_invalid_pragma_names_are_refused(self):
+        with self.assertRaises(ImproperlyConfigured):
+            self.open_database().ensure_connection()